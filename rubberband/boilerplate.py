@@ -11,6 +11,7 @@ from elasticsearch import Elasticsearch
 from elasticsearch.dsl.connections import connections
 
 from rubberband.routes import routes
+from rubberband.constants import CACHE_DB, EVAL_CACHE_DIR, EXPIRY_LOCK, IMPORT_JOB_DB
 from rubberband.handlers.fe import ErrorView
 
 # define options that server.py can read from
@@ -44,6 +45,34 @@ define(
     default={},
     help="key-value pairs of gitlab project names and their IDs.",
 )
+define(
+    "gitlab_cache_ttl",
+    default=600,
+    help="Seconds that gitlab access levels and usernames are cached, 0 disables the cache.",
+)
+define(
+    "gitlab_negative_cache_ttl",
+    default=60,
+    help="Seconds that unknown gitlab users and commits are cached.",
+)
+define(
+    "gitlab_commit_cache_ttl",
+    default=365 * 24 * 3600,
+    help="Seconds that gitlab commits are cached, 0 disables the cache.",
+)
+define(
+    "gitlab_offline",
+    default=False,
+    help="Don't contact gitlab, use only cached commits, usernames and access levels; "
+    "users that aren't cached get the minimal access level.",
+)
+define("gitlab_timeout", default=10, help="Timeout of gitlab requests in seconds.")
+
+define(
+    "cache_db",
+    default=CACHE_DB,
+    help="Path of the sqlite database for small cached values shared by all processes.",
+)
 
 define(
     "elasticsearch_url", default="http://127.0.0.1:9200", help="The Elasticsearch url."
@@ -61,6 +90,103 @@ define(
     help="If security is enabled, the password for the Elasticsearch user.",
 )
 
+define(
+    "bulk_chunk_size",
+    default=500,
+    help="Number of documents per Elasticsearch bulk request during import.",
+)
+define(
+    "bulk_max_chunk_bytes",
+    default=10 * 1024 * 1024,
+    help="Maximal size in bytes of a single Elasticsearch bulk request.",
+)
+define(
+    "bulk_max_retries",
+    default=3,
+    help="How often a bulk chunk is retried if Elasticsearch rejects it (429).",
+)
+define(
+    "bulk_initial_backoff",
+    default=2,
+    help="Seconds to wait before the first bulk retry, doubled for every further retry.",
+)
+
+define(
+    "eval_cache_dir",
+    default=EVAL_CACHE_DIR,
+    help="Directory to cache evaluated IPET tables in.",
+)
+define(
+    "eval_cache_size",
+    default=512,
+    help="Size limit of the evaluation cache in MB, 0 disables the cache.",
+)
+
+define(
+    "compute_workers",
+    default=2,
+    help="Number of worker processes for IPET parsing and evaluation, 0 for one per cpu.",
+)
+define(
+    "compute_max_queue",
+    default=16,
+    help="Maximal number of tasks waiting for or running in the compute workers.",
+)
+define(
+    "import_concurrency",
+    default=4,
+    help="Maximal number of bundles of one user that are imported at the same time.",
+)
+define(
+    "compute_timeout",
+    default=600,
+    help="Seconds after which a request stops waiting for its compute task.",
+)
+
+define(
+    "max_upload_size",
+    default=2 * 1024 * 1024 * 1024,
+    help="Maximal size in bytes of an upload, uploads are streamed to disk.",
+)
+define(
+    "max_unpacked_size",
+    default=40 * 1024 * 1024 * 1024,
+    help="Maximal size in bytes of the logfiles unpacked from the compressed files and "
+    "archives of an upload.",
+)
+define(
+    "import_workers",
+    default=1,
+    help="Number of worker processes for queued imports (/api/upload/async). Workers"
+    " that die aren't restarted before the server restarts.",
+)
+define(
+    "import_job_db",
+    default=IMPORT_JOB_DB,
+    help="Path of the sqlite database that holds the import job queue.",
+)
+define(
+    "index_partitions",
+    default="month",
+    help="Time partitions of the result and file indices: month, year or none.",
+)
+define(
+    "delete_requests_per_second",
+    default=-1,
+    help="Throttle of the deletion of expired documents in documents per second, "
+    "-1 for no throttle.",
+)
+define(
+    "expiry_lock",
+    default=EXPIRY_LOCK,
+    help="Path of the lock file that lets one process delete the expired TestSets.",
+)
+define(
+    "import_metrics_window",
+    default=1000,
+    help="Number of recent imports whose metrics are kept for the percentiles.",
+)
+
 define("smtp_host", default="", help="The FQDN of the SMTP host.")
 define("smtp_port", default="", help="The listening port of SMTP host.")
 define(
@@ -136,6 +262,23 @@ def make_app(project_root):
         **settings,
     )
 
+    setup_elasticsearch()
+
+    # settings of tornado app
+    if app.settings["debug"]:
+        app.base_url = "http://127.0.0.1:{}".format(options.port)
+    else:
+        app.base_url = options.prod_url
+
+    return app
+
+
+def setup_elasticsearch():
+    """
+    Connect to elasticsearch as configured in the options.
+
+    This is called by make_app and by the worker processes of the compute service.
+    """
     logging.info("Setting up Elasticsearch connection.")
     # set up elasticsearch
     # create connection instance
@@ -156,11 +299,3 @@ def make_app(project_root):
     conn = Elasticsearch(**elasticsearch_options)
     # connect connection to pool
     connections.add_connection("default", conn)
-
-    # settings of tornado app
-    if app.settings["debug"]:
-        app.base_url = "http://127.0.0.1:{}".format(options.port)
-    else:
-        app.base_url = options.prod_url
-
-    return app
@@ -11,13 +11,24 @@ INFINITY_MASK = -1
 INFINITY_FLOAT = float("inf")
 INFINITY_DISPLAY = 1e20
 FILE_INDEX = "file"
+FILE_CHUNK_INDEX = "filechunk"
 RESULT_INDEX = "result"
 TESTSET_INDEX = "testset"
 SETTINGS_INDEX = "settings"
+INSTANCE_INDEX = "instance"
+SNAPSHOT_INDEX = "resultsnapshot"
 ZIPPED_SUFFIX = ".gz"
 FILES_DIR = "staticfiles/"
 SOLU_DIR = FILES_DIR + "instancedata/"
 STATIC_FILES_DIR = FILES_DIR + "xml/"
+EVAL_CACHE_DIR = FILES_DIR + "cache/evaluations/"
+CACHE_DB = FILES_DIR + "cache/cache.sqlite3"
+IMPORT_JOB_DB = FILES_DIR + "jobs.sqlite3"
+EXPIRY_LOCK = FILES_DIR + "expiry.lock"
+# uncompressed size of the pieces that log files are stored in, in bytes
+FILE_CHUNK_SIZE = 256 * 1024
+# version of the encoding of ResultSnapshots, older snapshots are ignored
+SNAPSHOT_FORMAT = 1
 ADD_READERS = STATIC_FILES_DIR + "additional_readers.xml"
 IPET_EVALUATIONS = {
     0: {
@@ -2,4 +2,9 @@
 
 from .search import SearchEndpoint  # noqa
 from .comparison import ComparisonEndpoint  # noqa
-from .upload import UploadEndpoint, UploadAsyncEndpoint  # noqa
+from .upload import (  # noqa
+    UploadEndpoint,
+    UploadAsyncEndpoint,
+    UploadCheckEndpoint,
+    UploadJobEndpoint,
+)
@@ -4,7 +4,9 @@ from datetime import datetime
 from tornado.web import HTTPError
 
 from .base import BaseHandler, authenticated
+from rubberband.handlers.common import compute
 from rubberband.constants import FORMAT_DATE
+from rubberband.models import TestSet
 from rubberband.utils import ALL_SOLU
 from rubberband.handlers.fe.evaluation import (
     setup_experiment,
@@ -19,7 +21,7 @@ class ComparisonEndpoint(BaseHandler):
     """Request handler caring about the comparison of sets of TestRuns."""
 
     @authenticated
-    def get(self, base_id):
+    async def get(self, base_id):
         """
         Answer to GET requests.
 
@@ -28,12 +30,13 @@ class ComparisonEndpoint(BaseHandler):
         base_id
             ID of the base TestSet
 
-        Compare TestRuns with IPET
+        Compare TestRuns with IPET in the compute service
         """
         if not base_id:
             raise HTTPError(404)
 
         # read testrunids
+        testrunids = []
         comparison_ids = self.get_argument("compare", None)
         if comparison_ids is not None:
             testrunids = list(set(comparison_ids.split(",")))
@@ -41,10 +44,8 @@ class ComparisonEndpoint(BaseHandler):
                 raise HTTPError(404)
 
         # get testruns and default
-        baserun = get_testruns(base_id)
-        testruns = []
-        if comparison_ids is not None:
-            testruns = get_testruns(testrunids)
+        baserun, *testruns = get_testruns([base_id] + testrunids, results=False)
+        TestSet.load_snapshots_many(testruns + [baserun])
 
         # timestamps
         basehash = baserun.git_hash
@@ -70,38 +71,13 @@ class ComparisonEndpoint(BaseHandler):
             tolerance = 1e-6
 
         # evaluate with ipet
-        ex, _ = setup_experiment(testruns + [baserun], "")
-        evalstring = """<?xml version="1.0" ?>
-<Evaluation comparecolformat="%.3f" index="ProblemName Seed Permutation GitHash"
-    indexsplit="-1" fillin="True">
-    <Column formatstr="%.2f" name="T" origcolname="SolvingTime" minval="0.5"
-    comp="quot shift. by 1" maxval="TimeLimit" alternative="TimeLimit"
-    reduction="shmean shift. by 1">
-        <Aggregation aggregation="shmean" name="sgm" shiftby="1.0"/>
-    </Column>
-    <Column formatstr="%.2f" origcolname="TimeLimit" alternative="{tl}"
-        reduction="mean">
-    </Column>
-    <FilterGroup name="all"/>
-    <FilterGroup name="clean">
-        <Filter anytestrun="all" expression1="_abort_" expression2="0" operator="eq"/>
-        <Filter anytestrun="all" expression1="_fail_" expression2="0" operator="eq"/>
-    </FilterGroup>
-    <FilterGroup name="all-optimal">
-        <Filter anytestrun="all" expression1="_abort_" expression2="0" operator="eq"/>
-        <Filter anytestrun="all" expression1="_fail_" expression2="0" operator="eq"/>
-        <Filter anytestrun="all" expression1="_solved_" expression2="1" operator="eq"/>
-    </FilterGroup>
-</Evaluation>
-        """.format(tl=baserun.time_limit)
-        ev = IPETEvaluation.fromXML(evalstring)
-        ev.set_validate(ALL_SOLU)
-        ev.set_feastol(tolerance)
-
-        set_defaultgroup(ev, ex, base_id)
-
-        # do evaluation
-        longtable, aggtable = ev.evaluate(ex)
+        aggtable = await compute(
+            compare_testruns,
+            testruns + [baserun],
+            base_id,
+            tolerance,
+            baserun.time_limit,
+        )
 
         # df = aggtable[["_count_","_solved_","T_sgm(1.0)Q","T_sgm(1.0)"]]
 
@@ -187,3 +163,58 @@ class ComparisonEndpoint(BaseHandler):
     def check_xsrf_cookie(self):
         """Turn off the xsrf cookie for upload api endpoint, since we check the user differently."""
         pass
+
+
+def compare_testruns(testruns, base_id, tolerance, time_limit):
+    """
+    Evaluate the comparison of TestRuns with IPET.
+
+    Parameters
+    ----------
+    testruns : list
+        rubberband TestSets with loaded Results
+    base_id : str
+        id of the base TestSet, defines the default group
+    tolerance : float
+        tolerance for validation
+    time_limit : str
+        time limit of the base TestSet
+
+    Returns
+    -------
+    pandas.DataFrame
+        aggregated table
+    """
+    ex, _ = setup_experiment(testruns, "")
+    evalstring = """<?xml version="1.0" ?>
+<Evaluation comparecolformat="%.3f" index="ProblemName Seed Permutation GitHash"
+    indexsplit="-1" fillin="True">
+    <Column formatstr="%.2f" name="T" origcolname="SolvingTime" minval="0.5"
+    comp="quot shift. by 1" maxval="TimeLimit" alternative="TimeLimit"
+    reduction="shmean shift. by 1">
+        <Aggregation aggregation="shmean" name="sgm" shiftby="1.0"/>
+    </Column>
+    <Column formatstr="%.2f" origcolname="TimeLimit" alternative="{tl}"
+        reduction="mean">
+    </Column>
+    <FilterGroup name="all"/>
+    <FilterGroup name="clean">
+        <Filter anytestrun="all" expression1="_abort_" expression2="0" operator="eq"/>
+        <Filter anytestrun="all" expression1="_fail_" expression2="0" operator="eq"/>
+    </FilterGroup>
+    <FilterGroup name="all-optimal">
+        <Filter anytestrun="all" expression1="_abort_" expression2="0" operator="eq"/>
+        <Filter anytestrun="all" expression1="_fail_" expression2="0" operator="eq"/>
+        <Filter anytestrun="all" expression1="_solved_" expression2="1" operator="eq"/>
+    </FilterGroup>
+</Evaluation>
+        """.format(tl=time_limit)
+    ev = IPETEvaluation.fromXML(evalstring)
+    ev.set_validate(ALL_SOLU)
+    ev.set_feastol(tolerance)
+
+    set_defaultgroup(ev, ex, base_id)
+
+    # do evaluation
+    longtable, aggtable = ev.evaluate(ex)
+    return aggtable
@@ -1,37 +1,165 @@
 """Contains UploadApiEndpoint."""
 
-import logging
-from tornado.escape import json_encode
-from tornado.ioloop import IOLoop
-from tornado.gen import coroutine
+import re
+import json
+
+from tornado.escape import json_decode, json_encode
+from tornado.options import options
+from tornado.web import HTTPError, stream_request_body
 
 from .base import BaseHandler, authenticated
-from rubberband.utils import Importer, write_file, sendmail
-from rubberband.utils.importer import bundle_files
+from rubberband.handlers.common import import_files, StreamingUploadMixin
+from rubberband.models import TestSet, date_handler
+from rubberband.utils.jobs import JobQueue
+from rubberband.utils.stats import ImportStats
+
+# maximal number of hashes that can be checked with one request
+MAX_CHECK_HASHES = 10000
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadCheckEndpoint(BaseHandler):
+    """
+    Request handler telling which logfiles already exist before they are uploaded.
+
+    Clients send the sha256 hashes of the .out files they want to upload and only
+    upload the bundles that are reported as new.
+    """
+
+    @authenticated
+    def get(self):
+        """
+        Answer to GET requests.
+
+        Check the hashes given as (repeated or comma separated) `hash` arguments.
+        Write json response, see `check_hashes`.
+        """
+        hashes = []
+        for arg in self.get_query_arguments("hash"):
+            hashes.extend(h.strip() for h in arg.split(","))
+        self.write_check(hashes)
+
+    @authenticated
+    def post(self):
+        """
+        Answer to POST requests.
+
+        Check many hashes at once, the body is a json object {"hashes": [...]}.
+        Write json response, see `check_hashes`.
+        """
+        try:
+            hashes = json_decode(self.request.body)["hashes"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, reason='Expected a json object {"hashes": [...]}.')
+        if not isinstance(hashes, list) or not all(isinstance(h, str) for h in hashes):
+            raise HTTPError(400, reason="Expected a list of hashes.")
+        self.write_check(hashes)
+
+    def write_check(self, hashes):
+        """
+        Validate the hashes, look them up and write the response.
+
+        Parameters
+        ----------
+        hashes : list
+            sha256 hashes sent by the client
+        """
+        hashes = [h.lower() for h in hashes if h]
+        if not hashes:
+            raise HTTPError(400, reason="No hashes given.")
+        if len(hashes) > MAX_CHECK_HASHES:
+            raise HTTPError(
+                400, reason="At most {} hashes per request.".format(MAX_CHECK_HASHES)
+            )
+        invalid = [h for h in hashes if not SHA256_PATTERN.match(h)]
+        if invalid:
+            raise HTTPError(400, reason="Invalid sha256 hash {}.".format(invalid[0]))
+
+        response = check_hashes(hashes, self.application.base_url)
+        self.write(json.dumps(response, default=date_handler))
+
+    def check_xsrf_cookie(self):
+        """Turn off the xsrf cookie for upload api endpoint, since we check the user differently."""
+        pass
 
 
-class UploadAsyncEndpoint(BaseHandler):
+def check_hashes(hashes, url_base):
+    """
+    Look up which of the logfiles exist as TestSets.
+
+    Parameters
+    ----------
+    hashes : list
+        sha256 hashes of .out files
+    url_base : str
+        base url for response
+
+    Returns
+    -------
+    list
+        one dictionary per hash in the order of `hashes` with the keys "hash" and
+        "status" ("found" or "new"), found hashes also have "url", "uploader" and
+        "index_timestamp"
+    """
+    found = TestSet.find_by_hashes(hashes)
+    response = []
+    for h in hashes:
+        t = found.get(h)
+        if t is None:
+            response.append({"hash": h, "status": "new"})
+            continue
+        response.append(
+            {
+                "hash": h,
+                "status": "found",
+                "url": "{}/result/{}".format(url_base, t.meta.id),
+                "uploader": t.get_uploader,
+                "index_timestamp": t.index_timestamp,
+            }
+        )
+    return response
+
+
+@stream_request_body
+class UploadAsyncEndpoint(StreamingUploadMixin, BaseHandler):
     """Request handler handling the upload by api asynchronously."""
 
     @authenticated
-    @coroutine
+    def prepare(self):
+        """Called at the beginning of a request, start receiving uploaded files."""
+        self.start_upload()
+
+    @authenticated
     def put(self):
         """
         Answer to PUT requests.
 
-        The method that is called to upload files, spawn a callback to import_files.
-        Write json response.
+        The method that is called to upload files, queue an import job for them.
+        Write json response with the url to poll the status of the job.
         """
-        files = self.request.files.values()
-        tags = self.get_argument("tags", [])
-
-        IOLoop.current().spawn_callback(
-            import_files, files, tags, self.current_user, self.application.base_url
+        files = self.finish_upload()
+        tags = parse_tags(self.get_argument("tags", []))
+        expirationdate = self.get_argument("expirationdate", None)
+        notify = self.get_argument("notify", "true" if options.smtp_host else "false")
+
+        job_id = JobQueue().submit(
+            self.current_user,
+            [f.path for f in files],
+            tags=tags,
+            expirationdate=expirationdate,
+            url_base=self.application.base_url,
+            notify=notify.lower() in ("1", "true", "yes"),
+            hashes={f.path: f.sha256 for f in files},
         )
+
         self.set_status(202)  # Accepted
         json_response = make_response(
-            "queued", self.application.base_url, msg="Check your inbox."
+            "queued",
+            "{}/api/upload/jobs/{}".format(self.application.base_url, job_id),
+            msg="Poll the url for the status of the import.",
         )
+        json_response["job_id"] = job_id
 
         self.write(json_response)
 
@@ -40,21 +168,65 @@ class UploadAsyncEndpoint(BaseHandler):
         pass
 
 
-class UploadEndpoint(BaseHandler):
+class UploadJobEndpoint(BaseHandler):
+    """Request handler reporting the status of a queued import."""
+
+    @authenticated
+    def get(self, job_id):
+        """
+        Answer to GET requests.
+
+        Write json response with the status, the progress and the results of the job.
+
+        Parameters
+        ----------
+        job_id : str
+            id of the import job
+        """
+        job = JobQueue().get(job_id)
+        # don't reveal the jobs of other users
+        if job is None or job["user"] != self.current_user:
+            raise HTTPError(404)
+
+        url_base = self.application.base_url
+        self.write(
+            {
+                "job_id": job["id"],
+                "status": job["status"],
+                "created": job["created"],
+                "started": job["started"],
+                "finished": job["finished"],
+                "total": job["total"],
+                "done": job["done"],
+                "results": [
+                    make_import_response(ImportStats.from_dict(r), url_base)
+                    for r in job["results"]
+                ],
+            }
+        )
+
+
+@stream_request_body
+class UploadEndpoint(StreamingUploadMixin, BaseHandler):
     """Request handler handling the upload by api."""
 
     @authenticated
-    def put(self):
+    def prepare(self):
+        """Called at the beginning of a request, start receiving uploaded files."""
+        self.start_upload()
+
+    @authenticated
+    async def put(self):
         """
         Answer to PUT requests.
 
         The method that rbcli calls to upload files via commandline.
         Write json response.
         """
-        files = self.request.files.values()
+        files = self.finish_upload()
         tags = self.get_argument("tags", [])
         expirationdate = self.get_argument("expirationdate", None)
-        results = perform_import(
+        results = await perform_import(
             files, tags, self.current_user, expirationdate=expirationdate
         )
 
@@ -64,22 +236,10 @@ class UploadEndpoint(BaseHandler):
                 self.set_status(400)  # bad request
                 break
 
-        response = []
-        for result in results:
-            if result.fail:
-                response.append(
-                    make_response(
-                        result.status,
-                        self.application.base_url,
-                        basename=result.basename,
-                        errors=result.getMessages(),
-                    )
-                )
-            else:
-                url = "{}{}".format(self.application.base_url, result.getUrl())
-                response.append(
-                    make_response(result.status, url, basename=result.basename)
-                )
+        response = [
+            make_import_response(result, self.application.base_url)
+            for result in results
+        ]
 
         self.write(json_encode(response))
 
@@ -88,86 +248,83 @@ class UploadEndpoint(BaseHandler):
         pass
 
 
-@coroutine
-def import_files(paths, tags, user, url_base, expirationdate=None):
+async def perform_import(files, tags, user, expirationdate=None):
     """
-    Pass everything to import and report result back.
+    Preform the import in the compute service, the bundles are imported in parallel.
 
     Parameters
     ----------
-    paths : list of str
-        paths to files
-    tags : str
-        list of tags
+    files : list of UploadedFile
+        The files to be imported
+    tags : str or list
+        The tags associated to the files
     user : str
-        username
-    url_base : str
-        base url for response
+        The username
     expirationdate : str
-        expirationdate
+        The expirationdate
 
-    Sends an email to user after successfull import.
+    Returns
+    -------
+    ImportStats
+        result of import
     """
-    results = perform_import(paths, tags, user, expirationdate=expirationdate)
-
-    response = []
-    for result in results:
-        if result.fail:
-            response.append(
-                make_response(
-                    result.status,
-                    url_base,
-                    basename=result.basename,
-                    errors=result.getMessages(),
-                )
-            )
-        else:
-            url = "{}{}".format(url_base, result.getUrl())
-            response.append(
-                make_response(result.status, url=url, basename=result.basename)
-            )
-
-    logging.info("Sending an email to {}".format(user))
-    sendmail(response, user)
+    return await import_files(
+        [f.path for f in files],
+        user,
+        tags=parse_tags(tags),
+        expirationdate=expirationdate,
+        hashes={f.path: f.sha256 for f in files},
+    )
 
 
-def perform_import(files, tags, user, expirationdate=None):
+def parse_tags(tags):
     """
-    Preform the import.
+    Split the comma separated tags argument of a request.
 
     Parameters
     ----------
-    files : list of str
-        The files to be imported
     tags : str or list
-        The tags associated to the files
-    user : str
-        The username
-    expirationdate : str
-        The expirationdate
+        The tags argument, [] if it wasn't given
 
     Returns
     -------
-    ImportStats
-        result of import
+    list
+        stripped tags
     """
-    paths = []
-    for f in files:
-        paths.append(write_file(f[0]["filename"], f[0]["body"]))
-
     if tags != []:
         tags = tags.split(",")
         tags = list(map(str.strip, tags))
+    return tags
 
-    bundles = bundle_files(paths)
 
-    importstats = []
-    for bundle in bundles:
-        c = Importer(user=user)
-        c_stat = c.process_files(bundle, tags=tags, expirationdate=expirationdate)
-        importstats.append(c_stat)
+def make_import_response(result, url_base):
+    """
+    Construct the response dictionary of an imported bundle.
+
+    Parameters
+    ----------
+    result : ImportStats
+        result of the import
+    url_base : str
+        base url for response
 
-    return importstats
+    Returns
+    -------
+    dict
+        see `make_response`
+    """
+    if result.fail:
+        response = make_response(
+            result.status,
+            url_base,
+            basename=result.basename,
+            errors=result.getMessages(),
+        )
+    else:
+        url = "{}{}".format(url_base, result.getUrl())
+        response = make_response(result.status, url=url, basename=result.basename)
+    response["stats"] = result.getMetrics()
+    return response
 
 
 def make_response(status, url, basename="", msg="", errors=""):
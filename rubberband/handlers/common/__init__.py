@@ -1,6 +1,216 @@
 """Common methods for request handlers."""
 
+import os
+import shutil
+import asyncio
+import logging
+from collections import defaultdict
+
+from tornado.options import options
+from tornado.web import HTTPError, RequestHandler
+
+from rubberband.constants import FILES_DIR
 from rubberband.models import TestSet
+from rubberband.utils.archives import ArchiveError, unpack
+from rubberband.utils.compute import (
+    get_compute_service,
+    ComputeQueueFull,
+    ComputeTimeout,
+)
+from rubberband.utils.importer import bundle_files, failed_stats, import_bundle
+from rubberband.utils.multipart import (
+    MultipartStreamParser,
+    MultipartError,
+    remove_upload_dirs,
+)
+
+
+class StreamingUploadMixin(object):
+    """
+    Write multipart uploads to FILES_DIR while they are received.
+
+    Handlers using this mixin have to be decorated with `tornado.web.stream_request_body`
+    and call `start_upload` in `prepare` and `finish_upload` in the http method.
+    """
+
+    upload = None
+
+    def start_upload(self):
+        """Prepare to receive a multipart body of at most options.max_upload_size bytes."""
+        try:
+            self.upload = MultipartStreamParser.from_content_type(
+                self.request.headers.get("Content-Type", ""), FILES_DIR
+            )
+        except MultipartError:
+            # other bodies contain no files, they are ignored
+            return
+        self.request.connection.set_max_body_size(options.max_upload_size)
+
+    def data_received(self, chunk):
+        """Parse the next chunk of the body, called by tornado."""
+        if self.upload is not None:
+            self.upload.data_received(chunk)
+
+    def finish_upload(self, xsrf=False, name=None):
+        """
+        Complete the upload and make the form fields available to `get_argument`.
+
+        Parameters
+        ----------
+        xsrf : bool
+            check the xsrf token, tornado can't do it before the form fields arrived
+            (default False)
+        name : str
+            name of the form field whose files are used, the other files are removed
+            (default None, use all files)
+
+        Returns
+        -------
+        list
+            UploadedFiles of the request
+
+        Raises
+        ------
+        HTTPError
+            400 if the body was no valid multipart body, 403 if the xsrf check failed
+        """
+        upload, self.upload = self.upload, None
+        if upload is None:
+            return []
+        try:
+            upload.finish()
+        except MultipartError as e:
+            raise HTTPError(400, reason=str(e))
+
+        for field, values in upload.fields.items():
+            self.request.body_arguments.setdefault(field, []).extend(values)
+            self.request.arguments.setdefault(field, []).extend(values)
+
+        if xsrf:
+            try:
+                RequestHandler.check_xsrf_cookie(self)
+            except HTTPError:
+                upload.abort()
+                raise
+        if name is not None:
+            return upload.discard(name)
+        return upload.files
+
+    def on_connection_close(self):
+        """Remove the files of an upload that was interrupted before it was complete."""
+        if self.upload is not None:
+            self.upload.abort()
+        super().on_connection_close()
+
+
+async def compute(fn, *args, **kwargs):
+    """
+    Run a CPU bound function in the compute service without blocking the IOLoop.
+
+    Parameters
+    ----------
+    fn : function
+        module level function to call in a worker process
+
+    Returns
+    -------
+        return value of fn
+
+    Raises
+    ------
+    HTTPError
+        503 if the compute service is busy, 504 if the task timed out
+    """
+    try:
+        return await get_compute_service().run(fn, *args, **kwargs)
+    except ComputeQueueFull:
+        raise HTTPError(503, reason="Server busy, please try again later.")
+    except ComputeTimeout:
+        raise HTTPError(504, reason="Computation took too long.")
+
+
+# limits the number of bundles of a user that are imported at the same time
+_import_slots = defaultdict(lambda: asyncio.Semaphore(options.import_concurrency))
+
+
+async def import_files(paths, user, tags=[], expirationdate=None, hashes=None):
+    """
+    Import the bundles of uploaded files in parallel in the compute service.
+
+    A user imports at most options.import_concurrency bundles at the same time (per
+    server process), such that the compute workers stay available for other users.
+    Compressed files and archives are unpacked first. A bundle that can't be imported
+    because the compute service is busy or too slow fails on its own, and the files
+    that weren't imported are removed.
+
+    Parameters
+    ----------
+    paths : list str
+        paths of the uploaded files
+    user : str
+        current user
+    tags : list
+        tags to add to the TestSets (default [])
+    expirationdate : str in date form
+        Date after which data can be purged from elasticsearch (default: None)
+    hashes : dict
+        sha256 hashes of the files computed during the upload (default None)
+
+    Returns
+    -------
+    list
+        ImportStats of the bundles, in the order of `bundle_files`
+
+    Raises
+    ------
+    HTTPError
+        400 if a compressed file or archive couldn't be unpacked
+    """
+    slots = _import_slots[user]
+    uploaded = paths
+
+    # decompressing mostly waits for the disk, a thread keeps the IOLoop responsive
+    try:
+        paths, hashes, directories = await asyncio.get_running_loop().run_in_executor(
+            None, unpack, paths, hashes, options.max_unpacked_size
+        )
+    except ArchiveError as e:
+        remove_upload_dirs(uploaded)
+        raise HTTPError(400, reason=str(e))
+
+    async def run(bundle):
+        async with slots:
+            return await compute(
+                import_bundle,
+                bundle,
+                user,
+                tags=tags,
+                expirationdate=expirationdate,
+                hashes=hashes,
+            )
+
+    bundles = bundle_files(paths)
+    try:
+        results = await asyncio.gather(
+            *[run(bundle) for bundle in bundles], return_exceptions=True
+        )
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+        remove_upload_dirs(uploaded)
+
+    for i, result in enumerate(results):
+        if isinstance(result, HTTPError):
+            results[i] = failed_stats(bundles[i], result.reason)
+        elif isinstance(result, BaseException):
+            logging.getLogger(__name__).error(
+                "Import of {} failed.".format(bundles[i]), exc_info=result
+            )
+            results[i] = failed_stats(bundles[i], str(result))
+    return results
 
 
 def search(query):
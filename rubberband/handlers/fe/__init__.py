@@ -14,3 +14,4 @@ from .download import DownloadView  # noqa
 from .visualize import VisualizeView  # noqa
 from .evaluation import EvaluationView  # noqa
 from .display import DisplayView  # noqa
+from .metrics import ImportMetricsEndpoint  # noqa
@@ -31,7 +31,8 @@ class DownloadView(BaseHandler):
 
         if testsets != "" and evaluation == "":
             ts_ids = testsets.split(",")
-            ts_list = load_testsets(ts_ids)
+            # only the raw files are packed, results and settings are not needed
+            ts_list = load_testsets(ts_ids, results=False, settings=False)
 
             zipname = "rubberband_testsets.zip"
             with BytesIO() as byteio:
@@ -11,6 +11,8 @@ from .base import BaseHandler
 from rubberband.constants import IPET_EVALUATIONS, NONE_DISPLAY, EVAL_FILE
 from rubberband.models import TestSet
 from rubberband.utils import RBLogHandler, ALL_SOLU
+from rubberband.utils.evalcache import EvaluationCache
+from rubberband.handlers.common import compute
 from rubberband.utils.helpers import get_rbid_representation, setup_testruns_subst_dict
 
 from ipet import Experiment, TestRun
@@ -20,11 +22,11 @@ from ipet.evaluation import IPETEvaluation
 class EvaluationView(BaseHandler):
     """Request handler caring about the evaluation of sets of TestRuns."""
 
-    def get(self, eval_id):
+    async def get(self, eval_id):
         """
         Answer to GET requests.
 
-        Evaluate TestRuns with IPET, read id of evaluation file from URL. Writes latex version
+        Evaluate TestRuns with IPET in the compute service, read id of evaluation file from URL. Writes latex version
         of ipet-agg-table via file.html if style option in url is `latex`, else it writes
         ipet-long-table and ipet-aggregated-table into a json dict.
 
@@ -64,89 +66,59 @@ class EvaluationView(BaseHandler):
         # read defaultgroup
         default_id = self.get_argument("default", testrunids[0])
 
-        # get testruns and default
-        testruns = get_testruns(testrunids)
+        # get testruns and default, their results are only needed for a new evaluation
+        testruns = get_testruns(testrunids, results=False)
 
-        # evaluate with ipet
-        ex, excluded_inst = setup_experiment(testruns, droplist)
-        ev = setup_evaluation(
-            evalfile,
-            ALL_SOLU,
-            tolerance,
-            evalstring=(style is not None and style == "latex"),
+        # look for a previous evaluation of the same comparison
+        cache = EvaluationCache()
+        cachekey = cache.make_key(
+            testruns, evalfile, tolerance, droplist, default_id, style
         )
-
-        # set defaultgroup
-        set_defaultgroup(ev, ex, default_id)
-
-        # do evaluation
-        longtable, aggtable = ev.evaluate(ex)
-
-        # None style is default
-        if style is None:
-            # add filtergroup buttons to ipet long table
-            fg_buttons_str, longtable["Filtergroups"] = generate_filtergroup_selector(
-                longtable, ev
-            )
-
-            # get substitutions dictionary
-            repres = setup_testruns_subst_dict(testruns)
-
-            cols_dict = get_columns_dict(
-                longtable, {**repres["short"], **repres["all"]}
-            )
-
-            # add id column to longtable
-            longtable.insert(0, "id", range(1, len(longtable) + 1))
-            delcols = [i for i in longtable.columns if i[-1] == "groupTags"]
-            longtable = longtable.drop(delcols, axis=1)
-
-            # convert to html and get style
+        evaluated = cache.get(cachekey)
+        if evaluated is None:
+            TestSet.load_snapshots_many(testruns)
             add_classes = " ".join(
                 [self.rb_dt_borderless, self.rb_dt_compact]
             )  # style for table
-            html_long = table_to_html(
-                longtable, ev, html_id="ipet-long-table", add_class=add_classes
-            )
-            html_agg = table_to_html(
-                aggtable, ev, html_id="ipet-aggregated-table", add_class=add_classes
+            evaluated = await compute(
+                evaluate_testruns,
+                testruns,
+                evalfile,
+                tolerance,
+                droplist,
+                default_id,
+                style,
+                add_classes,
             )
+            cache.put(cachekey, testruns, evaluated)
 
+        # None style is default
+        if style is None:
             # ipetlogger.removeHandler(rbhandler)
             rbhandler.close()
 
-            # postprocessing
-            html_long = process_ipet_table(
-                html_long,
-                {**repres["short"], **repres["all"]},
-                add_ind=False,
-                swap=True,
-            )
-            html_agg = process_ipet_table(
-                html_agg, {**repres["long"], **repres["all"]}, add_ind=True, swap=False
-            )
-
-            message = ", ".join(sorted(list(set(excluded_inst))))
+            message = evaluated["excluded"]
             print(message)
             # render to strings
             html_tables = self.render_string(
                 "results/evaluation.html",
-                ipet_long_table=html_long,
-                ipet_aggregated_table=html_agg,
-                columns=cols_dict,
+                ipet_long_table=evaluated["html_long"],
+                ipet_aggregated_table=evaluated["html_agg"],
+                columns=evaluated["columns"],
                 psmessage=message,
             ).decode("utf-8")
 
             # send evaluated data
             mydict = {
                 "rb-ipet-eval-result": html_tables,
-                "rb-ipet-buttons": fg_buttons_str,
+                "rb-ipet-buttons": evaluated["buttons"],
             }
             response = json.dumps(mydict)
             self.write(response)
             self.flush()
 
         elif style == "latex":
+            aggtable = evaluated["aggtable"]
             if aggtable.empty:
                 self.write_error(
                     status_code=204, msg="Sorry, aggregated table is empty. Aborting."
@@ -264,6 +236,96 @@ class EvaluationView(BaseHandler):
             self.render("file.html", contents=out)
 
 
+def evaluate_testruns(
+    testruns, evalfile, tolerance, droplist, default_id, style=None, add_class=""
+):
+    """
+    Evaluate TestRuns with IPET.
+
+    Parameters
+    ----------
+    testruns : list
+        rubberband TestSets with loaded Results
+    evalfile : dict or str
+        entry of IPET_EVALUATIONS or the xml string of the evaluation if style is `latex`
+    tolerance : float
+        tolerance for validation
+    droplist : str
+        comma separated regular expressions of instances to exclude
+    default_id : str
+        id of the TestSet that defines the default group
+    style : str
+        None for the html tables or `latex` (default None)
+    add_class : str
+        additional css classes of the html tables (default "")
+
+    Returns
+    -------
+    dict
+        for style None the processed html tables, their columns, the filtergroup selector
+        and the excluded instances; for style `latex` the aggregated table.
+    """
+    # evaluate with ipet
+    ex, excluded_inst = setup_experiment(testruns, droplist)
+    ev = setup_evaluation(
+        evalfile,
+        ALL_SOLU,
+        tolerance,
+        evalstring=(style is not None and style == "latex"),
+    )
+
+    # set defaultgroup
+    set_defaultgroup(ev, ex, default_id)
+
+    # do evaluation
+    longtable, aggtable = ev.evaluate(ex)
+
+    if style is not None:
+        return {"aggtable": aggtable}
+
+    # add filtergroup buttons to ipet long table
+    fg_buttons_str, longtable["Filtergroups"] = generate_filtergroup_selector(
+        longtable, ev
+    )
+
+    # get substitutions dictionary
+    repres = setup_testruns_subst_dict(testruns)
+
+    cols_dict = get_columns_dict(longtable, {**repres["short"], **repres["all"]})
+
+    # add id column to longtable
+    longtable.insert(0, "id", range(1, len(longtable) + 1))
+    delcols = [i for i in longtable.columns if i[-1] == "groupTags"]
+    longtable = longtable.drop(delcols, axis=1)
+
+    # convert to html and get style
+    html_long = table_to_html(
+        longtable, ev, html_id="ipet-long-table", add_class=add_class
+    )
+    html_agg = table_to_html(
+        aggtable, ev, html_id="ipet-aggregated-table", add_class=add_class
+    )
+
+    # postprocessing
+    html_long = process_ipet_table(
+        html_long,
+        {**repres["short"], **repres["all"]},
+        add_ind=False,
+        swap=True,
+    )
+    html_agg = process_ipet_table(
+        html_agg, {**repres["long"], **repres["all"]}, add_ind=True, swap=False
+    )
+
+    return {
+        "html_long": html_long,
+        "html_agg": html_agg,
+        "columns": cols_dict,
+        "buttons": fg_buttons_str,
+        "excluded": ", ".join(sorted(list(set(excluded_inst)))),
+    }
+
+
 def get_column_formatters(df):
     """
     Get the formatters for a dataframe.
@@ -388,6 +450,8 @@ def setup_experiment(testruns, droplist=""):
             regexlist.append(y)
         except Exception:
             pass
+    # an instance is dropped if any of the expressions matches its beginning
+    droppattern = "|".join("(?:{})".format(r.pattern) for r in regexlist)
 
     excluded_inst = []
     # get data
@@ -397,18 +461,14 @@ def setup_experiment(testruns, droplist=""):
 
         # collect data and pass to ipet
         ipettestrun = TestRun()
-        tr_raw_data = t.get_data(add_data=additional_data)
+        tr_data = t.to_frame(add_data=additional_data)
 
-        tr_data = {}
-        for i in tr_raw_data.keys():
-            for r in regexlist:
-                if r.match(i):
-                    excluded_inst.append(i)
-                    break
-            else:
-                tr_data[i] = tr_raw_data[i]
+        if droppattern:
+            dropped = tr_data.index.str.match(droppattern, na=False)
+            excluded_inst.extend(tr_data.index[dropped])
+            tr_data = tr_data[~dropped]
 
-        ipettestrun.data = pd.DataFrame(tr_data).T
+        ipettestrun.data = tr_data
 
         ex.testruns.append(ipettestrun)
     return ex, excluded_inst
@@ -527,7 +587,7 @@ def table_to_html(df, ev, html_id="", add_class=""):
     return html.fromstring(htmlstr)
 
 
-def get_testruns(testrunids):
+def get_testruns(testrunids, results=True):
     """
     Collect testruns from the ids.
 
@@ -535,6 +595,8 @@ def get_testruns(testrunids):
     ----------
     testrunids : list or string
         list of testrun ids or a single one
+    results : bool
+        load the Results of a list of testruns (default True)
 
     Returns
     -------
@@ -544,11 +606,7 @@ def get_testruns(testrunids):
     if type(testrunids) is not list:
         return TestSet.get(id=testrunids)
 
-    testruns = []
-    for i in testrunids:
-        t = TestSet.get(id=i)
-        testruns.append(t)
-    return testruns
+    return TestSet.get_many(testrunids, results=results)
 
 
 def setup_evaluation(evalfile, solufile, tolerance, evalstring=False):
@@ -41,6 +41,8 @@ class FileView(BaseHandler):
             obj = Result.get(id=instance_id, routing=file_id)
         else:
             obj = TestSet.get(id=file_id)
+        if obj is None:
+            raise HTTPError(404)
 
         # e.g. `result.json(ftype=".set")`
         file_contents = getattr(obj, fformat)(ftype=ftype)
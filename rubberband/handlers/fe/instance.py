@@ -1,11 +1,16 @@
 """Contains InstanceView."""
 
 import json
-from elasticsearch.dsl import A
+from tornado.web import HTTPError
 
-from rubberband.models import TestSet, Result
+from rubberband.models import TestSet, Result, Instance
 from .base import BaseHandler
 
+# maximal number of names per request of a prefix search
+MAX_INSTANCE_NAMES = 1000
+# seconds that browsers may reuse the list of instance names
+NAMES_MAX_AGE = 300
+
 
 class InstanceView(BaseHandler):
     """Request handler handling requests for a single instance."""
@@ -24,6 +29,8 @@ class InstanceView(BaseHandler):
         Renders `instance_detail_view.html`.
         """
         r = Result.get(id=result_id)
+        if r is None:
+            raise HTTPError(404)
         count = Result.search().filter("term", instance_name=r.instance_name).count()
 
         compare = self.get_argument("compare", default=[])
@@ -49,14 +56,21 @@ class InstanceNamesEndpoint(BaseHandler):
 
         Used for `visualize` tab instance search typeahead.
 
-        Write a list of all instance names in Elasticsearch.
+        Write a sorted list of the instance names in Elasticsearch. With the query
+        parameter `q` only names starting with `q` are returned, at most `limit` many.
         """
-        s = Result.search()
-        a = A("terms", field="instance_name", size=1000000)
-        s.aggs.bucket("unique_instances", a)
-        res = s.execute()
-        names = [x["key"] for x in res.aggregations["unique_instances"]["buckets"]]
-
+        prefix = self.get_argument("q", default="")
+        limit = self.get_argument("limit", default=None)
+        if limit is not None:
+            try:
+                limit = min(int(limit), MAX_INSTANCE_NAMES)
+            except ValueError:
+                raise HTTPError(400)
+
+        names = Instance.names(prefix=prefix, limit=limit)
+
+        # tornado answers with 304 if the ETag of the response matches If-None-Match
+        self.set_header("Cache-Control", "private, max-age={}".format(NAMES_MAX_AGE))
         return self.write(json.dumps(names))
 
 
@@ -94,11 +108,4 @@ def load_results(testset_ids, name):
     list
         List of Results
     """
-    results = []
-
-    for id in testset_ids:
-        f = TestSet.get(id=id)
-        f.load_results()
-        results.append(f.results[name])
-
-    return results
+    return [f.results[name] for f in TestSet.get_many(testset_ids, results=True)]
@@ -0,0 +1,34 @@
+"""Contains ImportMetricsEndpoint."""
+
+import json
+import time
+from tornado.web import HTTPError
+
+from rubberband.utils.metrics import ImportMetrics
+from .base import BaseHandler
+
+
+class ImportMetricsEndpoint(BaseHandler):
+    """Summarize the timings and memory usage of the recent imports for admins."""
+
+    def get(self):
+        """
+        Answer to GET requests.
+
+        Write the percentiles of the stage timings, counters, peak memory and throughput
+        of the recent imports as json. With the query parameter `hours` only the
+        imports of the last hours are considered.
+        """
+        if not self.has_permission(action="delete"):
+            raise HTTPError(403)
+
+        hours = self.get_argument("hours", default=None)
+        since = None
+        if hours is not None:
+            try:
+                since = time.time() - float(hours) * 3600
+            except ValueError:
+                raise HTTPError(400)
+
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps(ImportMetrics().summary(since=since)))
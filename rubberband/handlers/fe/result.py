@@ -5,7 +5,10 @@ import logging
 
 from .base import BaseHandler
 from rubberband.models import TestSet
-from rubberband.utils import Importer, write_file
+from rubberband.utils import write_file
+from rubberband.utils.importer import reimport_bundle
+from rubberband.handlers.common import compute
+from rubberband.utils.evalcache import EvaluationCache
 from rubberband.utils.helpers import setup_testruns_subst_dict, get_rbid_representation
 from rubberband.constants import EXPORT_FILE_TYPES, IPET_EVALUATIONS
 
@@ -24,21 +27,16 @@ class ResultView(BaseHandler):
         """
         if not testset_id:
             raise HTTPError(404)
-        testset = TestSet.get(id=testset_id, ignore=404)
 
-        if not testset:
-            raise HTTPError(404)
-
-        # get data associated with TestSet, save in testset.results[]
-        testset.load_results()
-        testset.load_settings()
-
-        compare = []
+        compare_ids = []
         comparelist = self.get_argument("compare", default=None)
-
         if comparelist:
             compare_ids = comparelist.split(",")
-            compare = load_testsets(compare_ids)
+
+        # get data associated with TestSets, save in testset.results[]
+        testset, *compare = load_testsets([testset_id] + compare_ids)
+
+        if compare:
             all_runs = [testset] + compare
             # save intersection results and difference results
             sets = get_intersection_difference(
@@ -62,11 +60,10 @@ class ResultView(BaseHandler):
         meta = list(set(metas))
         meta.sort()
 
+        file_types = testset.file_types()
         fileoptions = {}
         for ftype in EXPORT_FILE_TYPES:
-            obj = TestSet.get(id=testset_id)
-            file_contents = getattr(obj, "raw")(ftype=ftype)
-            fileoptions[ftype] = file_contents is not None
+            fileoptions[ftype] = ftype.lstrip(".") in file_types
 
         # sort testruns by their representation and render table
         # get substitutions dictionary
@@ -122,7 +119,7 @@ class ResultView(BaseHandler):
             t.save()
         self.redirect(next_url)
 
-    def put(self, testset_id):
+    async def put(self, testset_id):
         """
         Answer to PUT requests.
 
@@ -144,16 +141,26 @@ class ResultView(BaseHandler):
         if "out" not in t.files.to_dict().keys():
             raise HTTPError(404)
             return
-        t.delete_all_results()
 
-        # write all files to local directory
+        # write all files to local directory, the Results are updated by the reimport
         paths = []
         for k in t.files:
-            paths.append(write_file(t.files[k].filename, str.encode(t.files[k].text)))
+            paths.append(
+                write_file(t.files[k].filename, str.encode(t.files[k].contents()))
+            )
         paths = tuple(paths)
 
-        c = Importer(user=self.current_user)
-        c.reimport_files(paths, t)
+        # parsing with IPET blocks, it runs in the compute service like an upload
+        importstats = await compute(
+            reimport_bundle, paths, t.meta.id, self.current_user
+        )
+        # Results that were updated before a failure are changed as well
+        EvaluationCache().invalidate(t.meta.id)
+        if importstats.fail or importstats.status == "fail":
+            logging.error(
+                "Reimport of {} failed: {}".format(t.meta.id, importstats.getMessages())
+            )
+            raise HTTPError(500, reason="Reimport failed.")
 
         msg = "{} updated by {}".format(t.meta.id, self.current_user)
         logging.info(msg)
@@ -179,37 +186,35 @@ class ResultView(BaseHandler):
         # remove from db
         t.delete_all_associations()
         t.delete()
+        EvaluationCache().invalidate(t.meta.id)
 
         msg = "{} deleted {}".format(self.current_user, t.meta.id)
         logging.info(msg)
 
 
-def load_testsets(ids):
+def load_testsets(ids, results=True, settings=True):
     """
-    Load TestSets and their associated Results.
+    Load TestSets and their associated Results and Settings.
 
     Parameters
     ----------
     ids : list
         List of ids of TestSets
+    results : bool
+        Load the Results of the TestSets (default True)
+    settings : bool
+        Load the Settings of the TestSets (default True)
 
     Returns
     -------
     list
         List of TestSets
     """
-    tss = []
     try:
-        for id in ids:
-            t = TestSet.get(id=id)
-            t.load_results()
-            t.load_settings()
-            tss.append(t)
+        return TestSet.get_many(ids, results=results, settings=settings)
     except Exception:
         raise HTTPError(404)
 
-    return tss
-
 
 def get_same_status(runs):
     """
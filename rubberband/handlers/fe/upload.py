@@ -1,13 +1,25 @@
 """Contains UploadView."""
 
-from rubberband.utils import Importer, write_file
-from rubberband.utils.importer import bundle_files
+from tornado.web import stream_request_body
+
+from rubberband.handlers.common import import_files, StreamingUploadMixin
 from .base import BaseHandler
 
 
-class UploadView(BaseHandler):
+@stream_request_body
+class UploadView(StreamingUploadMixin, BaseHandler):
     """Request handler handling the upload form."""
 
+    def prepare(self):
+        """Called at the beginning of a request, start receiving uploaded files."""
+        super().prepare()
+        if self.request.method == "POST" and not self._finished:
+            self.start_upload()
+
+    def check_xsrf_cookie(self):
+        """Check the xsrf token in `post`, the form fields arrive only with the body."""
+        pass
+
     def get(self):
         """
         Answer to GET requests.
@@ -17,15 +29,15 @@ class UploadView(BaseHandler):
         """
         self.render("upload.html", page_title="Upload", infos=[])
 
-    def post(self):
+    async def post(self):
         """
         Answer to POST requests.
 
         The method that the rubberband UI calls to upload files.
         Renders `upload.html` containing log messages about upload.
         """
-        paths = []
-        files = self.request.files.get("resultFiles")
+        files = self.finish_upload(xsrf=True, name="resultFiles")
+
         expirationdate = self.get_argument("expirationdate", None)
         if expirationdate == "":
             expirationdate = None
@@ -35,21 +47,19 @@ class UploadView(BaseHandler):
             tags = tags.split(",")
             tags = list(map(str.strip, tags))
 
-        if files is None:
+        if not files:
             self.redirect("/upload")
-        # write all files to local directory
-        for f in files:
-            paths.append(write_file(f["filename"], f["body"]))
+            return
 
         infos = []
-        bundles = bundle_files(paths)
-        for bundle in bundles:
-            # Importer helps us process the uploaded files
-            c = Importer(user=self.current_user)
-            importstats = c.process_files(
-                bundle, tags=tags, expirationdate=expirationdate
-            )
-
+        results = await import_files(
+            [f.path for f in files],
+            self.current_user,
+            tags=tags,
+            expirationdate=expirationdate,
+            hashes={f.path: f.sha256 for f in files},
+        )
+        for importstats in results:
             info = {}
             info["messages"] = importstats.getMessages()
             url = importstats.getUrl()
@@ -1,10 +1,29 @@
 """Define data models and methods."""
 
+import io
 import gzip
 import json
+import bisect
+import hashlib
 import datetime
 import logging
-from elasticsearch.dsl import Boolean, Document, Text, Keyword, Date, Nested, Integer
+from collections import Counter, defaultdict
+import numpy as np
+import pandas as pd
+from elasticsearch.helpers import bulk
+from elasticsearch.dsl.connections import connections
+from elasticsearch.dsl import (
+    Binary,
+    Boolean,
+    Document,
+    Text,
+    Keyword,
+    Date,
+    Nested,
+    Integer,
+    Long,
+    Q,
+)
 from ipet import Key
 
 from rubberband.constants import (
@@ -12,22 +31,34 @@ from rubberband.constants import (
     INFINITY_MASK,
     INFINITY_FLOAT,
     FILE_INDEX,
+    FILE_CHUNK_INDEX,
+    FILE_CHUNK_SIZE,
     RESULT_INDEX,
     TESTSET_INDEX,
     SETTINGS_INDEX,
+    INSTANCE_INDEX,
+    SNAPSHOT_INDEX,
+    SNAPSHOT_FORMAT,
 )
+from .partitions import PartitionedDocument
+
 
+class File(PartitionedDocument, Document):
+    """
+    The definition of a File object. A `File` contains the raw contents of a log file.
 
-class File(Document):
-    """The definition of a File object. A `File` contains the raw contents of a log file."""
+    FILE_INDEX is an alias of the partitions, see `TestSet.partition`.
+    """
 
     type = Keyword(required=True)  # out, set, err, solu
     filename = Keyword(required=True)  # check.MMM.scip-021ace1...out
     hash = Keyword(required=True)  # computed hash
     testset_id = Keyword(required=True)  # for application-side joins
-    text = Text(
-        index=False, required=True
-    )  # this field is not indexed and is not searchable
+    chunks = Keyword(multi=True)  # ids of the FileChunks holding the contents
+    chunk_lines = Integer(multi=True)  # number of the first line of each chunk
+    size = Long()  # uncompressed size in bytes
+    # contents of files that were stored before the chunks, see `rubberband-ctl migrate_files`
+    text = Text(index=False)  # this field is not indexed and is not searchable
 
     class Index:
         name = FILE_INDEX
@@ -36,8 +67,225 @@ class File(Document):
         """Return a string description of the file object."""
         return "File {} {}".format(self.filename, self.type)
 
+    def set_contents(self, data):
+        """
+        Split the contents of the file into compressed chunks.
+
+        The chunks still have to be saved, see `FileChunk.missing`.
+
+        Parameters
+        ----------
+        data : bytes
+            contents of the file
+
+        Returns
+        -------
+        list
+            FileChunks of the file
+        """
+        pieces = split_chunks(data)
+        chunks = [FileChunk.from_data(piece) for piece in pieces]
+        self.chunks = [c.meta.id for c in chunks]
+        self.chunk_lines = []
+        lines = 0
+        for piece in pieces:
+            self.chunk_lines.append(lines)
+            lines += piece.count(b"\n")
+        self.size = len(data)
+        self.text = None
+        return chunks
+
+    @classmethod
+    def find(cls, testset_id, ftype=".out"):
+        """
+        Look up the file of a TestSet.
+
+        Parameters
+        ----------
+        testset_id : str
+            id of the TestSet
+        ftype : str
+            extension of the file (default ".out")
+
+        Returns
+        -------
+        File
+            the file or None if the TestSet has no such file
+        """
+        s = cls.search()
+        s = s.filter("term", testset_id=testset_id)
+        s = s.filter("term", type=ftype.lstrip("."))
+        try:
+            return s.execute()[0]
+        except IndexError:
+            return None
+
+    def read(self):
+        """Return the contents of the file as bytes."""
+        if not self.chunks:
+            return None if self.text is None else self.text.encode("utf-8")
+        return b"".join(c.decompress() for c in FileChunk.load(self.chunks))
+
+    def contents(self):
+        """Return the contents of the file as a string."""
+        if not self.chunks:
+            return self.text
+        return self.read().decode("utf-8", "replace")
+
+    def lines(self, begin, end):
+        """
+        Return a range of lines of the file, loading only the chunks containing them.
+
+        Parameters
+        ----------
+        begin : int
+            index of the first line
+        end : int
+            index after the last line
+
+        Returns
+        -------
+        list
+            the lines without line breaks
+        """
+        if not self.chunks or not self.chunk_lines:
+            # files that were stored without line index
+            contents = self.contents() or ""
+            return contents.splitlines()[begin:end]
+
+        first = max(bisect.bisect_right(self.chunk_lines, begin) - 1, 0)
+        last = max(bisect.bisect_left(self.chunk_lines, end), first + 1)
+        data = b"".join(c.decompress() for c in FileChunk.load(self.chunks[first:last]))
+        offset = self.chunk_lines[first]
+        # chunks end with a line break, except for the last one of a file
+        lines = data.decode("utf-8", "replace")
+        if lines.endswith("\n"):
+            lines = lines[:-1]
+        return lines.split("\n")[begin - offset : end - offset]
+
+
+class FileChunk(Document):
+    """
+    A gzip compressed piece of a log file.
+
+    The id of a chunk is the sha256 hash of its contents, such that identical chunks,
+    e.g. of the settings files of different runs, are stored only once.
+    """
+
+    data = Binary(required=True)
+    size = Integer()  # uncompressed size in bytes
+    created = Date()
+
+    class Index:
+        name = FILE_CHUNK_INDEX
+
+    def __str__(self):
+        """Return a string description of the chunk object."""
+        return "FileChunk {}".format(self.meta.id)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Compress a piece of a file.
+
+        Parameters
+        ----------
+        data : bytes
+            uncompressed contents of the chunk
+        """
+        return cls(
+            meta={"id": hashlib.sha256(data).hexdigest()},
+            data=gzip.compress(data),
+            size=len(data),
+            created=datetime.datetime.now(),
+        )
+
+    def decompress(self):
+        """Return the uncompressed contents of the chunk."""
+        return gzip.decompress(self.data)
+
+    @classmethod
+    def load(cls, ids):
+        """
+        Load chunks with a single request.
+
+        Parameters
+        ----------
+        ids : list
+            ids of the chunks, may contain duplicates
 
-class Result(Document):
+        Returns
+        -------
+        list
+            the chunks in the order of ids
+        """
+        unique = list(dict.fromkeys(ids))
+        chunks = dict(zip(unique, cls.mget(unique, missing="raise")))
+        return [chunks[i] for i in ids]
+
+    @classmethod
+    def missing(cls, chunks):
+        """
+        Filter out the chunks that are already stored.
+
+        The stored chunks are marked as used now, such that `delete_unreferenced`
+        keeps them until the File that reuses them is saved.
+
+        Parameters
+        ----------
+        chunks : list
+            FileChunks
+
+        Returns
+        -------
+        list
+            the FileChunks that still have to be saved
+        """
+        unique = {c.meta.id: c for c in chunks}
+        absent = _touch(FILE_CHUNK_INDEX, list(unique))
+        return [c for i, c in unique.items() if i in absent]
+
+    @classmethod
+    def delete_unreferenced(cls, min_age=datetime.timedelta(days=1)):
+        """
+        Delete chunks that no File refers to anymore.
+
+        Parameters
+        ----------
+        min_age : datetime.timedelta
+            keep chunks that were stored or reused more recently, their File might not
+            be saved yet (default one day)
+
+        Returns
+        -------
+        int
+            number of deleted chunks
+        """
+        referenced = set()
+        for f in File.search().source(["chunks"]).scan():
+            referenced.update(f.chunks or [])
+
+        old = cls.search().filter(
+            "range", created={"lt": datetime.datetime.now() - min_age}
+        )
+        orphans = [
+            c.meta.id for c in old.source(False).scan() if c.meta.id not in referenced
+        ]
+
+        deleted = 0
+        for i in range(0, len(orphans), 1000):
+            batch = orphans[i : i + 1000]
+            # a File might have been saved in the meantime
+            s = File.search().filter("terms", chunks=batch).source(["chunks"])
+            batch = set(batch) - {c for f in s.scan() for c in f.chunks}
+            if batch:
+                # chunks that were reused since the search are younger or changed
+                s = old.filter("ids", values=list(batch)).params(conflicts="proceed")
+                deleted += s.delete().deleted
+        return deleted
+
+
+class Result(PartitionedDocument, Document):
     """
     The definition of a result object. A `Result` is the result of a single instance run.
 
@@ -55,6 +303,8 @@ class Result(Document):
         json
         csv
         gzip
+
+    RESULT_INDEX is an alias of the partitions, see `TestSet.partition`.
     """
 
     testset_id = Keyword(required=True)
@@ -82,16 +332,18 @@ class Result(Document):
         ftype : str
             extension of file to get data from (default ".out")
         """
-        testset = TestSet.get(id=self.testset_id)
-        whole_file = testset.raw(ftype=".out")
         # TODO: remove this once integer/ipet#20 is resolved
         # this is a hack for optimization/rubberband#41
         if hasattr(self, "LineNumbers_BeginLogFile") and hasattr(
             self, "LineNumbers_EndLogFile"
         ):
-            parts = whole_file.splitlines()[
-                int(self.LineNumbers_BeginLogFile) : int(self.LineNumbers_EndLogFile)
-            ]
+            logfile = File.find(self.testset_id, ftype=".out")
+            if logfile is None:
+                return None
+            # only the chunks containing the instance are loaded
+            parts = logfile.lines(
+                int(self.LineNumbers_BeginLogFile), int(self.LineNumbers_EndLogFile)
+            )
             return "\n".join(parts)
         else:
             return "Unable to locate instance in out file :("
@@ -130,6 +382,174 @@ class Result(Document):
         raise NotImplementedError()
 
 
+class ResultSnapshot(Document):
+    """
+    The Results of a TestSet as one compressed, columnar blob.
+
+    Loading a snapshot replaces scanning all Results of a TestSet. A snapshot is only
+    valid for the TestSet whose `snapshot_version` equals its `version`, every
+    (re)import writes a new one.
+    """
+
+    testset_id = Keyword(required=True)
+    version = Keyword(required=True)
+    format = Integer()
+    data = Binary(required=True)  # npz archive, see `encode_frame`
+    rows = Integer()
+    columns = Integer()
+    size = Long()  # compressed size in bytes
+    created = Date()
+
+    class Index:
+        name = SNAPSHOT_INDEX
+
+    def __str__(self):
+        """Return a string description of the snapshot object."""
+        return "ResultSnapshot {}".format(self.testset_id)
+
+    @classmethod
+    def from_records(cls, testset_id, version, records):
+        """
+        Build the snapshot of the Results of a TestSet.
+
+        Parameters
+        ----------
+        testset_id : str
+            id of the TestSet, also the id of the snapshot
+        version : str
+            the `snapshot_version` of the TestSet
+        records : list
+            Results as dictionaries, see `Result.to_dict`
+
+        Returns
+        -------
+        ResultSnapshot
+            the unsaved snapshot
+        """
+        frame = pd.DataFrame(records, index=result_keys(records), dtype=object)
+        # unsaved Results hold their dates as strings, the stored ones as datetimes
+        mapping = Result._doc_type.mapping
+        for name in frame.columns:
+            if name in mapping and isinstance(mapping[name], Date):
+                try:
+                    frame[name] = pd.to_datetime(frame[name], format="ISO8601")
+                except (TypeError, ValueError):
+                    pass
+        data = encode_frame(frame)
+        return cls(
+            meta={"id": testset_id},
+            testset_id=testset_id,
+            version=version,
+            format=SNAPSHOT_FORMAT,
+            data=data,
+            rows=frame.shape[0],
+            columns=frame.shape[1],
+            size=len(data),
+            created=datetime.datetime.now(),
+        )
+
+    def is_current(self, testset):
+        """Check that the snapshot holds the current Results of testset."""
+        return (
+            self.format == SNAPSHOT_FORMAT
+            and testset.snapshot_version is not None
+            and self.version == testset.snapshot_version
+        )
+
+
+class Instance(Document):
+    """
+    An entry of the catalog of instance names.
+
+    The id of an entry is the instance name. The catalog is maintained on import and
+    deletion of Results, such that the names don't have to be aggregated over all
+    Results.
+    """
+
+    name = Keyword(required=True)
+    count = Integer()  # number of Results of the instance
+
+    class Index:
+        name = INSTANCE_INDEX
+
+    def __str__(self):
+        """Return a string description of the instance object."""
+        return "Instance {}".format(self.name)
+
+    @classmethod
+    def update_counts(cls, names, sign=1):
+        """
+        Add or remove Results from the catalog.
+
+        Parameters
+        ----------
+        names : iterable of str or collections.Counter
+            instance names of the added or removed Results, or their numbers by name
+        sign : int
+            1 if the Results were added, -1 if they were removed (default 1)
+        """
+        actions = []
+        for name, count in Counter(names).items():
+            action = {
+                "_op_type": "update",
+                "_index": INSTANCE_INDEX,
+                "_id": name,
+                "script": {
+                    "source": "ctx._source.count += params.n;"
+                    " if (ctx._source.count <= 0) { ctx.op = 'delete' }",
+                    "params": {"n": sign * count},
+                },
+                "retry_on_conflict": 5,
+            }
+            if sign > 0:
+                action["upsert"] = {"name": name, "count": count}
+            actions.append(action)
+
+        # removing an instance that isn't in the catalog fails, which is fine
+        _, errors = bulk(connections.get_connection(), actions, raise_on_error=False)
+        for error in errors:
+            info = next(iter(error.values()))
+            if info.get("status") != 404:
+                logging.error("Couldn't update instance catalog: {}".format(info))
+
+    @classmethod
+    def names(cls, prefix="", limit=None):
+        """
+        Return the sorted instance names.
+
+        Parameters
+        ----------
+        prefix : str
+            return only names that start with prefix, ignoring case (default "")
+        limit : int
+            maximal number of names, None for all (default None)
+
+        Returns
+        -------
+        list
+            instance names
+        """
+        s = cls.search().source(["name"])
+        if prefix:
+            s = s.query("prefix", name={"value": prefix, "case_insensitive": True})
+        if limit is None:
+            return sorted(hit.name for hit in s.scan())
+        return [hit.name for hit in s.sort("name")[:limit].execute()]
+
+
+# columns of the IPET data whose values are those of the TestSet, see `TestSet.get_data`
+TESTSET_COLUMNS = [
+    Key.GitHash,
+    "CommitTime",
+    Key.LPSolver,
+    Key.LogFileName,
+    Key.Settings,
+    "RubberbandMetaId",
+    "Seed",
+    "Permutation",
+]
+
+
 class TestSet(Document):
     """Define TestSet object, derived from Document."""
 
@@ -165,6 +585,8 @@ class TestSet(Document):
     metadata = Nested()
     expirationdate = Date()
     result_ids = Keyword()
+    snapshot_version = Keyword()  # version of the current ResultSnapshot
+    partition = Keyword()  # suffix of the Result and File partitions, e.g. 2026.10
 
     class Index:
         name = TESTSET_INDEX
@@ -204,15 +626,10 @@ class TestSet(Document):
         ftype : str
             extension of file to get data from (default ".out")
         """
-        s = File.search()
-        s = s.filter("term", testset_id=self.meta.id)
-        s = s.filter("term", type=ftype.lstrip("."))
-        try:
-            contents = s.execute()[0].text
-        except IndexError:
-            contents = None
-
-        return contents
+        f = File.find(self.meta.id, ftype=ftype)
+        if f is None:
+            return None
+        return f.contents()
 
     def gzip(self, ftype=".out"):
         """
@@ -239,11 +656,17 @@ class TestSet(Document):
         """
         if key is None:
             all_instances = {}
-            self.load_results()
-            instances = self.results.to_dict().keys()
+            snapshot = getattr(self, "result_snapshot", None)
+            if snapshot is None and getattr(self, "results", None) is None:
+                snapshot = self.load_snapshot()
+            if snapshot is not None:
+                rows = frame_records(decode_frame(snapshot))
+            else:
+                self.load_results()
+                rows = {i: self.results[i].to_dict() for i in self.results.to_dict()}
             count = 0
-            for i in instances:
-                all_instances[i] = self.results[i].to_dict()
+            for i, row in rows.items():
+                all_instances[i] = row
                 if "instance_id" not in all_instances[i].keys():
                     all_instances[i]["instance_id"] = count
                     count = count + 1
@@ -256,17 +679,7 @@ class TestSet(Document):
                 if self.lp_solver_githash:
                     all_instances[i]["SpxGitHash"] = self.lp_solver_githash
 
-                further_keys = [
-                    Key.GitHash,
-                    "CommitTime",
-                    Key.LPSolver,
-                    Key.LogFileName,
-                    Key.Settings,
-                    "RubberbandMetaId",
-                    "Seed",
-                    "Permutation",
-                ]
-                for fk in further_keys:
+                for fk in TESTSET_COLUMNS:
                     all_instances[i][fk] = self.get_data(fk)
 
                 if add_data is not None:
@@ -318,6 +731,86 @@ class TestSet(Document):
                     self.lp_solver_version,
                 )
 
+    def to_frame(self, add_data=None):
+        """
+        Build the data of the TestSet as IPET DataFrame, one row per instance.
+
+        Equivalent to `pd.DataFrame(self.get_data(add_data=add_data)).T`, but the
+        columns keep their numeric, boolean and date types, and the columns of the
+        TestSet are added at once as categories instead of per instance.
+
+        Parameters
+        ----------
+        add_data : dict
+            further columns with the same value for all instances (default None)
+
+        Returns
+        -------
+        pandas.DataFrame
+            the data indexed like `get_data`, missing values are NaN
+        """
+        snapshot = getattr(self, "result_snapshot", None)
+        if snapshot is None and getattr(self, "results", None) is None:
+            snapshot = self.load_snapshot()
+        if snapshot is not None:
+            frame = decode_frame(snapshot)
+        else:
+            self.load_results()
+            results = self.results.to_dict()
+            frame = pd.DataFrame.from_records(
+                [r.to_dict() for r in results.values()],
+                index=pd.Index(list(results), dtype=object),
+            )
+
+        # IPET expects NaN for missing values, not pd.NA
+        for name in frame.columns:
+            dtype = frame[name].dtype
+            if isinstance(dtype, pd.Int64Dtype):
+                frame[name] = frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            elif isinstance(dtype, pd.BooleanDtype):
+                frame[name] = frame[name].to_numpy(dtype=object, na_value=np.nan)
+
+        if "instance_id" not in frame:
+            frame["instance_id"] = np.arange(len(frame))
+        else:
+            missing = frame["instance_id"].isna()
+            if missing.any():
+                frame.loc[missing, "instance_id"] = np.arange(missing.sum())
+        if "instance_name" in frame:
+            if "ProblemName" in frame:
+                frame["ProblemName"] = frame["ProblemName"].fillna(
+                    frame["instance_name"]
+                )
+            else:
+                frame["ProblemName"] = frame["instance_name"]
+        for key in ("TimeLimit", "TimeFactor"):
+            value = _number(self.get_data(key))
+            frame[key] = frame[key].fillna(value) if key in frame else value
+
+        constants = {}
+        if self.lp_solver_githash:
+            constants["SpxGitHash"] = self.lp_solver_githash
+        for key in TESTSET_COLUMNS:
+            constants[key] = self.get_data(key)
+        for key in ("Seed", "Permutation"):
+            constants[key] = _number(constants[key])
+        constants.update(add_data or {})
+
+        # one code per row instead of one string object per row and column
+        columns = {}
+        for name, value in constants.items():
+            if isinstance(value, str):
+                columns[name] = pd.Categorical.from_codes(
+                    np.zeros(len(frame), dtype=np.int8), categories=[value]
+                )
+            else:
+                columns[name] = pd.Series(
+                    value, index=frame.index, dtype=object if value is None else None
+                )
+        columns = pd.DataFrame(columns, index=frame.index)
+        frame = frame.drop(columns=list(constants), errors="ignore")
+        return pd.concat([frame, columns], axis=1)
+
     def json(self, ftype=".out"):
         """
         Return the data contained in the TestSet object as JSON.
@@ -330,29 +823,12 @@ class TestSet(Document):
         if ftype == ".set":
             output = {}
             self.load_settings()
-            for k in list(self.settings):
-                setting = getattr(self.settings, k)
-                default = getattr(self.settings_default, k)
-
-                if k in INFINITY_KEYS:
-                    if setting == INFINITY_MASK:
-                        setting = INFINITY_FLOAT
-                    if default == INFINITY_MASK:
-                        default = INFINITY_FLOAT
-
-                if k == "conflict/uselocalrows":
-                    if setting == 0:
-                        setting = True
-                    else:
-                        setting = False
-                    if default == 0:
-                        default = True
-                    else:
-                        default = False
-
+            settings = self.settings.unmasked()
+            defaults = self.settings_default.unmasked()
+            for k, setting in settings.items():
                 output[k] = {
                     "setting": setting,
-                    "default": default,
+                    "default": defaults.get(k),
                 }
 
             return json.dumps(output)
@@ -384,27 +860,57 @@ class TestSet(Document):
         self.delete_all_settings()
 
     def delete_all_results(self):
-        """Delete all Result objects associated with a TestSet object."""
-        self.load_results()
-        for k, v in self.results.to_dict().items():
-            v.delete()
+        """Delete all Result objects associated with a TestSet object, without loading them."""
+        # imported here, rubberband.utils imports the models
+        from rubberband.utils.es_helpers import count_terms, delete_matching
+
+        self.delete_snapshot()
+        results = Result.search().filter("term", testset_id=self.meta.id)
+        names = count_terms(results, "instance_name")
+        delete_matching(results)
+        Instance.update_counts(names, sign=-1)
 
     def delete_all_files(self):
-        """Delete all File objects associated with a TestSet object."""
+        """
+        Delete all File objects associated with a TestSet object.
+
+        Their chunks may be shared with other Files, `FileChunk.delete_unreferenced`
+        removes them once they are unused.
+        """
         self.load_files()
         for ft in self.files:
             f = self.files[ft]
             f.delete()
 
     def delete_all_settings(self):
-        """Delete all Setting objects associated with a TestSet object."""
-        self.load_settings()
-        for ft in self.settings:
-            f = self.settings[ft]
-            if type(f) is not Settings:
-               logging.error("settings[{}] is not of Settings type: {}".format(ft, str(f)))
-               continue
-            f.delete()
+        """
+        Delete all Setting objects associated with a TestSet object.
+
+        Settings stored by content may be shared with other TestSets,
+        `Settings.delete_unreferenced` removes them once they are unused.
+        """
+        Settings.search().filter("term", testset_id=self.meta.id).delete()
+
+    def delete_snapshot(self):
+        """Delete the ResultSnapshots of a TestSet object."""
+        ResultSnapshot.search().filter("term", testset_id=self.meta.id).delete()
+
+    def load_snapshot(self):
+        """
+        Load the current ResultSnapshot of a TestSet object.
+
+        Returns
+        -------
+        bytes
+            the encoded Results, see `decode_frame`, or None if there is no current
+            snapshot
+        """
+        self.result_snapshot = None
+        if self.snapshot_version:
+            snapshot = ResultSnapshot.mget([self.meta.id], missing="none")[0]
+            if snapshot is not None and snapshot.is_current(self):
+                self.result_snapshot = snapshot.data
+        return self.result_snapshot
 
     def load_results(self):
         """Load Results associated with a TestSet object."""
@@ -417,13 +923,24 @@ class TestSet(Document):
         s = Result.search()
         # it's generally discouraged to return a large number of elements from a search query
         s = s.filter("term", testset_id=self.meta.id)
-        self.results = {}
+        # this uses pagination/scroll
+        self.set_results(s.scan())
 
+    def set_results(self, hits):
+        """
+        Store the Results of a TestSet object under their instance names.
+
+        If the instance names are not unique, the instance ids are added to the keys.
+
+        Parameters
+        ----------
+        hits : iterable of Result
+            Results belonging to the TestSet
+        """
         results = {}
         results["ids"] = {}
         results["names"] = {}
-        # this uses pagination/scroll
-        for hit in s.scan():
+        for hit in hits:
             results["ids"]["{} ({})".format(hit.instance_name, hit.instance_id)] = hit
             results["names"]["{}".format(hit.instance_name)] = hit
 
@@ -449,19 +966,375 @@ class TestSet(Document):
             self.files[hit.type] = hit
 
     def load_settings(self):
-        """Load all settings associated with the TestSet."""
-        self.settings = Settings.get(id=self.settings_id)
-        self.settings_default = Settings.get(id=self.default_settings_id)
+        """
+        Load all settings associated with the TestSet.
+
+        The parameters that are stored as differences to the defaults are combined
+        with them, see `Settings.resolve`.
+        """
+        ids = [self.settings_id, self.default_settings_id]
+        settings, default = (
+            Settings.mget(ids, missing="none") if all(ids) else (None, None)
+        )
+        self.settings, self.settings_default = Settings.resolve(settings, default)
+
+    def file_types(self):
+        """Return the types of the files stored for the TestSet, without their contents."""
+        s = File.search()
+        s = s.filter("term", testset_id=self.meta.id)
+        s = s.source(["type"])
+        return set(hit.type for hit in s.scan())
+
+    @classmethod
+    def find_by_hashes(cls, hashes, chunk_size=1000):
+        """
+        Look up the TestSets of logfiles by the sha256 hashes of the files.
+
+        Parameters
+        ----------
+        hashes : list
+            sha256 hashes of the .out files
+        chunk_size : int
+            number of hashes to look up with one request (default 1000)
+
+        Returns
+        -------
+        dict
+            TestSets by hash, hashes without TestSet are missing
+        """
+        hashes = list(set(hashes))
+        found = {}
+        for i in range(0, len(hashes), chunk_size):
+            chunk = hashes[i : i + chunk_size]
+            s = cls.search()
+            s = s.filter("terms", id=chunk)
+            s = s.source(
+                ["id", "filename", "uploader", "run_initiator", "index_timestamp"]
+            )
+            for t in s[: len(chunk)].execute():
+                found[t.id] = t
+        return found
+
+    @classmethod
+    def load_results_many(cls, testsets):
+        """
+        Load the Results of several TestSets with a single scan.
+
+        Parameters
+        ----------
+        testsets : list
+            TestSets to load the Results for
+        """
+        # a TestSet may be passed more than once, every object gets its Results
+        by_id = defaultdict(list)
+        for t in testsets:
+            by_id[t.meta.id].append(t)
+        hits = {i: [] for i in by_id}
+        s = Result.search()
+        s = s.filter("terms", testset_id=list(by_id))
+        # this uses pagination/scroll
+        for hit in s.scan():
+            hits[hit.testset_id].append(hit)
+        for i, objs in by_id.items():
+            for t in objs:
+                t.set_results(hits[i])
+
+    @classmethod
+    def load_snapshots_many(cls, testsets):
+        """
+        Load the ResultSnapshots of several TestSets with a single request.
+
+        The Results of TestSets without current snapshot are loaded instead, see
+        `load_results_many`. `get_data` uses whichever is loaded.
+
+        Parameters
+        ----------
+        testsets : list
+            TestSets to load the snapshots for
+        """
+        stale = [t for t in testsets if not t.snapshot_version]
+        versioned = [t for t in testsets if t.snapshot_version]
+        if versioned:
+            snapshots = ResultSnapshot.mget(
+                [t.meta.id for t in versioned], missing="none"
+            )
+            for t, snapshot in zip(versioned, snapshots):
+                if snapshot is not None and snapshot.is_current(t):
+                    t.result_snapshot = snapshot.data
+                else:
+                    stale.append(t)
+        if stale:
+            cls.load_results_many(stale)
+
+    @classmethod
+    def get_many(cls, ids, results=True, settings=False):
+        """
+        Load several TestSets and their associations with a constant number of requests.
+
+        The TestSets and their Settings are fetched with one multi-get each, the Results
+        of all TestSets with a single scan.
+
+        Parameters
+        ----------
+        ids : list
+            ids of the TestSets
+        results : bool
+            also load the Results of the TestSets (default True)
+        settings : bool
+            also load the Settings of the TestSets (default False)
+
+        Returns
+        -------
+        list
+            TestSets in the order of `ids`, a repeated id gives the same TestSet object
+
+        Raises
+        ------
+        elasticsearch.NotFoundError
+            if one of the TestSets doesn't exist
+        """
+        # the same TestSet may be requested more than once, e.g. compared to itself
+        unique = list(dict.fromkeys(ids))
+        found = dict(zip(unique, cls.mget(unique, missing="raise")))
+        testsets = [found[i] for i in ids]
+
+        if results:
+            cls.load_results_many(list(found.values()))
+
+        if settings:
+            settings_ids = set()
+            for t in testsets:
+                settings_ids.update([t.settings_id, t.default_settings_id])
+            settings_ids.discard(None)
+            found = Settings.mget(list(settings_ids), missing="none")
+            found = {s.meta.id: s for s in found if s is not None}
+            for t in found.values():
+                t.settings, t.settings_default = Settings.resolve(
+                    found.get(t.settings_id), found.get(t.default_settings_id)
+                )
+
+        return testsets
 
 
 class Settings(Document):
-    """Define Settings object, derived from Document."""
+    """
+    Define Settings object, derived from Document.
 
-    testset_id = Keyword(required=True)
+    The parameters are stored by content: the defaults of a solver version once under
+    the hash of their values, and the parameters of a run as their differences to
+    the defaults, under the hash of these. TestSets with the same settings share
+    the documents. Settings of older imports hold all parameters and the testset_id.
+    """
+
+    testset_id = Keyword()
+    # id of the defaults the parameters of a run differ from
+    default_id = Keyword()
+    # sha256 hashes of the .set files the Settings were read from
+    set_hashes = Keyword()
+    created = Date()
 
     class Index:
         name = SETTINGS_INDEX
 
+    # fields that are not parameters
+    META_FIELDS = ("testset_id", "default_id", "set_hashes", "created")
+
+    @staticmethod
+    def content_id(values):
+        """Return the sha256 hash of parameters, the id of the Settings holding them."""
+        content = json.dumps(values, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def store(cls, values, defaults, set_hash=None):
+        """
+        Store the parameters of a run unless Settings with the same content exist.
+
+        Parameters
+        ----------
+        values : dict
+            parameters of the run, as read by IPET
+        defaults : dict
+            default parameters of the solver, as read by IPET
+        set_hash : str
+            sha256 hash of the .set file, see `find_by_set_hash` (default None)
+
+        Returns
+        -------
+        str, str
+            ids of the Settings of the run and of the defaults
+        """
+        default_id = cls.content_id(defaults)
+        diff = {
+            k: v for k, v in values.items() if k not in defaults or defaults[k] != v
+        }
+        settings_id = cls.content_id({"default_id": default_id, "values": diff})
+
+        stored, stored_default = cls.mget([settings_id, default_id], missing="none")
+        # mark the reused Settings as used, `delete_unreferenced` might delete them
+        # before the TestSet referring to them is saved otherwise
+        absent = _touch(
+            SETTINGS_INDEX, [st.meta.id for st in (stored, stored_default) if st]
+        )
+        if settings_id in absent:
+            stored = None
+        now = datetime.datetime.now()
+        if stored_default is None or default_id in absent:
+            cls(meta={"id": default_id}, created=now, **defaults).save()
+        if stored is None:
+            cls(
+                meta={"id": settings_id},
+                default_id=default_id,
+                set_hashes=[set_hash] if set_hash else [],
+                created=now,
+                **diff,
+            ).save()
+        elif set_hash and set_hash not in (stored.set_hashes or []):
+            # update() would mask the stored parameters a second time
+            connections.get_connection().update(
+                index=SETTINGS_INDEX,
+                id=settings_id,
+                script={
+                    "source": "if (ctx._source.set_hashes == null)"
+                    " { ctx._source.set_hashes = [] }"
+                    " if (!ctx._source.set_hashes.contains(params.hash))"
+                    " { ctx._source.set_hashes.add(params.hash) }",
+                    "params": {"hash": set_hash},
+                },
+                retry_on_conflict=5,
+            )
+        return settings_id, default_id
+
+    @classmethod
+    def find_by_set_hash(cls, set_hash):
+        """
+        Look up the Settings that were read from a .set file before.
+
+        Parameters
+        ----------
+        set_hash : str
+            sha256 hash of the .set file
+
+        Returns
+        -------
+        str, str
+            ids of the Settings and of the defaults, None if the file is unknown
+        """
+        s = cls.search().filter("term", set_hashes=set_hash).source(["default_id"])
+        hits = s[:1].execute()
+        if not len(hits):
+            return None
+        ids = hits[0].meta.id, hits[0].default_id
+        # the Settings are reused, see `store`
+        if _touch(SETTINGS_INDEX, ids):
+            return None
+        return ids
+
+    @classmethod
+    def resolve(cls, settings, default):
+        """
+        Combine the stored differences of a run with the defaults they refer to.
+
+        Parameters
+        ----------
+        settings : Settings
+            the stored Settings of a run or None
+        default : Settings
+            the stored defaults or None
+
+        Returns
+        -------
+        Settings, Settings
+            unsaved Settings with all parameters of the run and of the defaults, the
+            stored ones if they hold all parameters
+        """
+        if settings is None or not getattr(settings, "default_id", None):
+            return settings, default
+        default_values = default.parameters() if default is not None else {}
+        full = cls.from_es(
+            {
+                "_id": settings.meta.id,
+                "_source": dict(default_values, **settings.parameters()),
+            }
+        )
+        if default is not None:
+            default = cls.from_es({"_id": default.meta.id, "_source": default_values})
+        return full, default
+
+    @classmethod
+    def delete_unreferenced(cls, min_age=datetime.timedelta(days=1)):
+        """
+        Delete Settings that no TestSet refers to anymore.
+
+        These are Settings stored by content that are no longer shared, and Settings
+        of older imports whose TestSet was deleted or reimported since.
+
+        Parameters
+        ----------
+        min_age : datetime.timedelta
+            keep Settings stored by content that were stored or reused more recently,
+            their TestSet might not be saved yet (default one day)
+
+        Returns
+        -------
+        int
+            number of deleted Settings
+        """
+        fields = ["settings_id", "default_settings_id"]
+        referenced = set()
+        for t in TestSet.search().source(fields).scan():
+            referenced.update(getattr(t, f, None) for f in fields)
+
+        # Settings of older imports aren't stored anymore, they can't be reused
+        old = cls.search().filter(
+            Q("exists", field="testset_id")
+            | Q("range", created={"lt": datetime.datetime.now() - min_age})
+        )
+        orphans = [
+            c.meta.id for c in old.source(False).scan() if c.meta.id not in referenced
+        ]
+
+        deleted = 0
+        for i in range(0, len(orphans), 1000):
+            batch = orphans[i : i + 1000]
+            # a TestSet might have been saved in the meantime
+            s = (
+                TestSet.search()
+                .source(fields)
+                .filter(
+                    Q("terms", settings_id=batch)
+                    | Q("terms", default_settings_id=batch)
+                )
+            )
+            batch = set(batch) - {getattr(t, f, None) for t in s.scan() for f in fields}
+            if batch:
+                # Settings that were reused since the search are younger or changed
+                s = old.filter("ids", values=list(batch)).params(conflicts="proceed")
+                deleted += s.delete().deleted
+        return deleted
+
+    def parameters(self):
+        """Return the stored parameters without the other fields."""
+        return {k: v for k, v in self.to_dict().items() if k not in self.META_FIELDS}
+
+    def unmasked(self):
+        """
+        Return the parameters with the values that `mask_settings` substituted.
+
+        Returns
+        -------
+        dict
+            the parameters by name
+        """
+        values = self.parameters()
+        for k in INFINITY_KEYS:
+            if values.get(k) == INFINITY_MASK:
+                values[k] = INFINITY_FLOAT
+        key = "conflict/uselocalrows"
+        if key in values:
+            values[key] = values[key] == 0
+        return values
+
     def update(self, **kwargs):
         """
         Extend update method, to deal with infinities before saving in elasticsearch.
@@ -506,11 +1379,13 @@ class Settings(Document):
                 if kwargs[i] == INFINITY_FLOAT:
                     kwargs[i] = INFINITY_MASK
 
+        # only present in the differences of a run if it differs from the default
         key = "conflict/uselocalrows"
-        if getattr(self, key, None):
-            setattr(self, key, 0)
-        else:
-            setattr(self, key, 1)
+        if key in self:
+            if getattr(self, key, None):
+                setattr(self, key, 0)
+            else:
+                setattr(self, key, 1)
 
         if kwargs != {} and key in kwargs.keys():
             if kwargs[key]:
@@ -524,3 +1399,223 @@ date_handler = lambda obj: (  # noqa
     if isinstance(obj, datetime.datetime) or isinstance(obj, datetime.date)
     else None
 )
+
+
+def _touch(index, ids):
+    """
+    Set the creation date of stored documents to now, to mark them as used.
+
+    Parameters
+    ----------
+    index : str
+        name of the index
+    ids : iterable
+        ids of the documents
+
+    Returns
+    -------
+    set
+        ids of the documents that don't exist
+    """
+    now = datetime.datetime.now()
+    actions = [
+        {"_op_type": "update", "_index": index, "_id": i, "doc": {"created": now}}
+        for i in dict.fromkeys(ids)
+    ]
+    if not actions:
+        return set()
+    absent = set()
+    _, errors = bulk(connections.get_connection(), actions, raise_on_error=False)
+    for error in errors:
+        info = next(iter(error.values()))
+        if info.get("status") != 404:
+            raise RuntimeError("Couldn't mark {} as used: {}".format(info["_id"], info))
+        absent.add(info["_id"])
+    return absent
+
+
+def split_chunks(data, size=FILE_CHUNK_SIZE):
+    """
+    Split data at line breaks into pieces of about size bytes.
+
+    Parameters
+    ----------
+    data : bytes
+        data to split
+    size : int
+        minimal size of a piece, except for the last one (default FILE_CHUNK_SIZE)
+
+    Returns
+    -------
+    list
+        the pieces
+    """
+    pieces = []
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start + size - 1)
+        end = len(data) if end < 0 else end + 1
+        pieces.append(data[start:end])
+        start = end
+    return pieces
+
+
+def result_keys(records):
+    """
+    Return the keys of Results in a TestSet, see `TestSet.set_results`.
+
+    Parameters
+    ----------
+    records : list
+        Results as dictionaries
+
+    Returns
+    -------
+    list
+        the instance names if they are unique, else the names with the instance ids
+    """
+    names = ["{}".format(r.get("instance_name")) for r in records]
+    if len(set(names)) == len(names):
+        return names
+    return [
+        "{} ({})".format(r.get("instance_name"), r.get("instance_id")) for r in records
+    ]
+
+
+def encode_frame(frame):
+    """
+    Encode a DataFrame of python objects column by column as compressed npz archive.
+
+    Numbers, booleans and naive dates are stored as numpy arrays with a mask of the
+    missing values, all other columns as json. No pickles are involved.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        the frame, missing values are None or NaN
+
+    Returns
+    -------
+    bytes
+        the archive, see `decode_frame`
+    """
+    arrays = {}
+    kinds = []
+    for i, name in enumerate(frame.columns):
+        kind, values, missing = _encode_column(frame[name])
+        kinds.append(kind)
+        arrays["v{}".format(i)] = values
+        if missing is not None:
+            arrays["m{}".format(i)] = missing
+    header = {
+        "columns": [str(c) for c in frame.columns],
+        "kinds": kinds,
+        "index": [str(i) for i in frame.index],
+    }
+    arrays["header"] = _json_array(header)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_frame(data):
+    """
+    Decode a DataFrame encoded by `encode_frame`.
+
+    Parameters
+    ----------
+    data : bytes
+        the archive
+
+    Returns
+    -------
+    pandas.DataFrame
+        the frame with numeric, boolean and datetime columns where possible
+    """
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        header = json.loads(archive["header"].tobytes())
+        columns = {}
+        for i, (name, kind) in enumerate(zip(header["columns"], header["kinds"])):
+            missing = archive["m{}".format(i)] if kind in ("i", "b", "M") else None
+            columns[name] = _decode_column(kind, archive["v{}".format(i)], missing)
+    return pd.DataFrame(columns, index=pd.Index(header["index"], dtype=object))
+
+
+def frame_records(frame):
+    """
+    Convert a decoded DataFrame back to dictionaries without the missing values.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        frame returned by `decode_frame`
+
+    Returns
+    -------
+    dict
+        the rows as dictionaries of python objects by index
+    """
+    names = list(frame.columns)
+    columns = []
+    for name in names:
+        column = frame[name]
+        values = column.astype(object).where(column.notna(), None).tolist()
+        if column.dtype.kind == "M":
+            values = [None if v is None else v.to_pydatetime() for v in values]
+        elif column.dtype != object:
+            values = [v.item() if isinstance(v, np.generic) else v for v in values]
+        columns.append(values)
+    return {
+        key: {n: v for n, v in zip(names, row) if v is not None}
+        for key, row in zip(frame.index, zip(*columns))
+    }
+
+
+def _number(value):
+    """Convert a number stored as string to int or float, other values are kept."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def _json_array(value):
+    """Encode a json serializable value as an array of bytes."""
+    return np.frombuffer(json.dumps(value, default=str).encode("utf-8"), dtype=np.uint8)
+
+
+def _encode_column(column):
+    """Return the kind, the values and the mask of the missing values of a column."""
+    missing = column.isna().to_numpy()
+    kind = pd.api.types.infer_dtype(column[~missing], skipna=False)
+    try:
+        if kind == "floating":
+            return "f", column.astype(np.float64).to_numpy(), None
+        if kind == "integer":
+            return "i", column.where(~missing, 0).astype(np.int64).to_numpy(), missing
+        if kind == "boolean":
+            return "b", column.where(~missing, False).astype(bool).to_numpy(), missing
+        if kind in ("datetime", "datetime64"):
+            dates = pd.to_datetime(column)
+            if dates.dt.tz is None:
+                values = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+                return "M", values, missing
+    except (OverflowError, TypeError, ValueError):
+        pass
+    return "json", _json_array(column.where(~missing, None).tolist()), None
+
+
+def _decode_column(kind, values, missing):
+    """Return the array of a column encoded by `_encode_column`."""
+    if kind == "f":
+        return values
+    if kind == "i":
+        return pd.arrays.IntegerArray(values, missing) if missing.any() else values
+    if kind == "b":
+        return pd.arrays.BooleanArray(values, missing) if missing.any() else values
+    if kind == "M":
+        dates = values.view("datetime64[ns]").copy()
+        dates[missing] = np.datetime64("NaT")
+        return dates
+    return pd.Series(json.loads(values.tobytes()), dtype=object).to_numpy()
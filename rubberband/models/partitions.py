@@ -0,0 +1,158 @@
+"""Time partitions of the Result and File indices behind aliases."""
+
+import logging
+import datetime
+
+from elasticsearch import BadRequestError
+from elasticsearch.dsl.connections import connections
+from tornado.options import options
+
+# strftime formats of the partition suffixes by interval
+PARTITION_FORMATS = {"month": "%Y.%m", "year": "%Y", "none": None}
+
+# partitions this process already created or found
+_ensured = set()
+
+
+def partition_suffix(when=None, interval=None):
+    """
+    Return the suffix of the partition a TestSet imported at a time belongs to.
+
+    Parameters
+    ----------
+    when : datetime.datetime
+        time of the import (default now)
+    interval : str
+        "month", "year" or "none" (default options.index_partitions)
+
+    Returns
+    -------
+    str
+        the suffix, e.g. "2026.10", or None if the indices aren't partitioned
+    """
+    interval = interval or options.index_partitions
+    try:
+        fmt = PARTITION_FORMATS[interval]
+    except KeyError:
+        raise ValueError("Unknown partition interval {}.".format(interval))
+    if fmt is None:
+        return None
+    return (when or datetime.datetime.now()).strftime(fmt)
+
+
+def partition_name(alias, suffix):
+    """Return the name of the partition of an alias, the alias itself for no suffix."""
+    if not suffix:
+        return alias
+    return "{}-{}".format(alias, suffix)
+
+
+def partition_indices(alias):
+    """
+    Return the concrete indices behind an alias.
+
+    Parameters
+    ----------
+    alias : str
+        name of the alias, e.g. RESULT_INDEX
+
+    Returns
+    -------
+    list
+        names of the indices sorted by name, [alias] if it is an unpartitioned index,
+        [] if it doesn't exist
+    """
+    conn = connections.get_connection()
+    if conn.indices.exists_alias(name=alias):
+        return sorted(conn.indices.get_alias(name=alias).body)
+    if conn.indices.exists(index=alias):
+        return [alias]
+    return []
+
+
+def ensure_partition(document, suffix):
+    """
+    Create the partition of a document class if it doesn't exist yet.
+
+    The partition gets the mapping of the document class and the index templates,
+    and is added to the alias the class reads from. The partition of the current
+    time is the write index of the alias, documents without explicit index go there.
+
+    Parameters
+    ----------
+    document : class
+        Document class whose index name is the alias, e.g. Result
+    suffix : str
+        suffix of the partition, see `partition_suffix`
+
+    Returns
+    -------
+    str
+        name of the index to write the documents of the partition to; the alias if
+        suffix is None or the alias is still an unpartitioned index
+    """
+    alias = document._index._name
+    name = partition_name(alias, suffix)
+    if name == alias or name in _ensured:
+        return name
+
+    conn = connections.get_connection()
+    if conn.indices.exists(index=alias) and not conn.indices.exists_alias(name=alias):
+        logging.getLogger(__name__).warning(
+            "{} is an index, not an alias of partitions. Run `rubberband-ctl reindex"
+            " --index {}` to partition it.".format(alias, alias)
+        )
+        return alias
+
+    if not conn.indices.exists(index=name):
+        try:
+            document._index.clone(name).create()
+        except BadRequestError as e:
+            # another process created it in the meantime
+            if e.error != "resource_already_exists_exception":
+                raise
+
+    current = partition_name(alias, partition_suffix())
+    actions = [
+        {"add": {"index": name, "alias": alias, "is_write_index": name == current}}
+    ]
+    if name == current:
+        for index in partition_indices(alias):
+            if index != name:
+                actions.append(
+                    {"add": {"index": index, "alias": alias, "is_write_index": False}}
+                )
+    conn.indices.update_aliases(actions=actions)
+    _ensured.add(name)
+    return name
+
+
+class PartitionedDocument(object):
+    """Mixin for Document classes whose index is an alias of several partitions."""
+
+    @classmethod
+    def get(cls, id, using=None, index=None, **kwargs):
+        """
+        Look up a document by id in all partitions.
+
+        Get requests need a concrete index, so this is an ids query.
+
+        Parameters
+        ----------
+        id : str
+            id of the document
+        using : str
+            connection alias (default None)
+        index : str
+            index or alias to search (default the alias of the class)
+        kwargs
+            ignored, for compatibility with `Document.get`, e.g. routing
+
+        Returns
+        -------
+        Document
+            the document or None if it doesn't exist
+        """
+        s = cls.search(using=using, index=index).filter("ids", values=[id])
+        hits = s[:1].execute()
+        return hits[0] if len(hits) else None
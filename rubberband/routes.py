@@ -21,11 +21,15 @@ routes = [
     (r"/visualize", fe.VisualizeView),
     # for typeahead in visualize.js
     (r"/instances/names", fe.InstanceNamesEndpoint),
+    # timings and memory usage of the recent imports, for admins
+    (r"/metrics/import", fe.ImportMetricsEndpoint),
     # for typeahead in statistic.js
     (r"/instances/?(?P<testset_id>[^\/]+)", fe.InstanceEndpoint),
     # API Endpoints
     (r"/api/comparison/(?P<base_id>[^\/]+)", api.ComparisonEndpoint),
     (r"/api/upload/async", api.UploadAsyncEndpoint),
+    (r"/api/upload/check", api.UploadCheckEndpoint),
+    (r"/api/upload/jobs/(?P<job_id>[^\/]+)", api.UploadJobEndpoint),
     (r"/api/upload", api.UploadEndpoint),
     (r"/api/search", api.SearchEndpoint),
 ]
@@ -16,10 +16,14 @@ dtf.detail = d3.timeFormat("%Y-%m-%d %H:%M")
 
 // collect names of instances for field 'data name'
 function initializeTypeahead() {
+  // ask the server for names starting with the typed text,
   // jquery 'get' is just a wrapper for jquery 'ajax'
-  $.get('/instances/names', function(data){
-    $('.typeahead').typeahead({source:data});
-  }, "json");
+  $('.typeahead').typeahead({
+    source: function(query, process) {
+      return $.get('/instances/names', {q: query, limit: 20}, process, "json");
+    },
+    minLength: 1,
+  });
 }
 
 function setButtons(val) {
@@ -0,0 +1,278 @@
+"""Unpack compressed logfiles and archives of logfiles."""
+
+import os
+import gzip
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+
+import zstandard
+
+from rubberband.constants import ZIPPED_SUFFIX
+
+ZSTD_SUFFIX = ".zst"
+COMPRESSED_SUFFIXES = (ZIPPED_SUFFIX, ZSTD_SUFFIX)
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.zst", ".zip")
+
+# logfiles that are kept from archives
+LOGFILE_SUFFIXES = (".out", ".err", ".set", ".meta", ".solu")
+
+# bytes that are decompressed at once
+BLOCK_SIZE = 1024 * 1024
+
+
+class ArchiveError(ValueError):
+    """Raised if an archive or compressed file can't be unpacked."""
+
+
+def is_packed(path):
+    """
+    Check if a file is compressed or an archive.
+
+    Parameters
+    ----------
+    path : str
+        path or name of the file
+
+    Returns
+    -------
+    bool
+        True if `unpack` has to unpack the file
+    """
+    return path.lower().endswith(COMPRESSED_SUFFIXES + ARCHIVE_SUFFIXES)
+
+
+def unpack(paths, hashes=None, max_size=None):
+    """
+    Replace compressed files and archives by the logfiles they contain.
+
+    The files are decompressed block by block and hashed while they are written, so
+    the sha256 hashes are those of the uncompressed logfiles. Archives are unpacked
+    into a new directory next to them, the packed files are removed. If unpacking
+    fails, all files are removed.
+
+    Parameters
+    ----------
+    paths : list str
+        paths of the uploaded files
+    hashes : dict
+        sha256 hashes of the files by path (default None)
+    max_size : int
+        maximal total size in bytes of the unpacked files (default None, no limit)
+
+    Returns
+    -------
+    list, dict, list
+        paths of the logfiles, the sha256 hashes of the unpacked ones added to
+        `hashes` and the directories the archives were unpacked into, which the
+        caller removes after the import
+
+    Raises
+    ------
+    ArchiveError
+        if a file can't be unpacked or the unpacked files are too large
+    """
+    hashes = dict(hashes or {})
+    budget = [max_size]
+    result = []
+    created = []
+    try:
+        for path in paths:
+            if not is_packed(path):
+                result.append(path)
+                continue
+            lower = path.lower()
+            if lower.endswith(ARCHIVE_SUFFIXES):
+                unpacked = _unpack_archive(path, budget, created)
+            else:
+                target = path[: -len(_suffix(lower, COMPRESSED_SUFFIXES))]
+                created.append(target)
+                with _open_compressed(path) as f_in:
+                    unpacked = {target: _write(f_in, target, budget)}
+            hashes.pop(path, None)
+            hashes.update(unpacked)
+            result.extend(unpacked)
+    except (
+        ArchiveError,
+        OSError,
+        EOFError,
+        tarfile.TarError,
+        zipfile.BadZipFile,
+        zstandard.ZstdError,
+    ) as e:
+        for p in list(paths) + created:
+            _remove(p)
+        if isinstance(e, ArchiveError):
+            raise
+        raise ArchiveError("Couldn't unpack {}: {}".format(os.path.basename(path), e))
+
+    for path in paths:
+        if is_packed(path):
+            os.remove(path)
+    directories = [d for d in created if os.path.isdir(d)]
+    return result, hashes, directories
+
+
+def _remove(path):
+    """Remove a file or directory if it exists."""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _suffix(name, suffixes):
+    """Return the longest of the suffixes that name ends with."""
+    return max((s for s in suffixes if name.endswith(s)), key=len)
+
+
+def _open_compressed(path, fileobj=None):
+    """
+    Open a gzip or zstandard compressed file for reading the uncompressed data.
+
+    Parameters
+    ----------
+    path : str
+        name of the file, its suffix determines the compression
+    fileobj : file
+        readable binary stream to decompress instead of opening path (default None)
+    """
+    if path.lower().endswith(ZSTD_SUFFIX):
+        closefd = fileobj is None
+        if closefd:
+            fileobj = open(path, "rb")
+        # files written by parallel compressors consist of several frames
+        return zstandard.ZstdDecompressor().stream_reader(
+            fileobj, read_across_frames=True, closefd=closefd
+        )
+    return gzip.open(fileobj or path, "rb")
+
+
+def _write(f_in, target, budget):
+    """
+    Copy a stream to a file block by block and hash it.
+
+    Parameters
+    ----------
+    f_in : file
+        readable binary stream
+    target : str
+        path to write to
+    budget : list
+        remaining number of bytes that may be written, [None] for no limit
+
+    Returns
+    -------
+    str
+        hex digest of the sha256 hash of the data
+    """
+    sha256 = hashlib.sha256()
+    with open(target, "wb") as f_out:
+        while True:
+            block = f_in.read(BLOCK_SIZE)
+            if not block:
+                break
+            if budget[0] is not None:
+                budget[0] -= len(block)
+                if budget[0] < 0:
+                    raise ArchiveError("The unpacked files are too large.")
+            sha256.update(block)
+            f_out.write(block)
+    return sha256.hexdigest()
+
+
+def _member_path(directory, name):
+    """Return the path of an archive member in directory, None for unsafe or junk names."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    # metadata that macOS adds to archives
+    if "__MACOSX" in parts or parts[-1].startswith("._"):
+        return None
+    return os.path.join(directory, *parts)
+
+
+def _members(path):
+    """
+    Iterate over the regular files of an archive without loading them into memory.
+
+    Tar archives are read sequentially, zip archives by their index.
+
+    Yields
+    ------
+    str, file
+        name and readable binary stream of each file
+    """
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as f:
+                        yield info.filename, f
+        return
+
+    if lower.endswith(".tar.zst"):
+        with _open_compressed(path) as stream:
+            with tarfile.open(fileobj=stream, mode="r|") as archive:
+                yield from _tar_members(archive)
+        return
+
+    # transparent compression, read as stream
+    with tarfile.open(path, mode="r|*") as archive:
+        yield from _tar_members(archive)
+
+
+def _tar_members(archive):
+    for member in archive:
+        if member.isfile():
+            yield member.name, archive.extractfile(member)
+
+
+def _unpack_archive(path, budget, created):
+    """
+    Write the logfiles of an archive into a new directory next to it.
+
+    Compressed logfiles in the archive are decompressed as well, other files are
+    skipped.
+
+    Parameters
+    ----------
+    path : str
+        path of the archive
+    budget : list
+        remaining number of bytes that may be written, [None] for no limit
+    created : list
+        the new directory is appended
+
+    Returns
+    -------
+    dict
+        sha256 hashes of the logfiles by path
+    """
+    directory = tempfile.mkdtemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + "."
+    )
+    created.append(directory)
+    hashes = {}
+    for name, f in _members(path):
+        target = _member_path(directory, name)
+        if target is None:
+            continue
+        lower = target.lower()
+        compressed = lower.endswith(COMPRESSED_SUFFIXES)
+        if compressed:
+            target = target[: -len(_suffix(lower, COMPRESSED_SUFFIXES))]
+        if not target.endswith(LOGFILE_SUFFIXES):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if compressed:
+            with _open_compressed(name, fileobj=f) as f_in:
+                hashes[target] = _write(f_in, target, budget)
+        else:
+            hashes[target] = _write(f, target, budget)
+    if not hashes:
+        shutil.rmtree(directory)
+    return hashes
@@ -0,0 +1,166 @@
+"""Import all logfiles of a directory tree and remember which bundles are done."""
+
+import os
+import json
+import traceback
+
+from .archives import LOGFILE_SUFFIXES
+from .importer import bundle_files, import_bundle
+
+# bundles with these statuses are not imported again
+DONE_STATUSES = ("success", "found")
+
+
+def discover_bundles(directory):
+    """
+    Find the bundles of logfiles in a directory and its subdirectories.
+
+    The files of every directory are bundled separately, see `bundle_files`, so
+    .solu files only belong to the bundles next to them.
+
+    Parameters
+    ----------
+    directory : str
+        root of the directory tree
+
+    Returns
+    -------
+    list
+        bundles sorted by path, each a list of paths
+    """
+    bundles = []
+    for root, dirs, files in os.walk(directory):
+        # walk deterministically, such that the progress is comparable between runs
+        dirs.sort()
+        paths = [
+            os.path.join(root, f) for f in sorted(files) if f.endswith(LOGFILE_SUFFIXES)
+        ]
+        bundles.extend(b for b in bundle_files(paths) if b)
+    return bundles
+
+
+def bundle_key(bundle, directory):
+    """Return the path of the .out file of a bundle relative to directory."""
+    out = next(p for p in bundle if p.endswith(".out"))
+    return os.path.relpath(out, directory)
+
+
+class Checkpoint(object):
+    """
+    The outcome of every imported bundle, appended as json lines to a file.
+
+    A line is written and flushed as soon as a bundle is done, so an interrupted
+    import loses at most the bundles that were in progress.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize a Checkpoint object.
+
+        Parameters
+        ----------
+        path : str
+            path of the checkpoint file, created on the first record
+        """
+        self.path = path
+
+    def load(self):
+        """
+        Read the recorded bundles.
+
+        Returns
+        -------
+        dict
+            the latest record of every bundle by key
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line may be incomplete after a crash
+                    continue
+                records[record["key"]] = record
+        return records
+
+    def done(self, retry_failed=True):
+        """
+        Return the keys of the bundles that don't need to be imported again.
+
+        Parameters
+        ----------
+        retry_failed : bool
+            import failed bundles again (default True)
+        """
+        return {
+            key
+            for key, record in self.load().items()
+            if record["status"] in DONE_STATUSES or not retry_failed
+        }
+
+    def add(self, key, **record):
+        """
+        Record the outcome of a bundle.
+
+        Parameters
+        ----------
+        key : str
+            key of the bundle, see `bundle_key`
+        record
+            json serializable information about the import, e.g. the status
+        """
+        line = (json.dumps(dict(record, key=key)) + "\n").encode()
+        with open(self.path, "ab+") as f:
+            # start a new line if a crash interrupted the last one
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def import_task(bundle, user, tags=[], expirationdate=None):
+    """
+    Import a bundle without removing its files, run in a worker process.
+
+    Parameters
+    ----------
+    bundle : list
+        paths of the bundle
+    user : str
+        user the TestSet belongs to
+    tags : list
+        tags to add to the TestSet (default [])
+    expirationdate : str in date form
+        Date after which data can be purged from elasticsearch (default: None)
+
+    Returns
+    -------
+    dict
+        status, url, messages and metrics of the import
+    """
+    try:
+        stats = import_bundle(
+            bundle, user, tags=tags, expirationdate=expirationdate, remove=False
+        )
+    except Exception:
+        return {
+            "status": "fail",
+            "url": None,
+            "messages": {"_": [traceback.format_exc()]},
+            "timings": {},
+            "counters": {},
+        }
+    return {
+        "status": stats.status,
+        "url": stats.getUrl(),
+        # messages may be exceptions or tuples, the results are written as json
+        "messages": stats.to_dict()["messages"],
+        "timings": stats.timings,
+        "counters": stats.counters,
+    }
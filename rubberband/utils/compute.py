@@ -0,0 +1,185 @@
+"""Run CPU bound work like IPET parsing and evaluation in a pool of worker processes."""
+
+import os
+import pickle
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from tornado.options import options
+
+
+class ComputeQueueFull(Exception):
+    """Raised if too many tasks are already waiting for the compute workers."""
+
+
+class ComputeTimeout(Exception):
+    """Raised if a task didn't finish in time."""
+
+
+class ComputeError(Exception):
+    """Raised in place of an exception of a task that can't be passed to the parent."""
+
+
+def _init_worker(option_values):
+    """
+    Prepare a freshly spawned worker process.
+
+    Parameters
+    ----------
+    option_values : dict
+        tornado options of the parent process
+    """
+    # imported here, since the boilerplate imports all handlers
+    from rubberband.boilerplate import setup_elasticsearch
+
+    for name, value in option_values.items():
+        setattr(options, name, value)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s%(msecs)03d %(levelname)-5s %(name)-15s %(message)s",
+        datefmt="%d-%m-%Y %H:%M:%S - ",
+    )
+    setup_elasticsearch()
+
+    # parse the IPET readers before the first import instead of during it
+    from .ipetreaders import get_registry
+
+    try:
+        get_registry().load()
+    except Exception:
+        logging.getLogger(__name__).exception("Couldn't load the IPET readers.")
+
+
+def _run_pickled(fn, args, kwargs):
+    """Call fn in the worker and pickle the result with the most compact protocol."""
+    try:
+        return pickle.dumps(fn(*args, **kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        # exceptions like those of elasticsearch pickle, but fail to unpickle in the
+        # parent, which would lose the error
+        logging.getLogger(__name__).exception("{} failed.".format(fn.__name__))
+        raise ComputeError("{}: {}".format(type(e).__name__, e)) from None
+
+
+class ComputeService(object):
+    """A process pool that request handlers can await without blocking the IOLoop."""
+
+    def __init__(self, workers=None, max_queue=None, timeout=None):
+        """
+        Initialize a ComputeService object, the processes are started on first use.
+
+        Parameters
+        ----------
+        workers : int
+            Number of worker processes, 0 for one per cpu (default options.compute_workers)
+        max_queue : int
+            Maximal number of waiting and running tasks (default options.compute_max_queue)
+        timeout : int
+            Default timeout of a task in seconds (default options.compute_timeout)
+        """
+        if workers is None:
+            workers = options.compute_workers
+        self.workers = workers or os.cpu_count()
+        self.max_queue = max_queue or options.compute_max_queue
+        self.timeout = timeout or options.compute_timeout
+        self.pending = 0
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+
+    @property
+    def executor(self):
+        """Return the process pool, start it if necessary."""
+        if self._executor is None:
+            # spawn fresh processes instead of forking the tornado process with its
+            # open sockets and elasticsearch connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(options.as_dict(),),
+            )
+        return self._executor
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker process and wait for the result.
+
+        fn and its arguments have to be picklable. If the request waiting for the result
+        is cancelled or runs into the timeout, a task that didn't start yet is removed
+        from the queue. A task that is already running can't be interrupted, its result
+        is dropped.
+
+        Parameters
+        ----------
+        fn : function
+            module level function to call
+        timeout : int
+            seconds to wait for the result (default self.timeout)
+
+        Returns
+        -------
+        object
+            return value of fn
+
+        Raises
+        ------
+        ComputeQueueFull
+            if max_queue tasks are already pending
+        ComputeTimeout
+            if the task didn't finish in time
+        ComputeError
+            if fn raised an exception
+        """
+        if self.pending >= self.max_queue:
+            raise ComputeQueueFull(
+                "{} tasks are already waiting for the compute workers.".format(
+                    self.pending
+                )
+            )
+
+        self.pending += 1
+        try:
+            future = self.executor.submit(_run_pickled, fn, args, kwargs)
+            # cancelling the wrapped future also cancels the task if it is still queued
+            data = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            msg = "{} didn't finish within {}s.".format(
+                fn.__name__, timeout or self.timeout
+            )
+            self.logger.error(msg)
+            raise ComputeTimeout(msg)
+        except BrokenProcessPool:
+            # a worker died (e.g. out of memory), start a new pool for the next task
+            self.logger.error("A compute worker died, restarting the pool.")
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+
+        return pickle.loads(data)
+
+    def shutdown(self, wait=False):
+        """Stop the worker processes and drop all queued tasks."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_service = None
+_service_pid = None
+
+
+def get_compute_service():
+    """Return the ComputeService of this process."""
+    global _service, _service_pid
+    # tornado forks the server processes, every process needs its own pool
+    if _service is None or _service_pid != os.getpid():
+        _service = ComputeService()
+        _service_pid = os.getpid()
+    return _service
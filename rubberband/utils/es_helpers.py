@@ -1,7 +1,12 @@
 """Helper methods for elasticsearch queries."""
 
+from collections import Counter
 from datetime import datetime, timedelta
 
+from elasticsearch.helpers import streaming_bulk
+from elasticsearch.dsl.connections import connections
+from tornado.options import options
+
 
 def get_uniques(model, field):
     """
@@ -36,3 +41,140 @@ def get_uniques(model, field):
     hot_values = [i.key for i in response.aggregations.hot_counts.buckets]
     values = [v for v in values if v not in hot_values]
     return values, hot_values
+
+
+def bulk_save(
+    documents,
+    chunk_size=None,
+    max_chunk_bytes=None,
+    max_retries=None,
+    initial_backoff=None,
+    delete=(),
+):
+    """
+    Index a list of documents with the elasticsearch bulk api.
+
+    Chunks that are rejected by elasticsearch because it is overloaded (status 429)
+    are retried with exponential backoff. Errors of single documents don't abort
+    the request, they are collected and returned.
+
+    Parameters
+    ----------
+    documents : iterable of rubberband.model
+        Documents to save.
+    chunk_size : int
+        Number of documents per request (default options.bulk_chunk_size)
+    max_chunk_bytes : int
+        Maximal size of a request in bytes (default options.bulk_max_chunk_bytes)
+    max_retries : int
+        Number of retries of a rejected chunk (default options.bulk_max_retries)
+    initial_backoff : int
+        Seconds to wait before the first retry (default options.bulk_initial_backoff)
+    delete : iterable of rubberband.model
+        Documents to delete in the same requests, after the documents are saved
+        (default ())
+
+    Returns
+    -------
+    list, list
+        ids of the saved documents and a list of error dictionaries.
+    """
+
+    def actions():
+        for doc in documents:
+            doc.full_clean()
+            yield doc.to_dict(include_meta=True)
+        for doc in delete:
+            yield {"_op_type": "delete", "_index": doc._get_index(), "_id": doc.meta.id}
+
+    ids = []
+    errors = []
+    for ok, item in streaming_bulk(
+        connections.get_connection(),
+        actions(),
+        chunk_size=chunk_size or options.bulk_chunk_size,
+        max_chunk_bytes=max_chunk_bytes or options.bulk_max_chunk_bytes,
+        max_retries=options.bulk_max_retries if max_retries is None else max_retries,
+        initial_backoff=initial_backoff or options.bulk_initial_backoff,
+        raise_on_error=False,
+    ):
+        # item is of the form {op_type: {"_id": ..., "status": ..., ...}}
+        op_type, info = next(iter(item.items()))
+        if op_type == "delete":
+            # a document that is already gone doesn't need to be deleted
+            if not ok and info.get("status") != 404:
+                errors.append(info)
+        elif ok:
+            ids.append(info["_id"])
+        else:
+            errors.append(info)
+
+    return ids, errors
+
+
+def delete_matching(search, requests_per_second=None):
+    """
+    Delete the documents matching a search with a single delete_by_query request.
+
+    Elasticsearch deletes the documents in parallel slices, one per shard, and
+    continues on version conflicts, e.g. with a concurrent reimport.
+
+    Parameters
+    ----------
+    search : elasticsearch.dsl.Search
+        Search for the documents to delete.
+    requests_per_second : float
+        Throttle of the deletion in documents per second, -1 for no throttle
+        (default options.delete_requests_per_second)
+
+    Returns
+    -------
+    int
+        number of deleted documents
+    """
+    if requests_per_second is None:
+        requests_per_second = options.delete_requests_per_second
+    response = search.params(
+        slices="auto",
+        conflicts="proceed",
+        refresh=True,
+        requests_per_second=requests_per_second,
+    ).delete()
+    return response.deleted
+
+
+def count_terms(search, field, size=1000):
+    """
+    Count the values of a field in the documents matching a search.
+
+    The values are aggregated by elasticsearch page by page, the documents are not
+    loaded.
+
+    Parameters
+    ----------
+    search : elasticsearch.dsl.Search
+        Search for the documents.
+    field : str
+        Keyword field to count.
+    size : int
+        Number of values per request (default 1000)
+
+    Returns
+    -------
+    collections.Counter
+        number of documents by value
+    """
+    counts = Counter()
+    after = None
+    while True:
+        s = search.extra(size=0)
+        composite = {"size": size, "sources": [{"value": {"terms": {"field": field}}}]}
+        if after is not None:
+            composite["after"] = after
+        s.aggs.bucket("values", "composite", **composite)
+        values = s.execute().aggregations.values
+        for bucket in values.buckets:
+            counts[bucket.key.value] += bucket.doc_count
+        if len(values.buckets) < size or "after_key" not in values:
+            return counts
+        after = values.after_key.to_dict()
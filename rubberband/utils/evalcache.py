@@ -0,0 +1,253 @@
+"""Cache for the results of IPET evaluations."""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+
+from tornado.options import options
+
+from .hasher import generate_sha256_hash
+
+MB = 1024 * 1024
+ENTRY_SUFFIX = ".pkl"
+TESTSET_DIR = "testsets"
+
+
+class EvaluationCache(object):
+    """
+    Store evaluated tables on disk, so that the same comparison isn't evaluated twice.
+
+    An entry is addressed by the content it was computed from (see `make_key`). Every
+    TestSet keeps a list of the entries that it is part of with the version of the
+    TestSet they were computed from, such that these entries can be dropped when the
+    TestSet gets reimported or deleted. Entries of older versions are dropped when an
+    entry of the current version is stored. If the cache grows larger than its size
+    limit, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory=None, max_size=None):
+        """
+        Initialize an EvaluationCache object.
+
+        Parameters
+        ----------
+        directory : str
+            Directory to store the entries in (default options.eval_cache_dir)
+        max_size : int
+            Size limit of the cache in MB, 0 disables the cache
+            (default options.eval_cache_size)
+        """
+        self.directory = directory or options.eval_cache_dir
+        if max_size is None:
+            max_size = options.eval_cache_size
+        self.max_bytes = max_size * MB
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self):
+        """Return True if the cache is allowed to store entries."""
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(testruns, evalfile, tolerance, droplist, default_id, style=None):
+        """
+        Compute the key of an evaluation.
+
+        Parameters
+        ----------
+        testruns : list
+            evaluated rubberband TestSets
+        evalfile : dict or str
+            entry of IPET_EVALUATIONS or the xml string of the evaluation
+        tolerance : float
+            tolerance of the evaluation
+        droplist : str
+            comma separated regular expressions of excluded instances
+        default_id : str
+            id of the TestSet that defines the default group
+        style : str
+            output style of the evaluation (default None)
+
+        Returns
+        -------
+        str
+            hex digest identifying the evaluation
+        """
+        if isinstance(evalfile, dict):
+            evalhash = generate_sha256_hash(evalfile["path"])
+        else:
+            evalhash = hashlib.sha256(evalfile.encode("utf-8")).hexdigest()
+
+        versions = sorted([t.meta.id, _version(t)] for t in testruns)
+        keydata = {
+            "testruns": versions,
+            "evaluation": evalhash,
+            "tolerance": str(float(tolerance)),
+            "droplist": droplist,
+            "default": default_id,
+            "style": style,
+        }
+        return hashlib.sha256(
+            json.dumps(keydata, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _testset_path(self, testset_id):
+        return os.path.join(self.directory, TESTSET_DIR, testset_id)
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+
+        Returns
+        -------
+        object
+            the stored value or None if there is no such entry
+        """
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.logger.exception(
+                "Dropping unreadable evaluation cache entry {}".format(key)
+            )
+            self._remove(path)
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.logger.info("Using cached evaluation {}".format(key))
+        return value
+
+    def put(self, key, testruns, value):
+        """
+        Store an entry.
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        testruns : list
+            TestSets that the entry was computed from
+        value : object
+            picklable value to store
+        """
+        if not self.enabled:
+            return
+
+        os.makedirs(os.path.join(self.directory, TESTSET_DIR), exist_ok=True)
+
+        # write to a temporary file first, so that readers never see a partial entry
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, self._entry_path(key))
+
+        versions = {t.meta.id: _version(t) for t in testruns}
+        for testset_id, version in versions.items():
+            self._update_index(testset_id, version, key)
+
+        self.evict()
+
+    def _read_index(self, testset_id):
+        """Return the keys and versions of the entries of a TestSet."""
+        try:
+            with open(self._testset_path(testset_id)) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return []
+        # lines without a version can't be current
+        return [(line.split("\t") + [None])[:2] for line in lines if line]
+
+    def _update_index(self, testset_id, version, key):
+        """Add an entry to the list of a TestSet, drop the entries of older versions."""
+        current = {key}
+        for k, v in self._read_index(testset_id):
+            if v != version:
+                self._remove(self._entry_path(k))
+            elif os.path.exists(self._entry_path(k)):
+                current.add(k)
+
+        # a key that another process adds at the same time may get lost, its entry is
+        # never used for a newer version and gets evicted eventually
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.writelines("{}\t{}\n".format(k, version) for k in sorted(current))
+        os.replace(tmppath, self._testset_path(testset_id))
+
+    def invalidate(self, testset_id):
+        """
+        Remove all entries that were computed from a TestSet.
+
+        Parameters
+        ----------
+        testset_id : str
+            id of the TestSet
+        """
+        path = self._testset_path(testset_id)
+        if not os.path.exists(path):
+            return
+
+        keys = {k for k, _ in self._read_index(testset_id)}
+        for key in keys:
+            self._remove(self._entry_path(key))
+        self._remove(path)
+        self.logger.info(
+            "Removed {} cached evaluations of {}".format(len(keys), testset_id)
+        )
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits into its size limit."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _version(testset):
+    """Return the version of a TestSet, its index timestamp changes with every reimport."""
+    return str(testset.index_timestamp)
@@ -0,0 +1,203 @@
+"""Delete expired TestSets and run the deletion in only one process."""
+
+import os
+import json
+import time
+import fcntl
+import logging
+from collections import Counter
+from datetime import date
+
+from rubberband.constants import FILES_DIR
+from rubberband.models import (
+    TestSet,
+    Settings,
+    File,
+    FileChunk,
+    Instance,
+    Result,
+    ResultSnapshot,
+)
+from .es_helpers import count_terms, delete_matching
+from .evalcache import EvaluationCache
+
+# number of TestSets whose documents are deleted with one request per index
+BATCH_SIZE = 500
+
+
+def delete_expired_testsets(batch_size=BATCH_SIZE, requests_per_second=None):
+    """
+    Delete the TestSets whose expirationdate has passed with everything they own.
+
+    The Results, Files, Settings and ResultSnapshots of a batch of TestSets are
+    deleted with one delete_by_query per index, see `delete_matching`. The progress
+    is logged after every batch.
+
+    Parameters
+    ----------
+    batch_size : int
+        number of TestSets per batch (default BATCH_SIZE)
+    requests_per_second : float
+        throttle of the deletions, -1 for no throttle
+        (default options.delete_requests_per_second)
+
+    Returns
+    -------
+    dict
+        numbers of deleted documents by type and seconds spent by stage
+    """
+    logger = logging.getLogger(__name__)
+    counts = Counter()
+    timings = Counter()
+
+    def delete(kind, search):
+        start = time.perf_counter()
+        counts[kind] += delete_matching(search, requests_per_second)
+        timings[kind] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    expired = TestSet.search().filter("range", expirationdate={"lte": date.today()})
+    testsets = list(expired.source(False).scan())
+    timings["search"] = time.perf_counter() - start
+    logger.info("Found {} expired testsets to delete.".format(len(testsets)))
+
+    for offset in range(0, len(testsets), batch_size):
+        batch = testsets[offset : offset + batch_size]
+        ids = [t.meta.id for t in batch]
+
+        files = File.search().filter("terms", testset_id=ids)
+        filenames = [f.filename for f in files.source(["filename"]).scan()]
+        delete("files", files)
+
+        # Settings stored by content may be shared, they are collected below
+        delete("settings", Settings.search().filter("terms", testset_id=ids))
+
+        # the catalog counts are aggregated before the Results are gone
+        results = Result.search().filter("terms", testset_id=ids)
+        names = count_terms(results, "instance_name")
+        delete("results", results)
+        Instance.update_counts(names, sign=-1)
+
+        delete("snapshots", ResultSnapshot.search().filter("terms", testset_id=ids))
+        delete("testsets", TestSet.search().filter("ids", values=ids))
+
+        cache = EvaluationCache()
+        for testset_id in ids:
+            cache.invalidate(testset_id)
+
+        # files from before the chunked storage
+        for filename in filenames:
+            path = os.path.join(FILES_DIR, filename)
+            if os.path.exists(path):
+                os.remove(path)
+
+        logger.info(
+            "Deleted {}/{} expired testsets, {} results, {:.1f}s.".format(
+                offset + len(batch),
+                len(testsets),
+                counts["results"],
+                time.perf_counter() - start,
+            )
+        )
+
+    # delete the chunks and Settings that belonged only to the deleted TestSets
+    for kind, document in (("chunks", FileChunk), ("shared settings", Settings)):
+        stage_start = time.perf_counter()
+        counts[kind] = document.delete_unreferenced()
+        timings[kind] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - start
+
+    logger.info(
+        "Finished deleting expired testsets in {:.1f}s: {}.".format(
+            timings["total"], ", ".join("{} {}".format(n, k) for k, n in counts.items())
+        )
+    )
+    return {"counts": dict(counts), "timings": dict(timings)}
+
+
+class RunLock(object):
+    """
+    A lock file that lets one of several processes run a periodic job.
+
+    Every process can try to run the job. The one that gets the exclusive lock on
+    the file runs it if its last run finished more than an interval ago, and records
+    the run in the file. The others skip it, so the job runs once per interval even
+    if processes die or start at different times.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize a RunLock object.
+
+        Parameters
+        ----------
+        path : str
+            path of the lock file, created if necessary
+        """
+        self.path = path
+
+    def last_run(self):
+        """
+        Read the record of the last run.
+
+        Returns
+        -------
+        dict
+            start and end time, process id and result of the last run, {} if the job
+            never ran
+        """
+        try:
+            with open(self.path) as f:
+                return json.loads(f.read() or "{}")
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def run(self, interval, job):
+        """
+        Run a job unless another process runs it or it ran recently.
+
+        A job that raises an exception isn't recorded, the next attempt runs it again.
+
+        Parameters
+        ----------
+        interval : float
+            seconds that have to pass between the end of the last run and the next one
+        job : callable
+            the job, its result has to be json serializable
+
+        Returns
+        -------
+        bool
+            True if the job ran in this process
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a+") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                f.seek(0)
+                try:
+                    last = json.loads(f.read() or "{}")
+                except ValueError:
+                    last = {}
+                if time.time() - last.get("finished", 0) < interval:
+                    return False
+
+                started = time.time()
+                result = job()
+                record = {
+                    "started": started,
+                    "finished": time.time(),
+                    "pid": os.getpid(),
+                    "result": result,
+                }
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(record))
+                f.flush()
+                os.fsync(f.fileno())
+                return True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
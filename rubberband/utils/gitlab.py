@@ -1,38 +1,221 @@
 """Methods to use for the communication with gitlab."""
 
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from tornado.options import options
 from gitlab import Gitlab
+from gitlab.exceptions import GitlabGetError
+
+from .ttlcache import TTLCache
+
+# number of commits that are fetched from gitlab at the same time by prefetch_commits
+PREFETCH_WORKERS = 8
+
+# access level of users that gitlab doesn't know or that can't be looked up offline
+MIN_ACCESS_LEVEL = 20
+
+_client = None
+_client_pid = None
+
+
+def get_client():
+    """Return the gitlab client of this process, create it on first use."""
+    global _client, _client_pid
+    # the http session of the client must not be shared with forked processes
+    if _client is None or _client_pid != os.getpid():
+        _client = Gitlab(
+            options.gitlab_url,
+            options.gitlab_private_token,
+            timeout=options.gitlab_timeout,
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the gitlab client of this process, e.g. by a fake for tests.
+
+    Parameters
+    ----------
+    client : gitlab.Gitlab
+        client to use
+    """
+    global _client, _client_pid
+    _client = client
+    _client_pid = os.getpid()
+
+
+def cached(namespace, key, lookup, offline_value=None):
+    """
+    Return a cached value or look it up and cache it.
+
+    Parameters
+    ----------
+    namespace : str
+        namespace of the value in the cache
+    key : str
+        key of the value
+    lookup : function
+        returns the value and whether it was found, i.e. (value, found); values that
+        were not found are cached for options.gitlab_negative_cache_ttl seconds
+    offline_value : object
+        returned instead of calling lookup if options.gitlab_offline is set and the
+        value isn't cached (default None)
+
+    Returns
+    -------
+    object
+        the value
+    """
+    if options.gitlab_cache_ttl <= 0:
+        return offline_value if options.gitlab_offline else lookup()[0]
+
+    cache = TTLCache(namespace)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry["value"]
+    if options.gitlab_offline:
+        return offline_value
+
+    value, found = lookup()
+    ttl = options.gitlab_cache_ttl if found else options.gitlab_negative_cache_ttl
+    cache.set(key, {"value": value}, ttl)
+    return value
 
 
 def get_commit_data(project_id, git_hash):
     """
     Get commit information from the git hash.
 
+    Commits are cached for options.gitlab_commit_cache_ttl seconds under their full
+    hash and the hash they were looked up with. A short hash is also resolved from
+    the cache if a commit starting with it was cached under another hash.
+
     Parameters
     ----------
     project_id : int
         Id of project in gitlab.
     git_hash : str
-        Githash of commit to look up.
+        Githash of commit to look up, full or abbreviated.
+
+    Returns
+    -------
+    dict
+        the commit with keys "id" (full hash), "short_id", "authored_date",
+        "author_email" and "author" (gitlab username of the author), None if gitlab
+        doesn't know the commit or it isn't cached in offline mode
+    """
+    return prefetch_commits(project_id, [git_hash])[_strip_dirty(git_hash)]
+
+
+def prefetch_commits(project_id, hashes, workers=PREFETCH_WORKERS):
+    """
+    Look up several commits and cache them, e.g. before importing many logfiles.
+
+    Commits that aren't cached are fetched from gitlab in parallel.
+
+    Parameters
+    ----------
+    project_id : int
+        Id of project in gitlab.
+    hashes : list
+        Githashes of the commits, full or abbreviated, "-dirty" suffixes are ignored.
+    workers : int
+        Number of commits that are fetched at the same time (default PREFETCH_WORKERS)
 
     Returns
     -------
-    commit object
-        requested commit
+    dict
+        commits by hash (without "-dirty"), see `get_commit_data`
     """
+    cache = TTLCache("gitlab_commit:{}".format(project_id))
+    commits = {}
+    missing = []
+    for git_hash in set(_strip_dirty(h) for h in hashes):
+        entry = _cached_commit(cache, git_hash)
+        if entry is not None:
+            commits[git_hash] = entry["commit"]
+        else:
+            missing.append(git_hash)
+
+    if not missing:
+        return commits
+    if options.gitlab_offline:
+        commits.update((git_hash, None) for git_hash in missing)
+        return commits
+
+    def lookup(git_hash):
+        try:
+            return _lookup_commit(project_id, git_hash), True
+        except Exception:
+            # gitlab is unreachable, try again next time
+            logging.getLogger(__name__).exception(
+                "Couldn't look up commit {} in gitlab.".format(git_hash)
+            )
+            return None, False
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+        for git_hash, (commit, answered) in zip(missing, pool.map(lookup, missing)):
+            commits[git_hash] = commit
+            if not answered:
+                continue
+            if commit is None:
+                cache.set(git_hash, {"commit": None}, options.gitlab_negative_cache_ttl)
+                continue
+            for key in {git_hash, commit["id"]}:
+                cache.set(key, {"commit": commit}, options.gitlab_commit_cache_ttl)
+    return commits
+
+
+def _strip_dirty(git_hash):
+    """Remove the "-dirty" suffix of a githash."""
     if git_hash.endswith("-dirty"):
-        git_hash = git_hash.rstrip("-dirty")
+        return git_hash[: -len("-dirty")]
+    return git_hash
 
-    client = Gitlab(options.gitlab_url, options.gitlab_private_token)
-    commit = client.projects.get(project_id).commits.get(git_hash)
 
-    return commit
+def _cached_commit(cache, git_hash):
+    """Return the cache entry of a commit or None."""
+    entry = cache.get(git_hash)
+    if entry is not None:
+        return entry
+    # a short hash of a commit that was cached under a longer hash
+    found = {
+        e["commit"]["id"]: e for e in cache.get_prefix(git_hash).values() if e["commit"]
+    }
+    if len(found) == 1:
+        return next(iter(found.values()))
+    return None
+
+
+def _lookup_commit(project_id, git_hash):
+    """Ask gitlab for a commit, return it as dictionary or None if it doesn't exist."""
+    project = get_client().projects.get(project_id, lazy=True)
+    try:
+        commit = project.commits.get(git_hash)
+    except GitlabGetError as e:
+        if e.response_code == 404:
+            return None
+        raise
+    return {
+        "id": commit.id,
+        "short_id": commit.short_id,
+        "authored_date": commit.authored_date,
+        "author_email": commit.author_email,
+        "author": get_username(commit.author_email),
+    }
 
 
 def get_user_access_level(user_mail):
     """
     From email, find if user is either in the authenticated group or in the authenticated project.
 
+    The result is cached for options.gitlab_cache_ttl seconds. With
+    options.gitlab_offline, users that aren't cached get MIN_ACCESS_LEVEL.
+
     Parameters
     ----------
     user_email : str
@@ -43,7 +226,17 @@ def get_user_access_level(user_mail):
     int
         integer corresponding to gitlab access level (0: no, < 15: read, > 15: write, > 45: delete)
     """
-    client = Gitlab(options.gitlab_url, options.gitlab_private_token)
+    return cached(
+        "gitlab_access_level",
+        str(user_mail),
+        lambda: _lookup_access_level(user_mail),
+        offline_value=MIN_ACCESS_LEVEL,
+    )
+
+
+def _lookup_access_level(user_mail):
+    """Ask gitlab for the access level of a user, return (access level, found)."""
+    client = get_client()
     group_users = client.groups.get(options.gitlab_group_name).members.list(
         query=user_mail
     )
@@ -51,17 +244,17 @@ def get_user_access_level(user_mail):
     project_users = client.projects.get(principal_gitlab_project).members.list(
         query=user_mail
     )
-    min_access = 20
+    min_access = MIN_ACCESS_LEVEL
     # so something is wrong, return 0
     if (len(group_users) > 1 or len(project_users) > 1) or (
         len(group_users) == 0 and len(project_users) == 0
     ):
-        return min_access
+        return min_access, False
     if len(group_users + project_users) == 2:
         group_id = group_users[0].id
         project_id = project_users[0].id
         if not group_id == project_id:
-            return min_access
+            return min_access, False
         access_level = group_users[0].access_level
         project_access_level = project_users[0].access_level
         access_level = max(access_level, project_access_level)
@@ -70,13 +263,15 @@ def get_user_access_level(user_mail):
             access_level = group_users[0].access_level
         else:
             access_level = project_users[0].access_level
-    return max(min_access, access_level)
+    return max(min_access, access_level), True
 
 
 def get_username(query_string):
     """
     Get the gitlab/internal username from a search term (full name, email, etc).
 
+    The result is cached for options.gitlab_cache_ttl seconds.
+
     Parameters
     ----------
     query_string : str
@@ -87,13 +282,20 @@ def get_username(query_string):
     str
         username
     """
-    client = Gitlab(options.gitlab_url, options.gitlab_private_token)
+    return cached(
+        "gitlab_username",
+        str(query_string),
+        lambda: _lookup_username(query_string),
+        offline_value=query_string,
+    )
+
+
+def _lookup_username(query_string):
+    """Ask gitlab for the username, return (username, found)."""
     # here gitlab needs the "search" keyword, "query" will not work
-    authors = client.users.list(search=query_string)
+    authors = get_client().users.list(search=query_string)
 
     if len(authors) < 1:
-        return query_string
-    elif len(authors) > 1:
-        return authors[0].username
+        return query_string, False
 
-    return authors[0].username
+    return authors[0].username, True
@@ -1,23 +1,36 @@
 """Methods for importing a TestSet from logfiles."""
 
 import os
-import json
+import uuid
 import logging
 import traceback
 import dateutil.parser
+import numpy as np
+import pandas as pd
 from elasticsearch import TransportError
 from datetime import datetime
 
-from ipet import Experiment, Key
-from ipet.misc import loader
+from ipet import Key
 from tornado.options import options
 
 # package imports
-from rubberband.models import TestSet, Result, File, Settings
-from rubberband.constants import ADD_READERS, FORMAT_DATETIME, SOLU_DIR
+from rubberband.models import (
+    TestSet,
+    Result,
+    ResultSnapshot,
+    File,
+    FileChunk,
+    Instance,
+    Settings,
+)
+from rubberband.models.partitions import ensure_partition, partition_suffix
+from rubberband.constants import FORMAT_DATETIME, SOLU_DIR
 from rubberband.utils import gitlab as gl
 from .stats import ImportStats
 from .hasher import generate_sha256_hash
+from .es_helpers import bulk_save
+from .ipetreaders import new_experiment
+from .metrics import ImportMetrics
 
 REQUIRED_FILES = set([".out"])
 OPTIONAL_FILES = set([".solu", ".err", ".set", ".meta"])
@@ -29,7 +42,7 @@ for allsolucand in ["instancedb.sqlite3", "all.solu", "allpublic.solu"]:
 class Importer(object):
     """Organize and process retrieved files."""
 
-    def __init__(self, user):
+    def __init__(self, user, bulk=True, hashes=None):
         """
         Create a Importer object for a user.
 
@@ -37,11 +50,19 @@ class Importer(object):
         ----------
         user : str
             current user
+        bulk : bool
+            save the Results with the elasticsearch bulk api instead of one request
+            per instance (default True)
+        hashes : dict
+            sha256 hashes of files that were already computed during the upload,
+            indexed by path (default None)
         """
         if not user:
             raise Exception("Missing user when initializing client.")
 
         self.current_user = user
+        self.bulk = bulk
+        self.hashes = hashes or {}
         self.logger = logging.getLogger(__name__)
         self.logger.info(
             "{} opened a connection to Elasticsearch with the {}".format(
@@ -49,6 +70,9 @@ class Importer(object):
             )
         )
         self.tags = []
+        # sha256 hash of the settings file and the ids of the Settings read from it
+        self.set_hash = None
+        self.settings_ids = None
 
     def reimport_files(self, paths, testset):
         """
@@ -63,12 +87,14 @@ class Importer(object):
         """
         self.importstats = ImportStats("results", "")
         self.remove_files = True
-        try:
-            self.parse_file_bundle(paths, initial=False, testset=testset)
-        except Exception:
-            self.importstats.status = "fail"
-            traceback.print_exc()
-
+        with self.importstats.measure():
+            try:
+                self.parse_file_bundle(paths, initial=False, testset=testset)
+            except Exception:
+                self.importstats.status = "fail"
+                traceback.print_exc()
+
+        self.record_stats()
         return self.importstats
 
     def process_files(self, paths, tags=[], remove=True, expirationdate=None):
@@ -95,14 +121,25 @@ class Importer(object):
         self.tags = tags
         self.remove_files = remove
         self.logger.info("Found {} files. Beginning to parse.".format(total_files))
+        with self.importstats.measure():
+            try:
+                # parsing all locally saved files
+                self.parse_file_bundle(paths, expirationdate=expirationdate)
+            except Exception:
+                self.importstats.status = "fail"
+                traceback.print_exc()
+
+        self.record_stats()
+        return self.importstats
+
+    def record_stats(self):
+        """Log the metrics of the import and add them to the recent imports."""
+        self.importstats.log(self.logger, user=self.current_user)
         try:
-            # parsing all locally saved files
-            self.parse_file_bundle(paths, expirationdate=expirationdate)
+            ImportMetrics().add(self.importstats)
         except Exception:
-            self.importstats.status = "fail"
-            traceback.print_exc()
-
-        return self.importstats
+            # the metrics must not break imports
+            self.logger.exception("Couldn't record the import metrics.")
 
     def parse_file_bundle(
         self, bundle, expirationdate=None, initial=True, testset=None
@@ -124,16 +161,23 @@ class Importer(object):
         testset : TestSet
             TestSet if already existing (default: None)
         """
+        stats = self.importstats
         # validate and organize files (make sure they exist and are readable)
         self.files = self.validate_and_organize_files(bundle)
+        stats.count("files", sum(1 for f in self.files.values() if f))
+        stats.count("bytes", sum(os.path.getsize(f) for f in self.files.values() if f))
 
         # generate file hash
-        self.file_id = generate_sha256_hash(self.files[".out"])
+        with stats.stage("hash"):
+            self.file_id = self.file_hash(self.files[".out"])
+            if self.files[".set"] is not None:
+                self.set_hash = self.file_hash(self.files[".set"])
 
         # initial is true on upload, on reimport it is false
         if initial:
             # check if already existing
-            found = self.file_lookup()
+            with stats.stage("lookup"):
+                found = self.file_lookup()
             if found:
                 self.importstats.status = "found"
                 self.importstats.setUrl("/result/{}".format(found.meta.id))
@@ -145,13 +189,57 @@ class Importer(object):
                 self._log_info(msg)
                 return
 
+        file_data, results = self.prepare_structured_data(expirationdate=expirationdate)
+
+        # save the structured data in elasticsearch
+        with stats.stage("save"):
+            self.save_structured_data(file_data, results, testset=testset)
+        if initial:
+            with stats.stage("backup"):
+                self.backup_files()
+
+        # clean up filesystem if remove flag set
+        if self.remove_files:
+            for t, f in self.files.items():
+                if f and not f == ALL_SOLU:
+                    os.remove(f)
+
+        self._log_info("Finished!")
+
+    def prepare_structured_data(self, expirationdate=None):
+        """
+        Parse the validated files with IPET and organize the data for elasticsearch.
+
+        Parameters
+        ----------
+        expirationdate : str in date form
+            Date after which data can be purged from elasticsearch (default: None)
+
+        Returns
+        -------
+        dict, list
+            data about the TestSet and data of the individual instances
+        """
+        stats = self.importstats
+        self.settings_ids = None
+        if self.set_hash is not None:
+            with stats.stage("settings"):
+                self.settings_ids = Settings.find_by_set_hash(self.set_hash)
         # parse files with ipet
-        ipettestrun = self.get_data_from_ipet()
+        with stats.stage("ipet"):
+            ipettestrun = self.get_data_from_ipet()
         # data is the 'data' DataFrame from ipet.TestRun
-        data = json.loads(ipettestrun.data.to_json())
-
-        # get the scipparameters (from settings file) and their defaults from ipet
-        settings = ipettestrun.getParameterData()
+        data = ipettestrun.data
+        stats.count("rows", len(data))
+        stats.count("columns", len(data.columns))
+
+        # get the scipparameters (from settings file) and their defaults from ipet,
+        # unless they were read from the same settings file before
+        if self.settings_ids is None:
+            settings = ipettestrun.getParameterData()
+        else:
+            settings = None
+            stats.count("known_settings", 1)
 
         # organize data into file_data and results
         # get data from getter of testrun.metadatadict
@@ -164,20 +252,10 @@ class Importer(object):
             data, settings=settings, expirationdate=expirationdate, metadata=md
         )
 
-        results = self.get_results_data(data)
-
-        # save the structured data in elasticsearch
-        self.save_structured_data(file_data, results, testset=testset)
-        if initial:
-            self.backup_files()
-
-        # clean up filesystem if remove flag set
-        if self.remove_files:
-            for t, f in self.files.items():
-                if f and not f == ALL_SOLU:
-                    os.remove(f)
+        with stats.stage("convert"):
+            results = self.get_results_data(data)
 
-        self._log_info("Finished!")
+        return file_data, results
 
     def get_results_data(self, data):
         """
@@ -185,40 +263,15 @@ class Importer(object):
 
         Parameters
         ----------
-        data : dict dict
-            Data from IPET
+        data : pandas.DataFrame
+            Data from IPET, one row per instance
 
         Returns
         -------
-        dict dict
-            modified data
-        """
-        results = {}
-        instances = data["Solver"].keys()
-
-        for i in instances:
-            results[i] = {"instance_name": data[Key.ProblemName][i], "instance_id": i}
-
-        for k, v in data.items():
-            for instance, metric in v.items():
-                k = k.replace(".", "_")
-                results[instance][k] = metric
-
-        # extra: determine type of instance and number of iterations
-        for k, v in results.items():
-            results[k]["instance_type"] = _determine_type(v)
-            iteration_values = [
-                results[k].get("LP_Iterations_barrierLP"),
-                results[k].get("LP_Iterations_dualLP"),
-                results[k].get("LP_Iterations_primalLP"),
-            ]
-
-            if None in set(iteration_values):
-                results[k]["Iterations"] = None
-            else:
-                results[k]["Iterations"] = sum(iteration_values)
-
-        return results.values()
+        list
+            dictionaries with the data of the instances
+        """
+        return frame_to_results(data, name_column=Key.ProblemName)
 
     def _log_failure(self, message):
         """
@@ -229,6 +282,8 @@ class Importer(object):
         message : str
             Message to log.
         """
+        # the stats are pickled to the parent process, keep only plain strings
+        message = str(message)
         self.logger.error(message)
         if not hasattr(self, "files"):
             self.importstats.logMessage("_", message)
@@ -254,8 +309,8 @@ class Importer(object):
 
         Parameters
         ----------
-        data : dict
-            Data in json format from ipet
+        data : pandas.DataFrame
+            Data from ipet
         settings
             Settings parameterdata dictionary from ipet (default: None)
         expirationdate : str in date form
@@ -309,7 +364,8 @@ class Importer(object):
             file_data.update(self.parse_info_from_filename(self.files))
 
         if options.gitlab_url:
-            file_data["run_initiator"] = gl.get_username(self.current_user)
+            with self.importstats.stage("gitlab"):
+                file_data["run_initiator"] = gl.get_username(self.current_user)
         else:
             file_data["run_initiator"] = self.current_user
 
@@ -318,11 +374,11 @@ class Importer(object):
             file_data["settings_default"] = settings[1]
 
         # get git data if it is available
-        if "GitHash" in data and data["GitHash"]:
-            git_hash = file_data["git_hash"]
+        git_hash = file_data["git_hash"]
+        if git_hash is not None:
             file_data["git_hash_dirty"] = git_hash.endswith("-dirty")
             if file_data["git_hash_dirty"]:
-                git_hash = git_hash.rstrip("-dirty")
+                git_hash = git_hash[: -len("-dirty")]
 
             project_id_key = options.gitlab_project_ids.get(file_data["solver"].lower())
             if not project_id_key:
@@ -331,22 +387,20 @@ class Importer(object):
                 )
                 self._log_info(msg)
             elif options.gitlab_url:
-                try:
+                with self.importstats.stage("gitlab"):
                     commit = gl.get_commit_data(project_id_key, git_hash)
-
-                    file_data["git_hash"] = commit.id
-                    # user the author timestamp
-                    file_data["git_commit_timestamp"] = dateutil.parser.parse(
-                        commit.authored_date
-                    )
-                    file_data["git_commit_author"] = gl.get_username(
-                        commit.author_email
-                    )
-                except Exception:
+                if commit is None:
                     msg = "Couldn't find commit {} in Gitlab. Aborting...".format(
                         git_hash
                     )
                     self._log_failure(msg)
+                else:
+                    file_data["git_hash"] = commit["id"]
+                    # user the author timestamp
+                    file_data["git_commit_timestamp"] = dateutil.parser.parse(
+                        commit["authored_date"]
+                    )
+                    file_data["git_commit_author"] = commit["author"]
 
         return file_data
 
@@ -456,68 +510,70 @@ class Importer(object):
             (default: None)
         """
         try:
-            settings = file_level_data.pop("settings")
-            settings_default = file_level_data.pop("settings_default")
+            settings = file_level_data.pop("settings", None)
+            settings_default = file_level_data.pop("settings_default", None)
+            if settings is not None:
+                settings_ids = Settings.store(
+                    settings, settings_default, set_hash=self.set_hash
+                )
+            else:
+                settings_ids = self.settings_ids or (None, None)
+            file_level_data["settings_id"], file_level_data["default_settings_id"] = (
+                settings_ids
+            )
+
             if testset is None:
                 file_level_data["upload_timestamp"] = file_level_data["index_timestamp"]
                 file_level_data["uploader"] = file_level_data["run_initiator"]
+                # the Results and Files are stored in the partition of the upload
+                file_level_data["partition"] = partition_suffix(
+                    file_level_data["index_timestamp"]
+                )
                 f = TestSet(**file_level_data)
                 f.save()
 
-                settings = Settings(**settings, testset_id=f.meta.id)
-                settings.save()
-
-                default_settings = Settings(**settings_default, testset_id=f.meta.id)
-                default_settings.save()
-
-                f.update(
-                    settings_id=settings.meta.id,
-                    default_settings_id=default_settings.meta.id,
-                )
-
             else:
                 f = testset
                 if f.upload_timestamp is None:
                     file_level_data["upload_timestamp"] = f.index_timestamp
                 if f.uploader is None:
                     file_level_data["uploader"] = f.run_initiator
-                f.update(**file_level_data)
-
-                settings = Settings(**settings, testset_id=f.meta.id)
-                settings.save()
-
-                default_settings = Settings(**settings_default, testset_id=f.meta.id)
-                default_settings.save()
-
-                f.update(
-                    settings_id=settings.meta.id,
-                    default_settings_id=default_settings.meta.id,
-                )
+                # the snapshot is outdated as soon as the first Result changes
+                f.update(snapshot_version=None, **file_level_data)
 
             self.testset_meta_id = f.meta.id  # save this for backup step
-            result_ids = []
-            for r in results:
-                r["testset_id"] = f.meta.id
-                # TODO move this to constructor of Result model?
-                for key in ["Datetime_Start", "Datetime_End"]:
-                    try:
-                        timestamp = int(r[key])
-                        timestr = datetime.fromtimestamp(timestamp).strftime(
-                            FORMAT_DATETIME
+            self.partition = f.partition
+            result_index = ensure_partition(Result, f.partition)
+            result_docs = [
+                Result(**r, testset_id=f.meta.id, meta={"index": result_index})
+                for r in results
+            ]
+
+            if testset is not None:
+                result_ids = self.sync_results(f, result_docs)
+            elif self.bulk:
+                result_ids, errors = bulk_save(result_docs)
+                for error in errors:
+                    self._log_failure(
+                        "Couldn't save result {}: {}".format(
+                            error.get("_id"), error.get("error")
                         )
-                        r[key] = timestr
-                    except (KeyError, TypeError):
-                        pass
-                res = Result(**r)
-                res.save()
-                result_ids.append(res.meta.id)
+                    )
+            else:
+                result_ids = []
+                for res in result_docs:
+                    res.save()
+                    result_ids.append(res.meta.id)
 
             f.update(result_ids=result_ids)
+            if testset is None:
+                Instance.update_counts(r.instance_name for r in result_docs)
+            self.save_snapshot(f, result_docs)
         except Exception as e:
             # database error
             msg = "Some kind of database error."
             self._log_failure(msg)
-            self._log_failure(e)
+            self._log_failure(str(e))
             raise
 
         msg = "Data for file {} was successfully imported and archived".format(
@@ -527,6 +583,99 @@ class Importer(object):
         self.importstats.status = "success"
         self.importstats.setUrl("/result/{}".format(self.testset_meta_id))
 
+    def save_snapshot(self, testset, result_docs):
+        """
+        Save the Results of a TestSet as ResultSnapshot and mark it as current.
+
+        The snapshot only speeds up loading the TestSet, if it can't be saved, the
+        Results are loaded instead.
+
+        Parameters
+        ----------
+        testset : TestSet
+            the imported TestSet
+        result_docs : list
+            the Results of the TestSet
+        """
+        version = uuid.uuid4().hex
+        try:
+            snapshot = ResultSnapshot.from_records(
+                testset.meta.id, version, [r.to_dict() for r in result_docs]
+            )
+            snapshot.save()
+        except Exception:
+            self.logger.exception("Couldn't save the snapshot of the results.")
+            return
+        testset.update(snapshot_version=version)
+        self.importstats.count("snapshot_bytes", snapshot.size)
+
+    def sync_results(self, testset, result_docs):
+        """
+        Update the Results of an existing TestSet to the reimported ones.
+
+        The Results are matched by instance id. Only new and changed Results are
+        written and Results of vanished instances are deleted, with the bulk api. The
+        Results are replaced in place and deleted last, so a reader finds every
+        instance of the TestSet, in the old or the new version. The update isn't
+        atomic: the periodic refresh of the index can make part of the new Results
+        visible while the rest is still written, so a reader may see a mix of both.
+
+        Parameters
+        ----------
+        testset : TestSet
+            the reimported TestSet
+        result_docs : list
+            the reimported Results
+
+        Returns
+        -------
+        list
+            ids of the Results of the TestSet
+        """
+        s = Result.search().filter("term", testset_id=testset.meta.id)
+        existing = {r.instance_id: r for r in s.scan()}
+
+        result_ids = []
+        changed = []
+        added = []
+        removed = []
+        for doc in result_docs:
+            old = existing.pop(doc.instance_id, None)
+            if old is None:
+                changed.append(doc)
+                added.append(doc.instance_name)
+                continue
+            doc.meta.id = old.meta.id
+            doc.meta.index = old.meta.index
+            if old.to_dict() == _stored(doc).to_dict():
+                result_ids.append(old.meta.id)
+                continue
+            changed.append(doc)
+            if old.instance_name != doc.instance_name:
+                added.append(doc.instance_name)
+                removed.append(old.instance_name)
+        deleted = list(existing.values())
+        removed.extend(r.instance_name for r in deleted)
+
+        saved_ids, errors = bulk_save(changed, delete=deleted)
+        for error in errors:
+            self._log_failure(
+                "Couldn't update result {}: {}".format(
+                    error.get("_id"), error.get("error")
+                )
+            )
+        # make the remaining changes visible now, instead of with the next periodic refresh
+        Result._index.refresh()
+
+        Instance.update_counts(added)
+        Instance.update_counts(removed, sign=-1)
+        self._log_info(
+            "Reimport wrote {} of {} results and deleted {}.".format(
+                len(changed), len(result_docs), len(deleted)
+            )
+        )
+        return result_ids + saved_ids
+
     def backup_files(self):
         """Save all file contents in Elasticsearch."""
         # remove solu file from checkin
@@ -539,29 +688,57 @@ class Importer(object):
             data = {
                 "type": ftype.lstrip("."),
                 "filename": basename,
-                "hash": generate_sha256_hash(f),
+                "hash": self.file_hash(f),
                 "testset_id": self.testset_meta_id,
             }
-            with open(f) as f_in:
+            with open(f, "rb") as f_in:
                 self._log_info("Backing up {} in Elasticsearch".format(f))
-
-                data["text"] = f_in.read()
-                try:
-                    fobj = File(**data)
-                    fobj.save()
-                except TransportError as e:
-                    msg = (
-                        "Couldn't create file in Elasticsearch. Check the logs for more info."
-                        " Aborting..."
-                    )
-                    self._log_failure(msg)
-                    self._log_failure(e.args)
-                    raise
+                fobj = File(
+                    **data, meta={"index": ensure_partition(File, self.partition)}
+                )
+                chunks = fobj.set_contents(f_in.read())
+
+            # save the chunks first, a File must not refer to missing chunks
+            missing = FileChunk.missing(chunks)
+            self.importstats.count("chunks", len(chunks))
+            self.importstats.count("new_chunks", len(missing))
+            _, errors = bulk_save(missing)
+            if errors:
+                self._log_failure("Couldn't save chunks of {}: {}".format(f, errors))
+                raise Exception("Couldn't back up {} in Elasticsearch.".format(f))
+            try:
+                fobj.save()
+            except TransportError as e:
+                msg = (
+                    "Couldn't create file in Elasticsearch. Check the logs for more info."
+                    " Aborting..."
+                )
+                self._log_failure(msg)
+                self._log_failure(str(e))
+                raise
 
         self._log_info(
             "{} file bundle backed up in Elasticsearch.".format(self.files[".out"])
         )
 
+    def file_hash(self, path):
+        """
+        Return the sha256 hash of a file, reuse the hash computed during the upload.
+
+        Parameters
+        ----------
+        path : str
+            path of the file
+
+        Returns
+        -------
+        str
+            hex digest of the hash
+        """
+        if path in self.hashes:
+            return self.hashes[path]
+        return generate_sha256_hash(path)
+
     def get_data_from_ipet(self):
         """
         Import data from IPET.
@@ -573,7 +750,7 @@ class Importer(object):
         ipet.testrun object
         """
         try:
-            c = Experiment()
+            c = new_experiment()
 
             # Metafiles will be loaded automatically if they are placed next to outfiles
             c.addOutputFile(self.files[".out"])
@@ -581,7 +758,8 @@ class Importer(object):
             if self.files[".err"] is not None:
                 c.addOutputFile(self.files[".err"])
 
-            if self.files[".set"] is not None:
+            # the Settings of known settings files are stored already
+            if self.files[".set"] is not None and self.settings_ids is None:
                 c.addOutputFile(self.files[".set"])
 
             if self.files[".solu"] is None:
@@ -597,16 +775,6 @@ class Importer(object):
             if self.files[".solu"] is not None:
                 c.addSoluFile(self.files[".solu"])
 
-            path = ADD_READERS
-            if os.path.isfile(path):
-                for r in loader.loadAdditionalReaders([path]):
-                    c.readermanager.registerReader(r)
-                    self.logger.info("Added additional reader: " + r.getName())
-
-            for solver in loader.loadAdditionalSolvers():
-                c.readermanager.addSolver(solver)
-                self.logger.info("Added additional solver: " + solver.getName())
-
             c.collectData()
 
         except Exception:
@@ -637,12 +805,7 @@ class Importer(object):
             return f
 
         elif self.file_id:
-            s = TestSet.search()
-            s = s.filter("term", id=self.file_id)
-            found = list(s.execute())
-            if len(found) >= 1:
-                return found[0]
-            return None
+            return TestSet.find_by_hashes([self.file_id]).get(self.file_id)
 
         # this should not happen
         else:
@@ -654,16 +817,17 @@ class Importer(object):
 
         Parameters
         ----------
-        data : dict
-            dictionary containing lists of values.
+        data : pandas.DataFrame
+            Data from ipet
         key : key
-            key to search for
+            column to search in
 
         Returns
         -------
         value
+            the most frequent value, the first one to appear if there are several
         """
-        if key not in data.keys():
+        if key not in data:
             if throwex:
                 msg = "Missing key {} in data.".format("key")
                 self._log_failure(msg)
@@ -671,91 +835,177 @@ class Importer(object):
             else:
                 return None
 
-        d = data[key]
-        count = {}
-        for v in d.values():
-            count[v] = count.get(v, 0) + 1
-        try:
-            count.pop(None)
-        except KeyError:
-            pass
-        try:
-            count.pop("nan")
-        except KeyError:
-            pass
-        return max(count, key=count.get)
+        column = data[key]
+        counts = column[column.notna() & (column != "nan")].value_counts(sort=False)
+        if counts.empty:
+            return None
+        return _native(counts.idxmax())
 
 
-def _determine_type(inst):
+def frame_to_results(data, name_column="ProblemName"):
     """
-    Determine the problem type of a given Result.
+    Convert the IPET data of a TestRun into the data of the Result documents.
 
-    This code was adapted from check/check.awk
-    Possible return values: MIQCP, MINLP, QCP, NLP, CIP, LP, BP, IP MBP, MIP
+    Works on whole columns, the frame isn't walked cell by cell.
 
     Parameters
     ----------
-    inst : Result
-        Result instance to determine type for.
+    data : pandas.DataFrame
+        Data from IPET, one row per instance
+    name_column : str
+        column with the instance names (default "ProblemName")
 
     Returns
     -------
-    str
+    list
+        dictionaries with the data of the instances
     """
-    initvariables = inst.get("OriginalProblem_Vars") or 0
-
-    # the original problem had no variables, so parsing probably went wrong
-    if initvariables == 0:
-        return None
-
-    binary_variables = inst.get("PresolvedProblem_BinVars") or 0
-    integer_variables = inst.get("PresolvedProblem_IntVars") or 0
-    continuous_variables = inst.get("PresolvedProblem_ContVars") or 0
-    implicit_variables = inst.get("PresolvedProblem_ImplVars") or 0
-    constraints = inst.get("PresolvedProblem_InitialNCons") or 0
-    linear_constraints = inst.get("Constraints_Number_linear") or 0
-    linear_constraints += inst.get("Constraints_Number_logicor") or 0
-    linear_constraints += inst.get("Constraints_Number_knapsack") or 0
-    linear_constraints += inst.get("Constraints_Number_setppc") or 0
-    linear_constraints += inst.get("Constraints_Number_varbound") or 0
-    quadratic_constraints = inst.get("Constraints_Number_quadratic") or 0
-    quadratic_constraints += inst.get("Constraints_Number_soc") or 0
-    nonlinear_constraints = inst.get("Constraints_Number_nonlinear") or 0
-    nonlinear_constraints += inst.get("Constraints_Number_abspower") or 0
-    nonlinear_constraints += inst.get("Constraints_Number_bivariate") or 0
-
-    if linear_constraints < constraints:
-        linear_and_quadratic_constraints = linear_constraints + quadratic_constraints
-
-        if linear_and_quadratic_constraints == constraints:
-            if binary_variables == 0 and integer_variables == 0:
-                return "QCP"
-            else:
-                return "MIQCP"
+    frame = data.rename(columns=lambda c: c.replace(".", "_"))
+    frame = frame.replace([np.inf, -np.inf], np.nan)
+
+    extra = {
+        "instance_name": data[name_column],
+        "instance_id": data.index.astype(str),
+        "instance_type": _determine_types(frame),
+    }
+
+    iteration_keys = [
+        "LP_Iterations_barrierLP",
+        "LP_Iterations_dualLP",
+        "LP_Iterations_primalLP",
+    ]
+    if all(k in frame for k in iteration_keys):
+        iterations = frame[iteration_keys]
+        # like the single values, the sum is missing if one of them is missing
+        extra["Iterations"] = iterations.sum(axis=1).where(
+            iterations.notna().all(axis=1)
+        )
+    else:
+        extra["Iterations"] = None
 
-        elif linear_and_quadratic_constraints + nonlinear_constraints == constraints:
-            if binary_variables == 0 and integer_variables == 0:
-                return "NLP"
-            else:
-                return "MINLP"
+    for key in ["Datetime_Start", "Datetime_End"]:
+        if key in frame:
+            frame[key] = _format_timestamps(frame[key])
 
-        else:
-            return "CIP"
+    frame = frame.assign(**extra)
+    # object arrays hold python scalars, missing values are stored as null
+    values = frame.astype(object).where(frame.notna(), None).to_numpy()
+    columns = list(frame.columns)
+    # faster than DataFrame.to_dict, which boxes every cell once more
+    return [dict(zip(columns, row)) for row in values.tolist()]
 
-    elif binary_variables == 0 and integer_variables == 0:
-        return "LP"
 
-    elif continuous_variables == 0:
-        if integer_variables == 0 and implicit_variables == 0:
-            return "BP"
-        else:
-            return "IP"
+def _stored(doc):
+    """Return a document as elasticsearch would return it after saving it."""
+    return type(doc).from_es({"_source": doc.to_dict()})
 
-    elif integer_variables == 0:
-        return "MBP"
 
-    else:
-        return "MIP"
+def _native(value):
+    """Convert numpy scalars to python objects, elasticsearch can't serialize them."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _format_timestamps(column):
+    """
+    Convert unix timestamps to FORMAT_DATETIME strings in local time.
+
+    Parameters
+    ----------
+    column : pandas.Series
+        unix timestamps in seconds
+
+    Returns
+    -------
+    pandas.Series
+        formatted timestamps, values that are no numbers are kept
+    """
+    seconds = pd.to_numeric(column, errors="coerce")
+    valid = seconds.notna()
+    seconds = seconds[valid].astype("int64")
+    # a run has few distinct timestamps, format each of them once
+    formatted = {
+        t: datetime.fromtimestamp(t).strftime(FORMAT_DATETIME) for t in seconds.unique()
+    }
+    column = column.astype(object)
+    column[valid] = seconds.map(formatted)
+    return column
+
+
+def _determine_types(frame):
+    """
+    Determine the problem types of the instances of a TestRun.
+
+    This code was adapted from check/check.awk
+    Possible types: MIQCP, MINLP, QCP, NLP, CIP, LP, BP, IP MBP, MIP
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        IPET data with "_" instead of "." in the column names
+
+    Returns
+    -------
+    pandas.Series
+        types of the instances, None if the type couldn't be determined
+    """
+
+    def col(*keys):
+        # missing columns and values count as 0
+        total = 0
+        for key in keys:
+            if key in frame:
+                total = total + pd.to_numeric(frame[key], errors="coerce").fillna(0)
+        if isinstance(total, int):
+            total = pd.Series(0, index=frame.index)
+        return total
+
+    initvariables = col("OriginalProblem_Vars")
+    binary_variables = col("PresolvedProblem_BinVars")
+    integer_variables = col("PresolvedProblem_IntVars")
+    continuous_variables = col("PresolvedProblem_ContVars")
+    implicit_variables = col("PresolvedProblem_ImplVars")
+    constraints = col("PresolvedProblem_InitialNCons")
+    linear_constraints = col(
+        "Constraints_Number_linear",
+        "Constraints_Number_logicor",
+        "Constraints_Number_knapsack",
+        "Constraints_Number_setppc",
+        "Constraints_Number_varbound",
+    )
+    quadratic_constraints = col(
+        "Constraints_Number_quadratic", "Constraints_Number_soc"
+    )
+    nonlinear_constraints = col(
+        "Constraints_Number_nonlinear",
+        "Constraints_Number_abspower",
+        "Constraints_Number_bivariate",
+    )
+
+    linear_and_quadratic_constraints = linear_constraints + quadratic_constraints
+    nonlinear = linear_constraints < constraints
+    no_integers = (binary_variables == 0) & (integer_variables == 0)
+
+    conditions = [
+        # the original problem had no variables, so parsing probably went wrong
+        initvariables == 0,
+        nonlinear & (linear_and_quadratic_constraints == constraints) & no_integers,
+        nonlinear & (linear_and_quadratic_constraints == constraints),
+        nonlinear
+        & (linear_and_quadratic_constraints + nonlinear_constraints == constraints)
+        & no_integers,
+        nonlinear
+        & (linear_and_quadratic_constraints + nonlinear_constraints == constraints),
+        nonlinear,
+        no_integers,
+        (continuous_variables == 0)
+        & (integer_variables == 0)
+        & (implicit_variables == 0),
+        continuous_variables == 0,
+        integer_variables == 0,
+    ]
+    choices = [None, "QCP", "MIQCP", "NLP", "MINLP", "CIP", "LP", "BP", "IP", "MBP"]
+    types = np.select(conditions, choices, default="MIP")
+    return pd.Series(types, index=frame.index, dtype=object)
 
 
 def drop_different(dictionary, data):
@@ -772,31 +1022,105 @@ def drop_different(dictionary, data):
     """
     keep = {}
     for k, v in dictionary.items():
-        val = None
-        different = False
-        for el in set(data[k].values()):
-            if el not in [val, None, ""]:
-                if val is None:
-                    val = el
-                else:
-                    different = True
-                    break
-        if not different:
+        column = data[k]
+        column = column[column.notna() & (column != "")]
+        if column.nunique() <= 1:
             keep[k] = v
     return keep
 
 
+def import_bundle(bundle, user, tags=[], expirationdate=None, hashes=None, remove=True):
+    """
+    Import a single bundle, see `bundle_files`.
+
+    Parameters
+    ----------
+    bundle : list str
+        filenames of the bundle
+    user : str
+        current user
+    tags : list
+        tags to add to the TestSet (default [])
+    expirationdate : str in date form
+        Date after which data can be purged from elasticsearch (default: None)
+    hashes : dict
+        sha256 hashes of the files computed during the upload (default None)
+    remove : bool
+        remove the files after the import (default True)
+
+    Returns
+    -------
+    ImportStats
+        result of the import
+    """
+    # Importer helps us process the uploaded files
+    try:
+        c = Importer(user=user, hashes=hashes)
+        return c.process_files(
+            bundle, tags=tags, remove=remove, expirationdate=expirationdate
+        )
+    except Exception as e:
+        # a failed bundle must not fail the other bundles of the upload
+        logging.getLogger(__name__).exception("Import of {} failed.".format(bundle))
+        return failed_stats(bundle, str(e))
+
+
+def reimport_bundle(bundle, testset_id, user):
+    """
+    Reimport the files of an existing TestSet, see `Importer.reimport_files`.
+
+    Parameters
+    ----------
+    bundle : list str
+        filenames of the bundle, written from the Files of the TestSet
+    testset_id : str
+        id of the TestSet
+    user : str
+        current user
+
+    Returns
+    -------
+    ImportStats
+        result of the reimport
+    """
+    c = Importer(user=user)
+    return c.reimport_files(bundle, TestSet.get(id=testset_id))
+
+
+def failed_stats(bundle, message):
+    """
+    Describe a bundle whose import failed before the Importer recorded it.
+
+    Parameters
+    ----------
+    bundle : list str
+        filenames of the bundle
+    message : str
+        reason of the failure
+
+    Returns
+    -------
+    ImportStats
+        stats with status "fail"
+    """
+    basename = os.path.basename(bundle[0]) if bundle else ""
+    stats = ImportStats("results", basename=basename)
+    stats.fail = 1
+    stats.status = "fail"
+    stats.logMessage(bundle[0] if bundle else "_", message)
+    return stats
+
+
 def bundle_files(paths):
     """Take a bundle of files and split them by basename."""
-    bundles = []
-    for basename in [
-        os.path.splitext(path)[0]
+    by_basename = {}
+    for path in paths:
+        by_basename.setdefault(os.path.splitext(path)[0], []).append(path)
+    bundles = [
+        list(by_basename[os.path.splitext(path)[0]])
         for path in paths
         if os.path.splitext(path)[1] == ".out"
-    ]:
-        bundles.append(
-            tuple([path for path in paths if os.path.splitext(path)[0] == basename])
-        )
+    ]
     for f in paths:
         if os.path.splitext(f)[1] == ".solu":
             for bundle in bundles:
@@ -0,0 +1,235 @@
+"""Typed index templates for the Result documents and the IPET metrics they hold."""
+
+import json
+
+from elasticsearch.dsl.connections import connections
+
+from rubberband.constants import RESULT_INDEX
+
+RESULT_TEMPLATE = "rubberband-result"
+
+# known IPET columns with "_" instead of "." and their types
+DOUBLE_METRICS = [
+    "SolvingTime",
+    "TotalTime_solving",
+    "PrimalBound",
+    "DualBound",
+    "Gap",
+    "TimeLimit",
+    "RootNode_FirstDualBound",
+    "RootNode_FinalDualBound",
+    "FirstSolution_Time",
+    "FirstSolution_Value",
+    "PrimalIntegral",
+    "Memory",
+    "ObjectiveLimit",
+]
+LONG_METRICS = [
+    "Nodes",
+    "Iterations",
+    "LP_Iterations_barrierLP",
+    "LP_Iterations_dualLP",
+    "LP_Iterations_primalLP",
+    "OriginalProblem_Vars",
+    "OriginalProblem_InitialNCons",
+    "PresolvedProblem_Vars",
+    "PresolvedProblem_InitialNCons",
+    "PresolvedProblem_BinVars",
+    "PresolvedProblem_IntVars",
+    "PresolvedProblem_ImplVars",
+    "PresolvedProblem_ContVars",
+    "LineNumbers_BeginLogFile",
+    "LineNumbers_EndLogFile",
+    "Seed",
+    "Permutation",
+]
+KEYWORD_METRICS = [
+    "ProblemName",
+    "Solver",
+    "Version",
+    "GitHash",
+    "LPSolver",
+    "Settings",
+    "LogFileName",
+    "Objsense",
+    "ErrorCode",
+]
+
+# fields that are queried, sorted or aggregated, all others are only stored
+SEARCHED_FIELDS = {
+    "testset_id",
+    "instance_name",
+    "instance_id",
+    "instance_type",
+    "Status",
+    "SoluFileStatus",
+    "Datetime_Start",
+    "Datetime_End",
+    "SolvingTime",
+    "TotalTime_solving",
+    "Nodes",
+    "Iterations",
+}
+
+# new columns are stored without index, numbers always as double, such that a
+# column whose first value is an integer doesn't truncate later floats
+DYNAMIC_TEMPLATES = [
+    {
+        "constraint_counts": {
+            "path_match": "Constraints_Number_*",
+            "mapping": {"type": "long", "index": False},
+        }
+    },
+    {
+        "numbers": {
+            "match_mapping_type": "long",
+            "mapping": {"type": "double", "index": False},
+        }
+    },
+    {
+        "decimals": {
+            "match_mapping_type": "double",
+            "mapping": {"type": "double", "index": False},
+        }
+    },
+    {
+        "flags": {
+            "match_mapping_type": "boolean",
+            "mapping": {"type": "boolean", "index": False},
+        }
+    },
+    {
+        "strings": {
+            "match_mapping_type": "string",
+            "mapping": {
+                "type": "keyword",
+                "index": False,
+                "doc_values": False,
+                "ignore_above": 1024,
+            },
+        }
+    },
+]
+
+
+def result_mapping():
+    """
+    Generate the typed mapping of the Result documents.
+
+    The fields of the Result model keep their types, the known IPET metrics get
+    theirs from the lists above. Fields outside of SEARCHED_FIELDS are not indexed.
+
+    Returns
+    -------
+    dict
+        the mapping
+    """
+    # imported here, the models import ipet
+    from rubberband.models import Result
+
+    properties = {}
+    for names, ftype in [
+        (DOUBLE_METRICS, "double"),
+        (LONG_METRICS, "long"),
+        (KEYWORD_METRICS, "keyword"),
+    ]:
+        for name in names:
+            properties[name] = {"type": ftype}
+    properties.update(Result._doc_type.mapping.to_dict()["properties"])
+
+    for name, prop in properties.items():
+        if name not in SEARCHED_FIELDS:
+            prop["index"] = False
+            if prop["type"] == "keyword":
+                # stored fields without aggregations don't need doc values
+                prop["doc_values"] = False
+
+    return {
+        # strings that look like numbers or dates stay strings
+        "date_detection": False,
+        "numeric_detection": False,
+        "dynamic_templates": DYNAMIC_TEMPLATES,
+        "properties": properties,
+    }
+
+
+def result_template(patterns=None):
+    """
+    Generate the index template of the Result indices.
+
+    Parameters
+    ----------
+    patterns : list
+        index patterns the template applies to (default RESULT_INDEX and its
+        partitions)
+
+    Returns
+    -------
+    dict
+        the body of the composable index template
+    """
+    return {
+        "index_patterns": patterns or [RESULT_INDEX, RESULT_INDEX + "-*"],
+        "priority": 100,
+        "template": {
+            "settings": {
+                "index.mapping.total_fields.limit": 5000,
+                # a column with a text value in a numeric field doesn't lose the Result
+                "index.mapping.ignore_malformed": True,
+            },
+            "mappings": result_mapping(),
+        },
+        "_meta": {"description": "rubberband Results with typed IPET metrics"},
+    }
+
+
+def put_templates():
+    """Store the index templates in elasticsearch, they apply to new indices."""
+    conn = connections.get_connection()
+    conn.indices.put_index_template(name=RESULT_TEMPLATE, body=result_template())
+
+
+def count_fields(mapping):
+    """
+    Count the fields of a mapping, including subfields.
+
+    Parameters
+    ----------
+    mapping : dict
+        the mapping of an index, e.g. {"properties": {...}}
+
+    Returns
+    -------
+    int
+        number of fields
+    """
+    count = 0
+    for prop in mapping.get("properties", {}).values():
+        count += 1 + count_fields(prop)
+        for sub in prop.get("fields", {}).values():
+            count += 1 + count_fields(sub)
+    return count
+
+
+def mapping_stats(index):
+    """
+    Measure the mapping of an index.
+
+    Parameters
+    ----------
+    index : str
+        name of the index or alias
+
+    Returns
+    -------
+    dict
+        number of fields and size of the mapping in bytes
+    """
+    conn = connections.get_connection()
+    mappings = conn.indices.get_mapping(index=index).body
+    fields = 0
+    size = 0
+    for data in mappings.values():
+        fields += count_fields(data["mappings"])
+        size += len(json.dumps(data["mappings"]))
+    return {"fields": fields, "bytes": size}
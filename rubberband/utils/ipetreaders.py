@@ -0,0 +1,152 @@
+"""Load the IPET readers and solvers once per process and hand out fresh copies."""
+
+import os
+import copy
+import logging
+import threading
+
+from ipet import Experiment
+from ipet.misc import loader
+
+from rubberband.constants import ADD_READERS
+
+
+class ReaderRegistry(object):
+    """
+    The parsed additional readers and the loaded solver plugins of a process.
+
+    Parsing the readers file and loading the solver plugins is done once. The readers
+    and solvers keep state while they parse, so every Experiment gets deep copies of
+    them. The readers are parsed again when the modification time of their file
+    changes.
+    """
+
+    def __init__(self, path=ADD_READERS):
+        """
+        Initialize a ReaderRegistry object, the readers are loaded on first use.
+
+        Parameters
+        ----------
+        path : str
+            path of the additional readers xml file (default ADD_READERS)
+        """
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._readers = None
+        self._solvers = None
+
+    def _stat(self):
+        """Return the modification time of the readers file, None if it doesn't exist."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """
+        Load the readers and solvers if they aren't loaded or the readers file changed.
+
+        Returns
+        -------
+        tuple
+            lists of the cached readers and solvers, must not be modified
+        """
+        mtime = self._stat()
+        with self._lock:
+            if self._readers is None or self._mtime != mtime:
+                if self._readers is not None:
+                    self.logger.info(
+                        "{} changed, reloading the readers.".format(self.path)
+                    )
+                readers = []
+                if mtime is not None:
+                    readers = list(loader.loadAdditionalReaders([self.path]))
+                for r in readers:
+                    self.logger.info("Loaded additional reader: " + r.getName())
+                self._readers = readers
+                self._mtime = mtime
+
+            # solver plugins don't change while rubberband runs
+            if self._solvers is None:
+                self._solvers = list(loader.loadAdditionalSolvers())
+                for solver in self._solvers:
+                    self.logger.info("Loaded additional solver: " + solver.getName())
+            return self._readers, self._solvers
+
+    def experiment(self):
+        """
+        Construct an Experiment with copies of the additional readers and solvers.
+
+        Returns
+        -------
+        ipet.Experiment
+            the empty Experiment
+        """
+        readers, solvers = copy.deepcopy(self.load())
+        c = Experiment()
+        for r in readers:
+            c.readermanager.registerReader(r)
+        for solver in solvers:
+            c.readermanager.addSolver(solver)
+        return c
+
+
+_registries = {}
+_registries_pid = None
+
+
+def get_registry(path=ADD_READERS):
+    """Return the ReaderRegistry of this process for the readers file at path."""
+    global _registries_pid
+    # a forked process doesn't share the registries and locks of its parent
+    if _registries_pid != os.getpid():
+        _registries.clear()
+        _registries_pid = os.getpid()
+    if path not in _registries:
+        _registries[path] = ReaderRegistry(path)
+    return _registries[path]
+
+
+def new_experiment(path=ADD_READERS):
+    """
+    Construct an Experiment with the additional readers and solvers registered.
+
+    Parameters
+    ----------
+    path : str
+        path of the additional readers xml file (default ADD_READERS)
+
+    Returns
+    -------
+    ipet.Experiment
+        the empty Experiment
+    """
+    return get_registry(path).experiment()
+
+
+def validate_readers(path=ADD_READERS):
+    """
+    Check that the additional readers and the solver plugins can be loaded.
+
+    Parameters
+    ----------
+    path : str
+        path of the additional readers xml file (default ADD_READERS)
+
+    Returns
+    -------
+    list
+        names of the additional readers
+
+    Raises
+    ------
+    Exception
+        if IPET can't load the readers or the solvers
+    """
+    names = []
+    if os.path.isfile(path):
+        names = [r.getName() for r in loader.loadAdditionalReaders([path])]
+    loader.loadAdditionalSolvers()
+    return names
@@ -0,0 +1,397 @@
+"""A durable queue of import jobs and the worker processes draining it."""
+
+import os
+import json
+import time
+import shutil
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+import multiprocessing
+
+from tornado.options import options
+
+from .stats import ImportStats
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+# seconds between two signs of life of a worker that is busy with a job
+HEARTBEAT_INTERVAL = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    notify INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    results TEXT NOT NULL DEFAULT '[]',
+    worker TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobQueue(object):
+    """Import jobs stored in a sqlite database, shared by all rubberband processes."""
+
+    def __init__(self, path=None):
+        """
+        Initialize a JobQueue object, create the database if necessary.
+
+        Parameters
+        ----------
+        path : str
+            Path of the sqlite database (default options.import_job_db)
+        """
+        self.path = path or options.import_job_db
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # let readers proceed while a worker writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(
+        self,
+        user,
+        paths,
+        tags=[],
+        expirationdate=None,
+        url_base="",
+        notify=False,
+        hashes=None,
+    ):
+        """
+        Add an import job to the queue.
+
+        Parameters
+        ----------
+        user : str
+            user that uploaded the files
+        paths : list str
+            paths of the uploaded files
+        tags : list
+            tags to add to the TestSets (default [])
+        expirationdate : str in date form
+            Date after which data can be purged from elasticsearch (default: None)
+        url_base : str
+            base url for the links in the results (default "")
+        notify : bool
+            send an email to the user when the job is done (default False)
+        hashes : dict
+            sha256 hashes of the files computed during the upload (default None)
+
+        Returns
+        -------
+        str
+            id of the job
+        """
+        job_id = uuid.uuid4().hex
+        params = {
+            "paths": list(paths),
+            "tags": tags,
+            "expirationdate": expirationdate,
+            "url_base": url_base,
+            "hashes": hashes or {},
+        }
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user, status, params, notify, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, user, QUEUED, json.dumps(params), int(notify), time.time()),
+            )
+        return job_id
+
+    def claim(self, worker):
+        """
+        Take the oldest queued job.
+
+        Parameters
+        ----------
+        worker : str
+            name of the claiming worker
+
+        Returns
+        -------
+        dict
+            the job or None if the queue is empty
+        """
+        conn = self._connect()
+        try:
+            # an immediate transaction locks the database against other claiming workers
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started = ?, heartbeat = ?"
+                " WHERE id = ?",
+                (RUNNING, worker, now, now, row["id"]),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Parameters
+        ----------
+        job_id : str
+            id of the job
+
+        Returns
+        -------
+        dict
+            the job or None if it doesn't exist
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["results"] = json.loads(job["results"])
+        job["notify"] = bool(job["notify"])
+        return job
+
+    def update(self, job_id, **fields):
+        """
+        Update fields of a job.
+
+        Parameters
+        ----------
+        job_id : str
+            id of the job
+        fields
+            new values of the columns, `results` is serialized to json
+        """
+        if "results" in fields:
+            fields["results"] = json.dumps(fields["results"])
+        columns = ", ".join("{} = ?".format(k) for k in fields)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET {} WHERE id = ?".format(columns),
+                list(fields.values()) + [job_id],
+            )
+
+    def heartbeat(self, job_id):
+        """Mark a running job as alive."""
+        self.update(job_id, heartbeat=time.time())
+
+    def requeue_stale(self, timeout):
+        """
+        Put running jobs back into the queue whose worker stopped sending heartbeats.
+
+        The results of the bundles that were imported already are kept, the next
+        worker continues with the remaining bundles.
+
+        Parameters
+        ----------
+        timeout : int
+            seconds without heartbeat after which a job counts as abandoned
+
+        Returns
+        -------
+        int
+            number of requeued jobs
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL"
+                " WHERE status = ? AND heartbeat < ?",
+                (QUEUED, RUNNING, time.time() - timeout),
+            )
+            return cursor.rowcount
+
+
+def process_job(queue, job):
+    """
+    Import the bundles of a job and record the progress after every bundle.
+
+    A requeued job skips the bundles that have results, their files were removed
+    after their import.
+
+    Parameters
+    ----------
+    queue : JobQueue
+        queue the job belongs to
+    job : dict
+        the claimed job
+    """
+    # imported here to keep the queue usable without the importer and ipet
+    from .importer import Importer, bundle_files
+    from .archives import ArchiveError, unpack
+    from .multipart import remove_upload_dirs
+
+    params = job["params"]
+    try:
+        paths, hashes, directories = unpack(
+            params["paths"], params.get("hashes"), options.max_unpacked_size
+        )
+    except ArchiveError as e:
+        stats = ImportStats("results", basename="")
+        stats.fail = 1
+        stats.status = "fail"
+        stats.logMessage("_", str(e))
+        queue.update(
+            job["id"], status=FAILED, finished=time.time(), results=[stats.to_dict()]
+        )
+        if job["notify"]:
+            notify(job["user"], [stats], params["url_base"])
+        return
+
+    # a requeued job continues with the unpacked files
+    params = dict(params, paths=paths, hashes=hashes)
+    bundles = bundle_files(paths)
+    queue.update(job["id"], total=len(bundles), params=json.dumps(params))
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            queue.heartbeat(job["id"])
+
+    beater = threading.Thread(target=beat, daemon=True)
+    beater.start()
+
+    results = list(job["results"])
+    status = FINISHED
+    try:
+        for bundle in bundles[len(results) :]:
+            c = Importer(user=job["user"], hashes=hashes)
+            stats = c.process_files(
+                bundle, tags=params["tags"], expirationdate=params["expirationdate"]
+            )
+            results.append(stats.to_dict())
+            queue.update(job["id"], done=len(results), results=results)
+    except Exception:
+        logging.getLogger(__name__).exception("Import job {} failed.".format(job["id"]))
+        status = FAILED
+    finally:
+        stop.set()
+        beater.join()
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+        remove_upload_dirs(paths)
+
+    queue.update(job["id"], status=status, finished=time.time())
+
+    if job["notify"]:
+        notify(
+            job["user"], [ImportStats.from_dict(r) for r in results], params["url_base"]
+        )
+
+
+def notify(user, results, url_base):
+    """
+    Send an email about the results of an import job.
+
+    Parameters
+    ----------
+    user : str
+        recipient
+    results : list
+        ImportStats of the imported bundles
+    url_base : str
+        base url for the links in the message
+    """
+    # imported here, the handlers are not available before the app is set up
+    from rubberband.handlers.api.upload import make_import_response
+    from .mailer import sendmail
+
+    response = [make_import_response(r, url_base) for r in results]
+    logging.info("Sending an email to {}".format(user))
+    try:
+        sendmail(response, user)
+    except Exception:
+        logging.getLogger(__name__).exception("Couldn't send email to {}".format(user))
+
+
+def run_worker(option_values, poll_interval=2):
+    """
+    Drain the job queue until the process gets terminated.
+
+    Parameters
+    ----------
+    option_values : dict
+        tornado options of the parent process
+    poll_interval : int
+        seconds to wait before looking for new jobs if the queue is empty (default 2)
+    """
+    from .compute import _init_worker
+
+    _init_worker(option_values)
+    logger = logging.getLogger(__name__)
+    queue = JobQueue()
+    worker = "{}:{}".format(socket.gethostname(), os.getpid())
+    logger.info("Import worker {} started.".format(worker))
+
+    while True:
+        requeued = queue.requeue_stale(4 * HEARTBEAT_INTERVAL)
+        if requeued:
+            logger.info("Requeued {} abandoned import jobs.".format(requeued))
+
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        logger.info("Worker {} processes import job {}.".format(worker, job["id"]))
+        try:
+            process_job(queue, job)
+        except Exception:
+            # keep draining the queue, the job is requeued once its heartbeat is stale
+            logger.exception(
+                "Worker {} failed on import job {}.".format(worker, job["id"])
+            )
+
+
+def start_workers(number):
+    """
+    Start worker processes that drain the job queue.
+
+    The workers aren't supervised: a worker that gets killed isn't restarted before
+    the server restarts. Its job is requeued by the remaining workers, so start more
+    than one worker to keep the queue going.
+
+    Parameters
+    ----------
+    number : int
+        number of worker processes
+
+    Returns
+    -------
+    list
+        the started processes
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(number):
+        p = context.Process(target=run_worker, args=(options.as_dict(),), daemon=True)
+        p.start()
+        processes.append(p)
+    return processes
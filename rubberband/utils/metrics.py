@@ -0,0 +1,117 @@
+"""Keep the metrics of recent imports and summarize them in percentiles."""
+
+import os
+import json
+import time
+import sqlite3
+
+import numpy as np
+from tornado.options import options
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    status TEXT,
+    metrics TEXT NOT NULL
+);
+"""
+
+PERCENTILES = (50, 90, 99)
+
+
+class ImportMetrics(object):
+    """The metrics of the latest imports, shared by all rubberband processes."""
+
+    def __init__(self, path=None, window=None):
+        """
+        Initialize an ImportMetrics object.
+
+        Parameters
+        ----------
+        path : str
+            Path of the sqlite database (default options.cache_db)
+        window : int
+            Number of imports to keep (default options.import_metrics_window)
+        """
+        self.path = path or options.cache_db
+        self.window = window or options.import_metrics_window
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def add(self, stats):
+        """
+        Record the metrics of an import, forget the oldest beyond the window.
+
+        Parameters
+        ----------
+        stats : ImportStats
+            result of the import
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO import_metrics (created, status, metrics) VALUES (?, ?, ?)",
+                (time.time(), stats.status, json.dumps(stats.getMetrics())),
+            )
+            conn.execute(
+                "DELETE FROM import_metrics WHERE id <= ?",
+                (cursor.lastrowid - self.window,),
+            )
+
+    def summary(self, since=None, percentiles=PERCENTILES):
+        """
+        Summarize the recorded imports in percentiles.
+
+        Parameters
+        ----------
+        since : float
+            only consider imports after this unix timestamp (default None)
+        percentiles : tuple
+            percentiles to compute (default PERCENTILES)
+
+        Returns
+        -------
+        dict
+            number of imports per status and the percentiles of the stage timings,
+            the counters, the peak memory and the throughput in bytes per second
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, metrics FROM import_metrics WHERE created >= ?",
+                (since or 0,),
+            ).fetchall()
+
+        statuses = {}
+        values = {"timings": {}, "counters": {}, "peak_memory": [], "throughput": []}
+        for status, metrics in rows:
+            statuses[status] = statuses.get(status, 0) + 1
+            metrics = json.loads(metrics)
+            for group in ["timings", "counters"]:
+                for k, v in metrics[group].items():
+                    values[group].setdefault(k, []).append(v)
+            if metrics["peak_memory"] is not None:
+                values["peak_memory"].append(metrics["peak_memory"])
+            total = metrics["timings"].get("total")
+            if total and "bytes" in metrics["counters"]:
+                values["throughput"].append(metrics["counters"]["bytes"] / total)
+
+        def summarize(samples):
+            if not samples:
+                return None
+            result = np.percentile(samples, percentiles)
+            return {"p{}".format(p): float(r) for p, r in zip(percentiles, result)}
+
+        return {
+            "imports": len(rows),
+            "status": statuses,
+            "timings": {k: summarize(v) for k, v in values["timings"].items()},
+            "counters": {k: summarize(v) for k, v in values["counters"].items()},
+            "peak_memory": summarize(values["peak_memory"]),
+            "throughput": summarize(values["throughput"]),
+        }
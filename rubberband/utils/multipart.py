@@ -0,0 +1,336 @@
+"""Parse multipart/form-data request bodies while they are received."""
+
+import os
+import shutil
+import hashlib
+import tempfile
+from email.message import Message
+
+# states of the parser
+PREAMBLE = 0
+DELIMITER = 1
+HEADERS = 2
+BODY = 3
+EPILOGUE = 4
+
+# prefix of the directories that hold the files of one request
+UPLOAD_PREFIX = "upload-"
+
+
+class MultipartError(ValueError):
+    """Raised if a request body is not valid multipart/form-data."""
+
+
+class UploadedFile(object):
+    """A file of a multipart upload that was written to disk."""
+
+    def __init__(self, name, filename, path, size, sha256):
+        """
+        Initialize an UploadedFile object.
+
+        Parameters
+        ----------
+        name : str
+            name of the form field
+        filename : str
+            name of the file as sent by the client
+        path : str
+            path the file was written to
+        size : int
+            size of the file in bytes
+        sha256 : str
+            hex digest of the sha256 hash of the file
+        """
+        self.name = name
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+class MultipartStreamParser(object):
+    """
+    Incremental parser for multipart/form-data bodies.
+
+    Feed the body piece by piece to `data_received`. Files are written to a new
+    directory inside `directory` and hashed on the fly, so that at most one chunk of the
+    body and a few kilobytes of state are held in memory. Every request gets its own
+    directory, files with the same name from concurrent requests don't overwrite each
+    other. Form fields are kept in memory, up to `max_field_size`.
+    """
+
+    def __init__(
+        self, boundary, directory, max_field_size=64 * 1024, max_header_size=16 * 1024
+    ):
+        """
+        Initialize a MultipartStreamParser object.
+
+        Parameters
+        ----------
+        boundary : bytes
+            boundary from the Content-Type header
+        directory : str
+            directory to create the directory of the uploaded files in
+        max_field_size : int
+            maximal size of a form field that is no file in bytes (default 64k)
+        max_header_size : int
+            maximal size of the headers of a part in bytes (default 16k)
+        """
+        self.delimiter = b"\r\n--" + boundary
+        self.directory = directory
+        self.max_field_size = max_field_size
+        self.max_header_size = max_header_size
+
+        self.fields = {}
+        self.files = []
+        self.error = None
+        # created with the first file
+        self.upload_dir = None
+
+        # the first delimiter of the body isn't preceded by a line break
+        self._buffer = bytearray(b"\r\n")
+        self._state = PREAMBLE
+        self._part = None
+
+    @classmethod
+    def from_content_type(cls, content_type, directory, **kwargs):
+        """
+        Construct a parser from the Content-Type header of a request.
+
+        Parameters
+        ----------
+        content_type : str
+            value of the Content-Type header
+        directory : str
+            directory to create the directory of the uploaded files in
+
+        Returns
+        -------
+        MultipartStreamParser
+            the parser
+
+        Raises
+        ------
+        MultipartError
+            if the body is not multipart/form-data
+        """
+        msg = Message()
+        msg["content-type"] = content_type
+        boundary = msg.get_param("boundary")
+        if msg.get_content_type() != "multipart/form-data" or not boundary:
+            raise MultipartError("Expected a multipart/form-data body.")
+        return cls(boundary.encode("latin-1"), directory, **kwargs)
+
+    def data_received(self, chunk):
+        """
+        Parse the next piece of the body.
+
+        Errors don't raise, they are stored and raised by `finish`. The rest of the body
+        is ignored after an error.
+
+        Parameters
+        ----------
+        chunk : bytes
+            next piece of the body
+        """
+        if self.error is not None:
+            return
+        self._buffer += chunk
+        try:
+            self._parse()
+        except MultipartError as e:
+            self.error = e
+            self.abort()
+
+    def finish(self):
+        """
+        Check that the whole body was parsed.
+
+        Raises
+        ------
+        MultipartError
+            if the body was invalid or incomplete
+        """
+        if self.error is None and self._state != EPILOGUE:
+            self.error = MultipartError("Incomplete multipart body.")
+            self.abort()
+        if self.error is not None:
+            raise self.error
+
+    def abort(self):
+        """Remove the partially written file and all uploaded files."""
+        if self._part is not None and self._part.get("file") is not None:
+            self._part["file"].close()
+        self._part = None
+        self.files = []
+        if self.upload_dir is not None:
+            shutil.rmtree(self.upload_dir, ignore_errors=True)
+            self.upload_dir = None
+
+    def discard(self, name):
+        """
+        Remove the uploaded files that don't belong to a form field.
+
+        Parameters
+        ----------
+        name : str
+            name of the form field whose files are kept
+
+        Returns
+        -------
+        list
+            the kept UploadedFiles
+        """
+        for f in self.files:
+            if f.name != name:
+                _remove(f.path)
+        self.files = [f for f in self.files if f.name == name]
+        return self.files
+
+    def _parse(self):
+        while True:
+            if self._state in (PREAMBLE, BODY):
+                index = self._buffer.find(self.delimiter)
+                if index < 0:
+                    # keep enough bytes to recognize a delimiter that is split across chunks
+                    keep = len(self.delimiter) - 1
+                    if len(self._buffer) > keep:
+                        self._write(self._buffer[:-keep])
+                        del self._buffer[:-keep]
+                    return
+                self._write(self._buffer[:index])
+                del self._buffer[: index + len(self.delimiter)]
+                if self._state == BODY:
+                    self._finish_part()
+                self._state = DELIMITER
+
+            elif self._state == DELIMITER:
+                if len(self._buffer) < 2:
+                    return
+                if self._buffer[:2] == b"--":
+                    self._state = EPILOGUE
+                elif self._buffer[:2] == b"\r\n":
+                    self._state = HEADERS
+                else:
+                    raise MultipartError("Invalid multipart boundary.")
+                del self._buffer[:2]
+
+            elif self._state == HEADERS:
+                index = self._buffer.find(b"\r\n\r\n")
+                if index < 0:
+                    if len(self._buffer) > self.max_header_size:
+                        raise MultipartError("Multipart headers too large.")
+                    return
+                self._start_part(bytes(self._buffer[:index]))
+                del self._buffer[: index + 4]
+                self._state = BODY
+
+            else:
+                # ignore everything after the final delimiter
+                self._buffer.clear()
+                return
+
+    def _start_part(self, headers):
+        msg = Message()
+        for line in headers.decode("utf-8", "replace").split("\r\n"):
+            if ":" in line:
+                key, value = line.split(":", 1)
+                msg[key.strip()] = value.strip()
+
+        name = msg.get_param("name", header="content-disposition")
+        if not name:
+            raise MultipartError("Multipart part without name.")
+        filename = msg.get_filename()
+
+        self._part = {"name": name}
+        if filename is None:
+            self._part["data"] = bytearray()
+            return
+
+        # don't let the client choose the directory
+        filename = os.path.basename(filename.replace("\\", "/"))
+        if not filename:
+            # browsers send an empty file field if no file was selected
+            self._part["skip"] = True
+            return
+        if self.upload_dir is None:
+            self.upload_dir = tempfile.mkdtemp(dir=self.directory, prefix=UPLOAD_PREFIX)
+        if os.path.exists(os.path.join(self.upload_dir, filename)):
+            raise MultipartError("File {} uploaded twice.".format(filename))
+        fd, tmppath = tempfile.mkstemp(dir=self.upload_dir, prefix=".upload-")
+        self._part.update(
+            filename=filename,
+            tmppath=tmppath,
+            file=os.fdopen(fd, "wb"),
+            sha256=hashlib.sha256(),
+            size=0,
+        )
+
+    def _write(self, data):
+        if self._state != BODY or not data:
+            return
+        part = self._part
+        if "skip" in part:
+            return
+        if "file" in part:
+            part["file"].write(data)
+            part["sha256"].update(data)
+            part["size"] += len(data)
+        else:
+            part["data"] += data
+            if len(part["data"]) > self.max_field_size:
+                raise MultipartError("Form field {} too large.".format(part["name"]))
+
+    def _finish_part(self):
+        part = self._part
+        self._part = None
+        if "skip" in part:
+            return
+        if "file" not in part:
+            self.fields.setdefault(part["name"], []).append(bytes(part["data"]))
+            return
+
+        part["file"].close()
+        path = os.path.join(self.upload_dir, part["filename"])
+        os.replace(part["tmppath"], path)
+        self.files.append(
+            UploadedFile(
+                part["name"],
+                part["filename"],
+                path,
+                part["size"],
+                part["sha256"].hexdigest(),
+            )
+        )
+
+
+def remove_upload_dirs(paths):
+    """
+    Remove the directories of uploads whose files are all imported.
+
+    Parameters
+    ----------
+    paths : list
+        paths of uploaded files or of files unpacked from them, directories that still
+        contain files are kept
+    """
+    directories = set()
+    for path in paths:
+        directory = os.path.dirname(path)
+        while directory and directory != os.path.dirname(directory):
+            if os.path.basename(directory).startswith(UPLOAD_PREFIX):
+                directories.add(directory)
+                break
+            directory = os.path.dirname(directory)
+    for directory in directories:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,7 +1,18 @@
 """Organize information import status."""
 
+import os
+import sys
+import json
+import time
+import logging
+import resource
+import threading
+from contextlib import contextmanager
 from collections import defaultdict
 
+# seconds between two samples of the memory usage during an import
+MEMORY_SAMPLE_INTERVAL = 0.05
+
 
 class ImportStats(object):
     """Class to hold information about import status."""
@@ -21,6 +32,12 @@ class ImportStats(object):
         self.url = None
         self.status = None
         self.messages = defaultdict(list)
+        # seconds spent in the stages of the import
+        self.timings = {}
+        # e.g. bytes read or rows written
+        self.counters = {}
+        # maximal resident memory of the process during the import in bytes
+        self.peak_memory = None
 
     def logMessage(self, identifier, msg):
         """
@@ -53,3 +70,133 @@ class ImportStats(object):
     def getUrl(self):
         """Return the url."""
         return self.url
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the time spent in a stage of the import.
+
+        The times of stages that are entered repeatedly are added up.
+
+        Parameters
+        ----------
+        name : str
+            name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name, value):
+        """
+        Add to a counter.
+
+        Parameters
+        ----------
+        name : str
+            name of the counter
+        value : int
+            amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def measure(self, interval=MEMORY_SAMPLE_INTERVAL):
+        """
+        Measure the total time and sample the peak memory usage of an import.
+
+        Parameters
+        ----------
+        interval : float
+            seconds between two memory samples (default MEMORY_SAMPLE_INTERVAL)
+        """
+        stop = threading.Event()
+        peak = [current_memory()]
+
+        def sample():
+            while not stop.wait(interval):
+                peak[0] = max(peak[0], current_memory())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            with self.stage("total"):
+                yield
+        finally:
+            stop.set()
+            sampler.join()
+            self.peak_memory = max(peak[0], current_memory())
+
+    def getMetrics(self):
+        """Return the timings, counters and the peak memory usage of the import."""
+        return {
+            "timings": {k: round(v, 6) for k, v in self.timings.items()},
+            "counters": dict(self.counters),
+            "peak_memory": self.peak_memory,
+        }
+
+    def log(self, logger=None, **extra):
+        """
+        Log the metrics of the import as a single json record.
+
+        Parameters
+        ----------
+        logger : logging.Logger
+            logger to use (default the logger of this module)
+        extra
+            further fields of the record
+        """
+        record = dict(
+            extra, basename=self.basename, status=self.status, **self.getMetrics()
+        )
+        (logger or logging.getLogger(__name__)).info(
+            "import stats {}".format(json.dumps(record, sort_keys=True))
+        )
+
+    def to_dict(self):
+        """Return the import status as a json serializable dictionary."""
+        return {
+            "collection": self.collection,
+            "basename": self.basename,
+            "fail": self.fail,
+            "url": self.url,
+            "status": self.status,
+            # failures are sometimes logged as exception objects
+            "messages": {k: [str(m) for m in v] for k, v in self.messages.items()},
+            **self.getMetrics(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Construct an ImportStats object from the output of `to_dict`.
+
+        Parameters
+        ----------
+        data : dict
+            serialized import status
+        """
+        stats = cls(data["collection"], data["basename"])
+        stats.fail = data["fail"]
+        stats.url = data["url"]
+        stats.status = data["status"]
+        stats.messages.update(data["messages"])
+        # jobs that were queued before the metrics were recorded don't have them
+        stats.timings = data.get("timings", {})
+        stats.counters = data.get("counters", {})
+        stats.peak_memory = data.get("peak_memory")
+        return stats
+
+
+def current_memory():
+    """Return the resident memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # no procfs, the peak of the whole process is the best we get
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, other systems kilobytes
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
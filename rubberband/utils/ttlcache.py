@@ -0,0 +1,141 @@
+"""A small key-value cache with expiring entries, shared by all rubberband processes."""
+
+import os
+import json
+import time
+import sqlite3
+
+from tornado.options import options
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class TTLCache(object):
+    """
+    Cache json serializable values in a sqlite database for a limited time.
+
+    The database is a file, such that the forked server processes and the worker
+    processes share their entries.
+    """
+
+    def __init__(self, namespace, path=None):
+        """
+        Initialize a TTLCache object.
+
+        Parameters
+        ----------
+        namespace : str
+            Name that separates the keys of different users of the database
+        path : str
+            Path of the sqlite database (default options.cache_db)
+        """
+        self.namespace = namespace
+        self.path = path or options.cache_db
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key, default=None):
+        """
+        Look up an entry.
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        default : object
+            returned if there is no entry or it expired (default None)
+
+        Returns
+        -------
+        object
+            the cached value
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def get_prefix(self, prefix):
+        """
+        Look up all entries whose key starts with a prefix.
+
+        Parameters
+        ----------
+        prefix : str
+            beginning of the keys
+
+        Returns
+        -------
+        dict
+            the cached values by key
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, value FROM cache WHERE namespace = ? AND key >= ? AND key < ?"
+                " AND expires > ?",
+                (self.namespace, prefix, prefix + "\U0010ffff", time.time()),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl):
+        """
+        Store an entry.
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        value : object
+            json serializable value
+        ttl : float
+            seconds until the entry expires, entries with ttl <= 0 are not stored
+        """
+        if ttl <= 0:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires)"
+                " VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now + ttl),
+            )
+            # keep the database small
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+
+    def delete(self, key):
+        """
+        Remove an entry.
+
+        Parameters
+        ----------
+        key : str
+            key of the entry
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def clear(self):
+        """Remove all entries of the namespace."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
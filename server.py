@@ -3,85 +3,64 @@
 import os
 import tornado.ioloop
 import tornado.httpserver
-from datetime import date
 import logging
-import multiprocessing
 
 from rubberband.boilerplate import make_app, options
-from rubberband.constants import FILES_DIR
-from rubberband.models import TestSet, Settings, File, Result
+from rubberband.utils.expiry import RunLock, delete_expired_testsets
+from rubberband.utils.jobs import start_workers
+from rubberband.utils.ipetreaders import validate_readers
 
 KB = 1024
 MB = 1024 * KB
 GB = 1024 * MB
 
-ONE_DAY = 86400000  # in milliseconds
+ONE_HOUR = 3600000  # in milliseconds
+ONE_DAY = 24 * ONE_HOUR
 
 
-def delete_expired_documents():
-    s = TestSet.search()
-    s = s.filter("range", expirationdate={"lte": date.today()})
-    response = s.execute()
-    logging.info(f"Found {response.hits.total.value} expired testsets to delete.")
-    for hit in response.hits:
-        testset_id = hit.meta.id
-        logging.info(f"Deleting testset {testset_id} associated data.")
-
-        # Delete file documents
-        file_search = File.search()
-        file_search = file_search.filter("term", testset_id=testset_id)
-        file_search_result = file_search.execute()
-        files_to_delete = [f.filename for f in file_search_result.hits]
-        file_search.delete()
-
-        # Delete settings documents
-        settings = Settings.get(hit.settings_id)
-        settings.delete()
-        default_settings = Settings.get(hit.default_settings_id)
-        default_settings.delete()
-
-        # Delete result documents
-        for rid in hit.result_ids:
-            result = Result.get(rid)
-            result.delete()
-
-        # Delete files from filesystem
-        for f in files_to_delete:
-            full_file_path = os.path.join(FILES_DIR, f)
-            if os.path.exists(full_file_path):
-                os.remove(full_file_path)
-            else:
-                logging.info(f"Unable to locate {full_file_path} for deletion.")
-
-    # Delete all of the testset documents
-    s.delete()
-
-    logging.info("Finished deleting expired testsets.")
+async def delete_expired_documents():
+    """Delete the expired TestSets once a day, in the process that holds the lock."""
+    lock = RunLock(options.expiry_lock)
+    ran = await tornado.ioloop.IOLoop.current().run_in_executor(
+        None, lock.run, ONE_DAY / 1000, delete_expired_testsets
+    )
+    if ran:
+        logging.info(
+            f"Deleted expired testsets in PID {os.getpid()}: {lock.last_run()}"
+        )
 
 
 def main():
     project_root = os.path.join(os.path.dirname(__file__), "rubberband")
     app = make_app(project_root)
 
+    # refuse to start with readers that would make every import fail
+    readers = validate_readers()
+    logging.info(f"Loaded {len(readers)} additional IPET readers.")
+
     # create an HTTPServer
+    # only the upload handlers accept larger bodies (options.max_upload_size), they
+    # stream them to disk instead of buffering them in memory
     server = tornado.httpserver.HTTPServer(
-        app, max_body_size=2 * GB, max_buffer_size=2 * GB
+        app, max_body_size=100 * MB, max_buffer_size=100 * MB
     )
     # bind it to a port specified in 'options'
     server.bind(options.port)
+    # start the workers of the import job queue once, before forking the server
+    # the forked processes can't restart them, workers that die stay dead until the
+    # server restarts (their jobs are taken over by the other workers)
+    start_workers(options.import_workers)
     # start server
     # TODO https://www.tornadoweb.org/en/stable/httpserver.html says that this is deprecated
     server.start(options.num_processes)
 
     # job to delete expired documents every day
-    # because this code is called for each fork (num_processes many), we do this for only one process (assuming the forks have consecutive PIDs)
-    num_processes = options.num_processes if options.num_processes >= 1 else multiprocessing.cpu_count()
-    if os.getpid() % num_processes == 0:
-       periodic_callback = tornado.ioloop.PeriodicCallback(
-           delete_expired_documents, ONE_DAY
-       )
-       periodic_callback.start()
-       logging.info(f"Started delete_expired_documents() periodic callback in PID {os.getpid()}.")
+    # every forked process checks every hour, the lock file lets exactly one of them
+    # run the deletion once a day
+    periodic_callback = tornado.ioloop.PeriodicCallback(
+        delete_expired_documents, ONE_HOUR
+    )
+    periodic_callback.start()
 
     # start ioloop as main event loop
     tornado.ioloop.IOLoop.current().start()
@@ -0,0 +1,98 @@
+"""A local stand-in for the parts of the gitlab api that rubberband uses."""
+
+from types import SimpleNamespace
+
+from gitlab.exceptions import GitlabGetError
+
+
+class FakeMembers(object):
+    """Members of a fake group or project."""
+
+    def __init__(self, gitlab, members):
+        self.gitlab = gitlab
+        self.members = members
+
+    def list(self, query=None):
+        """Return the members whose email matches the query."""
+        self.gitlab.calls += 1
+        return [m for m in self.members if m.email == query]
+
+
+class FakeManager(object):
+    """Look up fake groups, projects or users."""
+
+    def __init__(self, gitlab, objects):
+        self.gitlab = gitlab
+        self.objects = objects
+
+    def get(self, key, lazy=False):
+        """Return an object by its id or name, lazy objects don't count as call."""
+        if not lazy:
+            self.gitlab.calls += 1
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise GitlabGetError("404 Not found", response_code=404)
+
+    def list(self, search=None):
+        """Return the objects whose name or email contains the search term."""
+        self.gitlab.calls += 1
+        return [
+            o for o in self.objects.values() if search in (o.username, o.name, o.email)
+        ]
+
+
+class FakeCommits(object):
+    """Commits of a fake project."""
+
+    def __init__(self, gitlab, commits):
+        self.gitlab = gitlab
+        self.commits = commits
+
+    def get(self, git_hash):
+        """Return the commit whose hash starts with git_hash."""
+        self.gitlab.calls += 1
+        for c in self.commits:
+            if c.id.startswith(git_hash):
+                return c
+        raise GitlabGetError("404 Commit Not Found", response_code=404)
+
+
+class FakeGitlab(object):
+    """
+    Fake gitlab client with users that are members of one group and one project.
+
+    Counts the api calls in `calls`.
+    """
+
+    def __init__(self, group, project_id, users, commits=[]):
+        """
+        Initialize a FakeGitlab object.
+
+        Parameters
+        ----------
+        group : str
+            name of the group
+        project_id : int
+            id of the project
+        users : list of dict
+            users with keys id, username, name, email, access_level
+        commits : list of dict
+            commits of the project with keys id, short_id, authored_date,
+            author_email (default [])
+        """
+        self.calls = 0
+        members = [SimpleNamespace(**u) for u in users]
+        self.groups = FakeManager(
+            self, {group: SimpleNamespace(members=FakeMembers(self, members))}
+        )
+        self.projects = FakeManager(
+            self,
+            {
+                project_id: SimpleNamespace(
+                    members=FakeMembers(self, []),
+                    commits=FakeCommits(self, [SimpleNamespace(**c) for c in commits]),
+                )
+            },
+        )
+        self.users = FakeManager(self, {m.username: m for m in members})
@@ -17,6 +17,23 @@ class GetAPITest(TestHandlerBase):
         self.assertTrue(isinstance(data, list))
         self.assertTrue(len(data) > 50)
 
+    def test_instance_names_prefix(self):
+        """
+        Test that the names can be searched by prefix and limited.
+        """
+        response = self.fetch("/instances/names?q=B&limit=3")
+        self.assertEqual(response.code, 200)
+        data = json.loads(response.body.decode("utf-8"))
+        self.assertTrue(0 < len(data) <= 3)
+        self.assertTrue(all(name.lower().startswith("b") for name in data))
+
+        # the response can be revalidated by its ETag
+        etag = response.headers["Etag"]
+        response = self.fetch(
+            "/instances/names?q=B&limit=3", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.code, 304)
+
 
 class UploadAPITest(TestHandlerBase):
     def test_upload_exception_handling(self):
@@ -35,6 +52,31 @@ class UploadAPITest(TestHandlerBase):
         self.assertIn("Missing required files:", data["errors"]["_"][0])
 
 
+class UploadCheckAPITest(TestHandlerBase):
+    def test_upload_check(self):
+        """
+        Test that existing logfiles are found by their hash.
+        """
+        known = "952a91b64de0b3cca2f520da5083624cf29d948d9058b34c71ef7fe839246065"
+        unknown = "0" * 64
+        response = self.fetch(
+            "/api/upload/check",
+            method="POST",
+            body=json.dumps({"hashes": [known, unknown]}),
+        )
+        self.assertEqual(response.code, 200)
+        data = json.loads(response.body.decode("utf-8"))
+        self.assertEqual([d["hash"] for d in data], [known, unknown])
+        self.assertEqual(data[0]["status"], "found")
+        self.assertIn("/result/", data[0]["url"])
+        self.assertEqual(data[1]["status"], "new")
+
+        response = self.fetch("/api/upload/check?hash={}".format(unknown))
+        self.assertEqual(response.code, 200)
+        response = self.fetch("/api/upload/check?hash=invalid")
+        self.assertEqual(response.code, 400)
+
+
 class SearchAPITest(TestHandlerBase):
     def test_search(self):
         """
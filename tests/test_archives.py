@@ -0,0 +1,51 @@
+import io
+import os
+import gzip
+import hashlib
+import tarfile
+import zipfile
+
+import pytest
+import zstandard
+
+from rubberband.utils.archives import ArchiveError, unpack
+
+
+def test_unpack(tmp_path):
+    data = b"SCIP log\n" * 1000
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    (tmp_path / "a.out.gz").write_bytes(gzip.compress(data))
+    (tmp_path / "b.out.zst").write_bytes(zstandard.ZstdCompressor().compress(data))
+    with tarfile.open(tmp_path / "runs.tar.gz", "w:gz") as archive:
+        for name, content in [
+            ("x/c.out", data),
+            ("y/c.out.gz", gzip.compress(data)),
+            ("y/c.err", b""),
+            ("../evil.out", data),
+            ("notes.txt", data),
+        ]:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    with zipfile.ZipFile(tmp_path / "runs.zip", "w") as archive:
+        archive.writestr("d.out", data)
+    (tmp_path / "e.out").write_bytes(data)
+
+    paths = sorted(str(p) for p in tmp_path.iterdir())
+    unpacked, hashes, directories = unpack(paths, hashes={str(tmp_path / "e.out"): "e"})
+    names = sorted(
+        os.path.relpath(p, str(tmp_path)).split(os.sep)[-1] for p in unpacked
+    )
+    assert names == ["a.out", "b.out", "c.err", "c.out", "c.out", "d.out", "e.out"]
+    assert all(hashes[p] == sha256 for p in unpacked if p.endswith(("a.out", "c.out")))
+    assert hashes[str(tmp_path / "e.out")] == "e"
+    assert len(directories) == 2
+    assert not (tmp_path / "evil.out").exists()
+    assert not (tmp_path / "a.out.gz").exists()
+
+    # too large
+    (tmp_path / "f.out.gz").write_bytes(gzip.compress(data))
+    with pytest.raises(ArchiveError):
+        unpack([str(tmp_path / "f.out.gz")], max_size=100)
+    assert not (tmp_path / "f.out").exists()
@@ -0,0 +1,59 @@
+import os
+import json
+
+from rubberband.utils import bulkimport
+from rubberband.utils.bulkimport import Checkpoint, bundle_key, discover_bundles
+from rubberband.utils.stats import ImportStats
+
+
+def test_bulk_import_discovery(tmp_path):
+    for name in [
+        "b/run1.out",
+        "b/run1.err",
+        "b/run1.set",
+        "b/short.solu",
+        "a/c/run2.out",
+        "a/c/run2.meta",
+        "a/notes.txt",
+    ]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+    bundles = discover_bundles(str(tmp_path))
+    keys = [bundle_key(b, str(tmp_path)) for b in bundles]
+    assert keys == [os.path.join("a", "c", "run2.out"), os.path.join("b", "run1.out")]
+    assert sorted(os.path.basename(p) for p in bundles[1]) == [
+        "run1.err",
+        "run1.out",
+        "run1.set",
+        "short.solu",
+    ]
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.jsonl"))
+    assert checkpoint.done() == set()
+    checkpoint.add(keys[0], status="fail")
+    checkpoint.add(keys[1], status="success")
+    assert checkpoint.done() == {keys[1]}
+    assert checkpoint.done(retry_failed=False) == set(keys)
+
+    # an interrupted write leaves an incomplete line
+    with open(checkpoint.path, "a") as f:
+        f.write('{"key": "b/run3.out", "sta')
+    checkpoint.add(keys[0], status="found")
+    assert checkpoint.done() == set(keys)
+
+
+def test_bulk_import_messages(monkeypatch):
+    def import_bundle(bundle, user, **kwargs):
+        stats = ImportStats("results", "run1")
+        stats.fail = 1
+        stats.logMessage("run1.out", ("Error", 400))
+        return stats
+
+    monkeypatch.setattr(bulkimport, "import_bundle", import_bundle)
+    result = bulkimport.import_task(["run1.out"], "user")
+    # the messages are written to the checkpoint and printed as strings
+    assert json.loads(json.dumps(result))["messages"] == {
+        "run1.out": ["('Error', 400)"]
+    }
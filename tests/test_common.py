@@ -0,0 +1,61 @@
+import os
+import asyncio
+from types import SimpleNamespace
+
+from tornado.web import HTTPError
+
+import rubberband.boilerplate  # noqa: F401, defines the options
+from rubberband.handlers import common
+from rubberband.utils.multipart import MultipartStreamParser
+from rubberband.utils.stats import ImportStats
+
+
+def test_import_files_busy(tmp_path, monkeypatch):
+    async def compute(fn, bundle, *args, **kwargs):
+        if bundle[0].endswith("busy.out"):
+            raise HTTPError(503, reason="Server busy, please try again later.")
+        return ImportStats("results", bundle[0])
+
+    monkeypatch.setattr(common, "compute", compute)
+    paths = []
+    for name in ("busy.out", "fine.out"):
+        paths.append(str(tmp_path / name))
+        open(paths[-1], "w").close()
+
+    busy, fine = asyncio.run(common.import_files(paths, "user"))
+    # one busy bundle fails on its own and its files don't stay behind
+    assert busy.fail and busy.getMessages()[paths[0]] == [
+        "Server busy, please try again later."
+    ]
+    assert not fine.fail
+    assert os.listdir(tmp_path) == []
+
+
+def test_finish_upload_fields(tmp_path):
+    body = (
+        b"--xyz\r\n"
+        b'Content-Disposition: form-data; name="tags"\r\n\r\n'
+        b"a, b\r\n"
+        b"--xyz\r\n"
+        b'Content-Disposition: form-data; name="resultFiles"; filename="check.out"'
+        b"\r\n\r\n"
+        b"SCIP Status : problem is solved\r\n"
+        b"--xyz\r\n"
+        b'Content-Disposition: form-data; name="expirationdate"\r\n\r\n'
+        b"2026-12-31\r\n"
+        b"--xyz--\r\n"
+    )
+    handler = common.StreamingUploadMixin()
+    handler.request = SimpleNamespace(body_arguments={}, arguments={})
+    handler.upload = MultipartStreamParser.from_content_type(
+        "multipart/form-data; boundary=xyz", str(tmp_path)
+    )
+    handler.upload.data_received(body)
+
+    # the form fields after the files don't change which files are kept
+    (f,) = handler.finish_upload(name="resultFiles")
+    assert f.name == "resultFiles" and os.path.isfile(f.path)
+    assert handler.request.arguments == {
+        "tags": [b"a, b"],
+        "expirationdate": [b"2026-12-31"],
+    }
@@ -0,0 +1,22 @@
+import pickle
+
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import BadRequestError
+
+from rubberband.utils.compute import ComputeError, _run_pickled
+
+
+def fail_with_api_error():
+    meta = ApiResponseMeta(
+        400, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "es", 9200)
+    )
+    raise BadRequestError("mapper_parsing_exception", meta=meta, body={})
+
+
+def test_unpicklable_exception():
+    with pytest.raises(ComputeError) as info:
+        _run_pickled(fail_with_api_error, (), {})
+    # the parent process can unpickle the replacement
+    error = pickle.loads(pickle.dumps(info.value))
+    assert "BadRequestError" in str(error)
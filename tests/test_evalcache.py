@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from rubberband.utils.evalcache import EvaluationCache
+
+
+def test_evaluation_cache(tmp_path):
+    cache = EvaluationCache(directory=str(tmp_path), max_size=1)
+    runs = [
+        SimpleNamespace(meta=SimpleNamespace(id=i), index_timestamp="2020-01-01")
+        for i in ("a", "b")
+    ]
+    key = cache.make_key(runs, "<Evaluation/>", "1e-6", "", "a")
+    assert key == cache.make_key(runs[::-1], "<Evaluation/>", 1e-6, "", "a")
+    assert key != cache.make_key(runs, "<Evaluation/>", 1e-6, "", "b")
+
+    assert cache.get(key) is None
+    cache.put(key, runs, {"aggtable": [1, 2, 3]})
+    assert cache.get(key) == {"aggtable": [1, 2, 3]}
+
+    cache.invalidate("b")
+    assert cache.get(key) is None
+
+    # entries larger than the size limit get evicted
+    cache.put(key, runs[:1], "x" * 2 * 1024 * 1024)
+    assert cache.get(key) is None
+
+
+def test_evaluation_cache_versions(tmp_path):
+    cache = EvaluationCache(directory=str(tmp_path), max_size=1)
+
+    def run(timestamp):
+        return SimpleNamespace(meta=SimpleNamespace(id="a"), index_timestamp=timestamp)
+
+    old = cache.make_key([run("2020-01-01")], "<Evaluation/>", 1e-6, "", "a")
+    other = cache.make_key([run("2020-01-01")], "<Evaluation/>", 1e-3, "", "a")
+    cache.put(old, [run("2020-01-01")], "old")
+    cache.put(other, [run("2020-01-01")], "other")
+    assert cache.get(old) == "old" and cache.get(other) == "other"
+
+    # storing an entry of a reimported TestSet drops the entries of the old version
+    new = cache.make_key([run("2021-01-01")], "<Evaluation/>", 1e-6, "", "a")
+    cache.put(new, [run("2021-01-01")], "new")
+    assert cache.get(old) is None and cache.get(other) is None
+    with open(cache._testset_path("a")) as f:
+        assert f.read() == "{}\t2021-01-01\n".format(new)
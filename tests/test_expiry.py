@@ -0,0 +1,19 @@
+import fcntl
+
+from rubberband.utils.expiry import RunLock
+
+
+def test_run_lock(tmp_path):
+    lock = RunLock(str(tmp_path / "expiry.lock"))
+    runs = []
+    assert lock.run(3600, lambda: runs.append(1) or {"testsets": 2})
+    assert lock.last_run()["result"] == {"testsets": 2}
+    # ran recently
+    assert not lock.run(3600, lambda: runs.append(2))
+    assert lock.run(0, lambda: runs.append(3))
+
+    # another process holds the lock
+    with open(lock.path) as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        assert not RunLock(lock.path).run(0, lambda: runs.append(4))
+    assert runs == [1, 3]
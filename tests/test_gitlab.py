@@ -0,0 +1,93 @@
+import os
+
+from tornado.options import options
+
+import rubberband.boilerplate  # noqa: F401, defines the options
+from rubberband.utils import gitlab
+from fake_gitlab import FakeGitlab
+
+
+def test_offline_access_level(tmp_path, monkeypatch):
+    monkeypatch.setattr(options, "cache_db", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(options, "gitlab_offline", True)
+
+    # an uncached user must not break the permission checks
+    assert gitlab.get_user_access_level("new@example.com") == gitlab.MIN_ACCESS_LEVEL
+    assert gitlab.get_username("new@example.com") == "new@example.com"
+
+
+def test_gitlab_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(options, "cache_db", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(options, "gitlab_project_ids", {"scip": 1})
+    fake = FakeGitlab(
+        options.gitlab_group_name,
+        1,
+        [
+            {
+                "id": 1,
+                "username": "jdoe",
+                "name": "J. Doe",
+                "email": "jdoe@example.com",
+                "access_level": 40,
+            }
+        ],
+    )
+    # set_client replaces the client of the process, restore it after the test
+    monkeypatch.setattr(gitlab, "_client", fake)
+    monkeypatch.setattr(gitlab, "_client_pid", os.getpid())
+
+    assert gitlab.get_user_access_level("jdoe@example.com") == 40
+    calls = fake.calls
+    assert gitlab.get_user_access_level("jdoe@example.com") == 40
+    assert gitlab.get_username("jdoe@example.com") == "jdoe"
+    assert gitlab.get_username("jdoe@example.com") == "jdoe"
+    assert fake.calls == calls + 1
+
+    # unknown users are cached as well
+    assert gitlab.get_username("nobody") == "nobody"
+    calls = fake.calls
+    assert gitlab.get_username("nobody") == "nobody"
+    assert fake.calls == calls
+
+
+def test_gitlab_commit_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(options, "cache_db", str(tmp_path / "cache.sqlite3"))
+    full = "0123456789abcdef0123456789abcdef01234567"
+    fake = FakeGitlab(
+        options.gitlab_group_name,
+        1,
+        [
+            {
+                "id": 1,
+                "username": "jdoe",
+                "name": "J. Doe",
+                "email": "jdoe@example.com",
+                "access_level": 40,
+            }
+        ],
+        commits=[
+            {
+                "id": full,
+                "short_id": full[:8],
+                "authored_date": "2020-01-01T00:00:00Z",
+                "author_email": "jdoe@example.com",
+            }
+        ],
+    )
+    # set_client replaces the client of the process, restore it after the test
+    monkeypatch.setattr(gitlab, "_client", fake)
+    monkeypatch.setattr(gitlab, "_client_pid", os.getpid())
+
+    commits = gitlab.prefetch_commits(1, [full[:7] + "-dirty", "fedcba9"])
+    assert commits[full[:7]]["id"] == full
+    assert commits[full[:7]]["author"] == "jdoe"
+    assert commits["fedcba9"] is None
+
+    # short and full hashes are resolved from the cache, also in offline mode
+    calls = fake.calls
+    monkeypatch.setattr(options, "gitlab_offline", True)
+    assert gitlab.get_commit_data(1, full)["id"] == full
+    assert gitlab.get_commit_data(1, full[:10])["id"] == full
+    assert gitlab.get_commit_data(1, "fedcba9") is None
+    assert gitlab.get_commit_data(1, "aaaaaaa") is None
+    assert fake.calls == calls
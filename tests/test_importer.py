@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from rubberband.utils.importer import frame_to_results
+
+
+def test_frame_to_results():
+    data = pd.DataFrame(
+        {
+            "ProblemName": ["a", "b"],
+            "SolvingTime": [1.5, np.inf],
+            "OriginalProblem.Vars": [3, 2],
+            "PresolvedProblem.BinVars": [3, 0],
+            "PresolvedProblem.IntVars": [0, 0],
+            "PresolvedProblem.ContVars": [0, 2],
+            "PresolvedProblem.ImplVars": [0, 0],
+            "LP_Iterations.barrierLP": [1.0, np.nan],
+            "LP_Iterations.dualLP": [2, 3],
+            "LP_Iterations.primalLP": [3, 4],
+        }
+    )
+    a, b = frame_to_results(data)
+
+    assert a["instance_name"] == "a" and a["instance_id"] == "0"
+    assert a["instance_type"] == "BP" and b["instance_type"] == "LP"
+    assert a["PresolvedProblem_BinVars"] == 3
+    assert type(a["PresolvedProblem_BinVars"]) is int
+    assert a["Iterations"] == 6 and b["Iterations"] is None
+    assert b["SolvingTime"] is None
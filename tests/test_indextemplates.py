@@ -0,0 +1,36 @@
+from rubberband.utils.indextemplates import count_fields, result_template
+
+
+def test_result_template():
+    template = result_template()
+    assert template["index_patterns"] == ["result", "result-*"]
+    mapping = template["template"]["mappings"]
+    properties = mapping["properties"]
+    assert properties["Nodes"] == {"type": "long"}
+    assert properties["PrimalBound"] == {"type": "double", "index": False}
+    assert properties["instance_name"]["type"] == "keyword"
+    assert "index" not in properties["instance_name"]
+    assert properties["Datetime_Start"]["type"] == "date"
+    assert properties["Solver"]["index"] is False
+    assert not mapping["numeric_detection"]
+    dynamic = {list(t)[0]: list(t.values())[0] for t in mapping["dynamic_templates"]}
+    assert dynamic["numbers"]["mapping"]["type"] == "double"
+
+    assert (
+        count_fields(
+            {
+                "properties": {
+                    "a": {"type": "long"},
+                    "b": {
+                        "properties": {
+                            "c": {
+                                "type": "text",
+                                "fields": {"raw": {"type": "keyword"}},
+                            }
+                        }
+                    },
+                }
+            }
+        )
+        == 4
+    )
@@ -0,0 +1,75 @@
+import os
+from types import SimpleNamespace
+
+from rubberband.utils import ipetreaders
+
+
+class FakeReader(object):
+    def __init__(self, name):
+        self.name = name
+        self.lines = []
+
+    def getName(self):
+        return self.name
+
+
+class FakeReaderManager(object):
+    def __init__(self):
+        self.readers = []
+        self.solvers = []
+
+    def registerReader(self, reader):
+        self.readers.append(reader)
+
+    def addSolver(self, solver):
+        self.solvers.append(solver)
+
+
+class FakeExperiment(object):
+    def __init__(self):
+        self.readermanager = FakeReaderManager()
+
+
+def test_reader_registry(tmp_path, monkeypatch):
+    calls = {"readers": 0, "solvers": 0}
+
+    def load_readers(paths):
+        calls["readers"] += 1
+        with open(paths[0]) as f:
+            return [FakeReader(f.read())]
+
+    def load_solvers():
+        calls["solvers"] += 1
+        return [FakeReader("solver")]
+
+    monkeypatch.setattr(ipetreaders, "Experiment", FakeExperiment)
+    monkeypatch.setattr(
+        ipetreaders,
+        "loader",
+        SimpleNamespace(
+            loadAdditionalReaders=load_readers, loadAdditionalSolvers=load_solvers
+        ),
+    )
+
+    path = tmp_path / "additional_readers.xml"
+    path.write_text("a")
+    registry = ipetreaders.ReaderRegistry(str(path))
+    first = registry.experiment()
+    first.readermanager.readers[0].lines.append("parsed")
+    second = registry.experiment()
+    assert calls == {"readers": 1, "solvers": 1}
+    assert [r.getName() for r in second.readermanager.readers] == ["a"]
+    # the readers keep state while parsing, every Experiment gets its own
+    assert first.readermanager.readers[0] is not second.readermanager.readers[0]
+    assert first.readermanager.solvers[0] is not second.readermanager.solvers[0]
+    assert second.readermanager.readers[0].lines == []
+
+    # a changed readers file is parsed again, the solvers are kept
+    path.write_text("b")
+    os.utime(path, ns=(0, 0))
+    assert [r.getName() for r in registry.experiment().readermanager.readers] == ["b"]
+    assert calls == {"readers": 2, "solvers": 1}
+
+    path.unlink()
+    assert registry.experiment().readermanager.readers == []
+    assert ipetreaders.get_registry(str(path)) is ipetreaders.get_registry(str(path))
@@ -0,0 +1,54 @@
+import rubberband.boilerplate  # noqa: F401, defines the options
+from rubberband.utils import importer, jobs
+from rubberband.utils.jobs import JobQueue
+from rubberband.utils.stats import ImportStats
+
+
+def test_job_queue(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("user", ["a.out", "a.err"], tags=["tag"])
+
+    job = queue.claim("worker")
+    assert job["id"] == job_id
+    assert job["status"] == "running"
+    assert job["params"]["paths"] == ["a.out", "a.err"]
+    assert queue.claim("worker") is None
+
+    stats = ImportStats("results", "a")
+    stats.fail = 1
+    stats.logMessage("fail", ValueError("broken"))
+    queue.update(job_id, done=1, results=[stats.to_dict()])
+    result = ImportStats.from_dict(queue.get(job_id)["results"][0])
+    assert result.getMessages()["fail"] == ["broken"]
+
+    # jobs of workers without heartbeat go back into the queue with their results
+    assert queue.requeue_stale(-1) == 1
+    job = queue.claim("other")
+    assert job["worker"] == "other"
+    assert job["done"] == 1 and len(job["results"]) == 1
+
+
+def test_requeued_job(tmp_path, monkeypatch):
+    imported = []
+
+    class Importer(object):
+        def __init__(self, user, hashes=None):
+            pass
+
+        def process_files(self, bundle, tags=[], expirationdate=None):
+            imported.append(bundle)
+            return ImportStats("results", bundle[0])
+
+    monkeypatch.setattr(importer, "Importer", Importer)
+    queue = jobs.JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("user", ["a.out", "b.out"], notify=False)
+    queue.claim("worker")
+    queue.update(job_id, done=1, results=[ImportStats("results", "a.out").to_dict()])
+    queue.requeue_stale(-1)
+
+    # the imported bundle is skipped, its files are gone
+    jobs.process_job(queue, queue.claim("other"))
+    assert imported == [["b.out"]]
+    job = queue.get(job_id)
+    assert job["status"] == "finished"
+    assert [r["basename"] for r in job["results"]] == ["a.out", "b.out"]
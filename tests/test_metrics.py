@@ -0,0 +1,23 @@
+from rubberband.utils.metrics import ImportMetrics
+from rubberband.utils.stats import ImportStats
+
+
+def test_import_metrics(tmp_path):
+    metrics = ImportMetrics(str(tmp_path / "cache.sqlite3"), window=3)
+    for i in range(5):
+        stats = ImportStats("results", "run{}.out".format(i))
+        with stats.measure():
+            with stats.stage("ipet"):
+                stats.count("bytes", 1000)
+        stats.status = "success"
+        assert stats.timings["ipet"] <= stats.timings["total"]
+        assert stats.peak_memory > 0
+        assert ImportStats.from_dict(stats.to_dict()).getMetrics() == stats.getMetrics()
+        metrics.add(stats)
+
+    summary = metrics.summary()
+    assert summary["imports"] == 3
+    assert summary["status"] == {"success": 3}
+    assert summary["counters"]["bytes"]["p50"] == 1000
+    assert set(summary["timings"]) == {"ipet", "total"}
+    assert summary["throughput"]["p90"] > 0
@@ -0,0 +1,260 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from rubberband import models
+from rubberband.models import (
+    File,
+    FileChunk,
+    Result,
+    ResultSnapshot,
+    Settings,
+    TestSet,
+    split_chunks,
+)
+
+
+def test_file_chunks():
+    data = b"".join(b"line %d\n" % i for i in range(1000))
+    pieces = split_chunks(data, size=100)
+    assert b"".join(pieces) == data
+    assert all(p.endswith(b"\n") for p in pieces)
+
+    a, b = File(), File()
+    chunks = a.set_contents(data)
+    b.set_contents(data)
+    # identical contents are stored in the same chunks
+    assert a.chunks == b.chunks
+    assert a.size == len(data)
+    assert b"".join(c.decompress() for c in chunks) == data
+
+
+def test_reused_chunks(monkeypatch):
+    stored = models.FileChunk.from_data(b"stored\n")
+    new = models.FileChunk.from_data(b"new\n")
+    actions = []
+
+    def bulk(client, batch, raise_on_error=True):
+        actions.extend(batch)
+        return 1, [{"update": {"_id": new.meta.id, "status": 404}}]
+
+    monkeypatch.setattr(models, "bulk", bulk)
+    monkeypatch.setattr(models.connections, "get_connection", lambda: None)
+
+    assert models.FileChunk.missing([stored, new, stored]) == [new]
+    # reused chunks are marked as used, such that they aren't deleted as unreferenced
+    assert [a["_id"] for a in actions] == [stored.meta.id, new.meta.id]
+    assert all("created" in a["doc"] for a in actions)
+
+
+def test_file_lines(monkeypatch):
+    text = "".join("line {}\n".format(i) for i in range(100000))
+    f = File()
+    stored = {c.meta.id: c for c in f.set_contents(text.encode("utf-8"))}
+    assert len(f.chunks) > 2
+
+    loaded = []
+
+    def load(ids):
+        loaded.extend(ids)
+        return [stored[i] for i in ids]
+
+    monkeypatch.setattr(FileChunk, "load", load)
+    for begin, end in [(0, 3), (54321, 54330), (99990, 100005)]:
+        loaded.clear()
+        assert f.lines(begin, end) == text.splitlines()[begin:end]
+        assert len(loaded) <= 2
+
+
+def test_result_snapshot():
+    records = [
+        {
+            "instance_name": "a",
+            "instance_id": "0",
+            "testset_id": "t",
+            "Status": "ok",
+            "SolvingTime": 1.5,
+            "Nodes": 3,
+            "Datetime_Start": "2017-01-01 10:00:00",
+        },
+        {
+            "instance_name": "b",
+            "instance_id": "1",
+            "testset_id": "t",
+            "Status": "fail",
+            "Nodes": 2**70,
+            "Datetime_Start": "2017-01-01 10:05:00",
+            "Errors": [1, 2],
+        },
+    ]
+    snapshot = ResultSnapshot.from_records("t", "v1", records)
+    assert snapshot.rows == 2 and snapshot.meta.id == "t"
+
+    stored = TestSet(meta={"id": "t"}, filename="check.out", snapshot_version="v1")
+    stored.set_results(Result.from_es({"_source": r}) for r in records)
+    loaded = TestSet(meta={"id": "t"}, filename="check.out", snapshot_version="v1")
+    assert snapshot.is_current(loaded)
+    loaded.result_snapshot = snapshot.data
+    assert loaded.get_data() == stored.get_data()
+
+    # a reimport changes the version
+    assert not snapshot.is_current(TestSet(snapshot_version="v2"))
+    assert not snapshot.is_current(TestSet())
+
+
+def test_testset_frame():
+    records = [
+        {
+            "instance_name": "a",
+            "instance_id": 0,
+            "testset_id": "t",
+            "Status": "ok",
+            "SolvingTime": 1.5,
+            "Nodes": 3,
+            "TimeLimit": 60.0,
+        },
+        {
+            "instance_name": "b",
+            "testset_id": "t",
+            "Status": "fail",
+            "ProblemName": "bb",
+            "Nodes": None,
+        },
+    ]
+    testset = TestSet(
+        meta={"id": "t"},
+        filename="check.out",
+        git_hash="abc",
+        time_limit="3600",
+        settings_short_name="default",
+    )
+    testset.set_results(Result.from_es({"_source": r}) for r in records)
+    expected = pd.DataFrame(testset.get_data(add_data={"RubberbandId": "x"})).T
+
+    snapshot = ResultSnapshot.from_records("t", "v1", records)
+    loaded = TestSet(
+        meta={"id": "t"},
+        filename="check.out",
+        git_hash="abc",
+        time_limit="3600",
+        settings_short_name="default",
+    )
+    loaded.result_snapshot = snapshot.data
+
+    for frame in (
+        testset.to_frame(add_data={"RubberbandId": "x"}),
+        loaded.to_frame(add_data={"RubberbandId": "x"}),
+    ):
+        assert sorted(frame.columns) == sorted(expected.columns)
+        assert list(frame.index) == ["a", "b"]
+        assert frame["SolvingTime"].dtype == float
+        assert frame["Settings"].dtype == "category"
+        assert list(frame["ProblemName"]) == ["a", "bb"]
+        assert list(frame["TimeLimit"]) == [60.0, 3600.0]
+        assert list(frame["Seed"]) == [0, 0]
+        assert list(frame["RubberbandId"]) == ["x", "x"]
+        assert frame.loc["b", "instance_id"] == 0
+        assert pd.isna(frame.loc["b", "Nodes"])
+        for column in ("GitHash", "LogFileName", "RubberbandMetaId", "Status"):
+            assert list(frame[column]) == list(expected[column])
+
+
+def test_settings_diff():
+    assert Settings.content_id({"a/b": 1, "c/d": 2.0}) == Settings.content_id(
+        {"c/d": 2.0, "a/b": 1}
+    )
+
+    default = Settings.from_es(
+        {
+            "_id": "d",
+            "_source": {
+                "limits/time": 1e20,
+                "conflict/uselocalrows": 0,
+                "separating/flowcover/maxslack": -1,
+                "created": "2026-01-01T00:00:00",
+            },
+        }
+    )
+    diff = Settings.from_es(
+        {
+            "_id": "s",
+            "_source": {"limits/time": 3600, "default_id": "d", "set_hashes": ["abc"]},
+        }
+    )
+    settings, settings_default = Settings.resolve(diff, default)
+    assert settings.meta.id == "s" and settings_default.meta.id == "d"
+    assert settings.parameters() == {
+        "limits/time": 3600,
+        "conflict/uselocalrows": 0,
+        "separating/flowcover/maxslack": -1,
+    }
+    assert settings.unmasked()["conflict/uselocalrows"] is True
+    assert settings.unmasked()["separating/flowcover/maxslack"] == float("inf")
+    assert "created" not in settings_default.parameters()
+
+    # Settings of older imports hold all parameters
+    legacy = Settings.from_es(
+        {"_id": "l", "_source": {"testset_id": "t", "limits/time": 1}}
+    )
+    assert Settings.resolve(legacy, default) == (legacy, default)
+
+
+def test_get_many_duplicates(monkeypatch):
+    requested = []
+
+    def mget(ids, missing):
+        requested.append(list(ids))
+        return [TestSet(meta={"id": i}) for i in ids]
+
+    class FakeSearch(object):
+        def filter(self, kind, testset_id):
+            requested.append(testset_id)
+            self.ids = testset_id
+            return self
+
+        def scan(self):
+            for i in self.ids:
+                yield Result(testset_id=i, instance_name="inst", instance_id=i)
+
+    monkeypatch.setattr(TestSet, "mget", mget)
+    monkeypatch.setattr(Result, "search", FakeSearch)
+
+    # a TestSet compared to itself is loaded once and has its Results everywhere
+    testsets = TestSet.get_many(["a", "b", "a"])
+    assert requested == [["a", "b"], ["a", "b"]]
+    assert [t.meta.id for t in testsets] == ["a", "b", "a"]
+    assert all(t.results["inst"].testset_id == t.meta.id for t in testsets)
+
+    first, second = TestSet(meta={"id": "a"}), TestSet(meta={"id": "a"})
+    TestSet.load_results_many([first, second])
+    assert first.results["inst"] is second.results["inst"]
+    assert requested[-1] == ["a"]
+
+
+def test_delete_unreferenced_settings(monkeypatch):
+    deleted = []
+
+    def scan(self):
+        if self._index == [TestSet.Index.name]:
+            yield TestSet(
+                meta={"id": "t"}, settings_id="diff", default_settings_id="def"
+            )
+        else:
+            for i in ("diff", "def", "reimported", "unused"):
+                yield Settings(meta={"id": i})
+
+    def delete(self):
+        query = self.to_dict()["query"]["bool"]
+        # Settings of older imports are collected regardless of their age
+        assert {"exists": {"field": "testset_id"}} in query["filter"][0]["bool"][
+            "should"
+        ]
+        deleted.extend(query["filter"][1]["ids"]["values"])
+        return SimpleNamespace(deleted=len(query["filter"][1]["ids"]["values"]))
+
+    search = type(Settings.search())
+    monkeypatch.setattr(search, "scan", scan)
+    monkeypatch.setattr(search, "delete", delete)
+
+    assert Settings.delete_unreferenced() == 2
+    assert sorted(deleted) == ["reimported", "unused"]
@@ -0,0 +1,68 @@
+import os
+import hashlib
+
+from rubberband.utils.multipart import MultipartStreamParser, remove_upload_dirs
+
+
+def test_multipart_stream_parser(tmp_path):
+    content = b"SCIP Status : problem is solved\r\n--not a boundary\r\n" * 100
+    body = (
+        b"--xyz\r\n"
+        b'Content-Disposition: form-data; name="tags"\r\n\r\n'
+        b"a, b\r\n"
+        b"--xyz\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="../check.out"\r\n'
+        b"Content-Type: application/octet-stream\r\n\r\n" + content + b"\r\n"
+        b"--xyz--\r\n"
+    )
+    parser = MultipartStreamParser.from_content_type(
+        "multipart/form-data; boundary=xyz", str(tmp_path)
+    )
+    # feed the body in small pieces to split delimiters across chunks
+    for i in range(0, len(body), 7):
+        parser.data_received(body[i : i + 7])
+    parser.finish()
+
+    assert parser.fields == {"tags": [b"a, b"]}
+    (f,) = parser.files
+    assert f.path == os.path.join(parser.upload_dir, "check.out")
+    assert os.path.dirname(parser.upload_dir) == str(tmp_path)
+    assert f.size == len(content)
+    assert f.sha256 == hashlib.sha256(content).hexdigest()
+    with open(f.path, "rb") as fobj:
+        assert fobj.read() == content
+
+
+def test_multipart_same_filename(tmp_path):
+    def upload(content):
+        body = (
+            b"--xyz\r\n"
+            b'Content-Disposition: form-data; name="resultFiles"; filename="check.out"'
+            b"\r\n\r\n" + content + b"\r\n"
+            b"--xyz\r\n"
+            b'Content-Disposition: form-data; name="other"; filename="check.set"'
+            b"\r\n\r\n" + content + b"\r\n"
+            b"--xyz--\r\n"
+        )
+        parser = MultipartStreamParser.from_content_type(
+            "multipart/form-data; boundary=xyz", str(tmp_path)
+        )
+        parser.data_received(body)
+        parser.finish()
+        return parser
+
+    # concurrent uploads of files with the same name don't overwrite each other
+    first, second = upload(b"first"), upload(b"second")
+    (f,) = first.discard("resultFiles")
+    (g,) = second.discard("resultFiles")
+    assert f.path != g.path
+    with open(f.path, "rb") as fobj:
+        assert fobj.read() == b"first"
+    assert os.listdir(first.upload_dir) == ["check.out"]
+
+    os.remove(f.path)
+    remove_upload_dirs([f.path, g.path])
+    assert not os.path.exists(first.upload_dir)
+    assert os.path.exists(second.upload_dir)
+    second.abort()
+    assert os.listdir(tmp_path) == []
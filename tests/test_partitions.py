@@ -0,0 +1,17 @@
+import datetime
+
+from rubberband.models.partitions import partition_name, partition_suffix
+
+
+def test_partition_names():
+    when = datetime.datetime(2024, 1, 31)
+    assert partition_suffix(when, "month") == "2024.01"
+    assert partition_suffix(when, "year") == "2024"
+    assert partition_suffix(when, "none") is None
+    assert partition_name("result", "2024.01") == "result-2024.01"
+    assert partition_name("result", None) == "result"
+    try:
+        partition_suffix(when, "week")
+        assert False
+    except ValueError:
+        pass